@@ -5,12 +5,16 @@ from django.shortcuts import get_object_or_404
 from django.utils import timezone
 from django.db.models import Sum, Q
 from django.contrib.auth import authenticate
+from django.contrib.auth.models import User
+from django.utils.functional import SimpleLazyObject
 from cotizaciones.models import TrabajoEmpleado, EvidenciaTrabajo, GastoTrabajo
 from home.models import PerfilEmpleado
+from home.utils_perfil import estado_perfil
 from notificaciones.models import Notificacion
 from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework_simplejwt.authentication import JWTAuthentication
-from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError, AuthenticationFailed
+from rest_framework_simplejwt.settings import api_settings
 from functools import wraps
 import json
 import base64
@@ -25,21 +29,51 @@ logger = logging.getLogger(__name__)
 # HELPER: Autenticación JWT para vistas basadas en funciones
 # ============================================================
 def jwt_required(view_func):
-    """Decorador que reemplaza @jwt_required usando JWT"""
+    """
+    Decorador que reemplaza @jwt_required usando JWT.
+
+    No lee User ni PerfilEmpleado: los claims perfil_id y cargo del token se
+    contrastan con estado_perfil (caché 'perfiles', común a todos los
+    workers), así un usuario desactivado o con otro cargo queda fuera sin
+    esperar a que el token expire. Deja en el request:
+      - request.perfil_id / request.cargo
+      - request.user: User que solo se consulta si la vista lo usa
+    """
     @wraps(view_func)
     def wrapper(request, *args, **kwargs):
         auth = JWTAuthentication()
         try:
-            result = auth.authenticate(request)
-            if result is None:
+            header = auth.get_header(request)
+            raw_token = auth.get_raw_token(header) if header is not None else None
+            if raw_token is None:
                 return JsonResponse({'success': False, 'error': 'Token requerido'}, status=401)
-            request.user, _ = result
-        except (InvalidToken, TokenError) as e:
+            token = auth.get_validated_token(raw_token)
+        except (InvalidToken, TokenError, AuthenticationFailed) as e:
             return JsonResponse({'success': False, 'error': 'Token inválido o expirado'}, status=401)
+
+        user_id = token.get(api_settings.USER_ID_CLAIM)
+        estado = estado_perfil(user_id) if user_id is not None else None
+        if estado is None or not estado['activo']:
+            return JsonResponse({'success': False, 'error': 'Usuario inactivo'}, status=401)
+
+        # Tokens emitidos antes de incluir los claims usan el estado vigente
+        if 'perfil_id' in token and (token['perfil_id'], token['cargo']) != (estado['perfil_id'], estado['cargo']):
+            return JsonResponse({'success': False, 'error': 'Token revocado, inicia sesión nuevamente'}, status=401)
+
+        request.perfil_id = estado['perfil_id']
+        request.cargo = estado['cargo']
+        request.user = SimpleLazyObject(lambda: User.objects.get(pk=user_id))
         return view_func(request, *args, **kwargs)
     return wrapper
 
 
+def _perfil_id(request):
+    """perfil_id del token; PerfilEmpleado.DoesNotExist si el usuario no tiene perfil"""
+    if request.perfil_id is None:
+        raise PerfilEmpleado.DoesNotExist('PerfilEmpleado matching query does not exist.')
+    return request.perfil_id
+
+
 
 
 # ==================== TRABAJOS ====================
@@ -48,10 +82,11 @@ def jwt_required(view_func):
 @jwt_required
 def mis_trabajos_empleado(request):
     try:
-        perfil = PerfilEmpleado.objects.get(user=request.user)
+        perfil_id = _perfil_id(request)
+        es_admin = request.cargo == 'admin'
         
         # ✅ Si el usuario es admin, ve TODAS las cotizaciones aprobadas
-        if perfil.cargo == 'admin':
+        if es_admin:
             trabajos = (
                 TrabajoEmpleado.objects
                 .select_related('cotizacion', 'item_mano_obra', 'empleado__user')
@@ -64,7 +99,7 @@ def mis_trabajos_empleado(request):
                 TrabajoEmpleado.objects
                 .select_related('cotizacion', 'item_mano_obra')
                 .filter(
-                    empleado=perfil,
+                    empleado_id=perfil_id,
                     cotizacion__estado='aprobada'
                 )
                 .order_by('-fecha_inicio')
@@ -102,14 +137,14 @@ def mis_trabajos_empleado(request):
                 'observaciones': trabajo.observaciones_empleado or '',
                 'tiene_gastos': hasattr(trabajo, 'gastos'),
                 'empleado_asignado': empleado_info,  # ✅ NUEVO
-                'es_admin': perfil.cargo == 'admin'  # ✅ NUEVO
+                'es_admin': es_admin  # ✅ NUEVO
             })
 
         return JsonResponse({
             'success': True,
             'total': len(data),
             'trabajos': data,
-            'es_admin': perfil.cargo == 'admin'  # ✅ NUEVO
+            'es_admin': es_admin  # ✅ NUEVO
         }, status=200)
 
     except PerfilEmpleado.DoesNotExist:
@@ -133,13 +168,13 @@ def mis_trabajos_empleado(request):
 def actualizar_trabajo_empleado(request, trabajo_id):
     """API para app móvil - Actualizar trabajo"""
     try:
-        perfil_empleado = request.user.perfilempleado
+        perfil_id = _perfil_id(request)
         
         # ✅ Admin puede actualizar cualquier trabajo
-        if perfil_empleado.cargo == 'admin':
+        if request.cargo == 'admin':
             trabajo = get_object_or_404(TrabajoEmpleado, id=trabajo_id)
         else:
-            trabajo = get_object_or_404(TrabajoEmpleado, id=trabajo_id, empleado=perfil_empleado)
+            trabajo = get_object_or_404(TrabajoEmpleado, id=trabajo_id, empleado_id=perfil_id)
         
         data = json.loads(request.body)
         
@@ -188,8 +223,7 @@ def actualizar_trabajo_empleado(request, trabajo_id):
 def completar_trabajo_empleado(request, trabajo_id):
     """API para app móvil - Completar trabajo"""
     try:
-        perfil_empleado = request.user.perfilempleado
-        trabajo = get_object_or_404(TrabajoEmpleado, id=trabajo_id, empleado=perfil_empleado)
+        trabajo = get_object_or_404(TrabajoEmpleado, id=trabajo_id, empleado_id=_perfil_id(request))
         
         trabajo.estado = 'completado'
         if not trabajo.fecha_fin:
@@ -219,8 +253,7 @@ def subir_evidencia_trabajo(request, trabajo_id):
     logger = logging.getLogger(__name__)
     
     try:
-        perfil_empleado = request.user.perfilempleado
-        trabajo = get_object_or_404(TrabajoEmpleado, id=trabajo_id, empleado=perfil_empleado)
+        trabajo = get_object_or_404(TrabajoEmpleado, id=trabajo_id, empleado_id=_perfil_id(request))
         
         logger.info(f"📸 Subiendo evidencia para trabajo {trabajo_id}")
         
@@ -293,12 +326,12 @@ def obtener_evidencias_trabajo(request, trabajo_id):
     logger = logging.getLogger(__name__)
     
     try:
-        perfil_empleado = request.user.perfilempleado
+        perfil_id = _perfil_id(request)
         
-        if perfil_empleado.cargo == 'admin':
+        if request.cargo == 'admin':
             trabajo = get_object_or_404(TrabajoEmpleado, id=trabajo_id)
         else:
-            trabajo = get_object_or_404(TrabajoEmpleado, id=trabajo_id, empleado=perfil_empleado)
+            trabajo = get_object_or_404(TrabajoEmpleado, id=trabajo_id, empleado_id=perfil_id)
         
         evidencias = trabajo.evidencias.all().order_by('-fecha_subida')
         
@@ -339,10 +372,10 @@ def obtener_todas_evidencias_admin(request):
     logger = logging.getLogger(__name__)
     
     try:
-        perfil = PerfilEmpleado.objects.get(user=request.user)
+        _perfil_id(request)
         
         # Solo admins pueden acceder
-        if perfil.cargo != 'admin':
+        if request.cargo != 'admin':
             return JsonResponse({
                 'success': False,
                 'error': 'Acceso denegado. Solo administradores.'
@@ -409,15 +442,15 @@ def descargar_evidencia(request, evidencia_id):
     logger = logging.getLogger(__name__)
     
     try:
-        perfil_empleado = request.user.perfilempleado
+        perfil_id = _perfil_id(request)
         
-        if perfil_empleado.cargo == 'admin':
+        if request.cargo == 'admin':
             evidencia = get_object_or_404(EvidenciaTrabajo, id=evidencia_id)
         else:
             evidencia = get_object_or_404(
                 EvidenciaTrabajo, 
                 id=evidencia_id,
-                trabajo__empleado=perfil_empleado
+                trabajo__empleado_id=perfil_id
             )
         
         logger.info(f"📥 Descargando evidencia {evidencia_id}")
@@ -455,11 +488,11 @@ def eliminar_evidencia(request, evidencia_id):
     logger = logging.getLogger(__name__)
     
     try:
-        perfil = request.user.perfilempleado
+        perfil_id = _perfil_id(request)
         evidencia = get_object_or_404(EvidenciaTrabajo, id=evidencia_id)
         
         # Verificar permisos: admin o dueño del trabajo
-        if perfil.cargo != 'admin' and evidencia.trabajo.empleado != perfil:
+        if request.cargo != 'admin' and evidencia.trabajo.empleado_id != perfil_id:
             return JsonResponse({
                 'success': False,
                 'error': 'Acceso denegado. Solo puedes eliminar tus propias evidencias.'
@@ -511,8 +544,8 @@ def verificar_almacenamiento_cloudinary(request):
     import logging
     logger = logging.getLogger(__name__)
     try:
-        perfil = PerfilEmpleado.objects.get(user=request.user)
-        if perfil.cargo != 'admin':
+        _perfil_id(request)
+        if request.cargo != 'admin':
             return JsonResponse({'success': False, 'error': 'Solo administradores'}, status=403)
 
         from app_movil.cloudinary_monitor import verificar_y_gestionar_almacenamiento
@@ -531,8 +564,7 @@ def verificar_almacenamiento_cloudinary(request):
 def registrar_gasto_trabajo(request, trabajo_id):
     """API para app móvil - Registrar gastos de trabajo"""
     try:
-        perfil_empleado = request.user.perfilempleado
-        trabajo = get_object_or_404(TrabajoEmpleado, id=trabajo_id, empleado=perfil_empleado)
+        trabajo = get_object_or_404(TrabajoEmpleado, id=trabajo_id, empleado_id=_perfil_id(request))
         
         data = json.loads(request.body)
         
@@ -574,11 +606,11 @@ def registrar_gasto_trabajo(request, trabajo_id):
 def obtener_gastos_trabajo(request, trabajo_id):
     """API para app móvil - Obtener gastos de un trabajo"""
     try:
-        perfil_empleado = request.user.perfilempleado
-        if perfil_empleado.cargo == 'admin':
+        perfil_id = _perfil_id(request)
+        if request.cargo == 'admin':
             trabajo = get_object_or_404(TrabajoEmpleado, id=trabajo_id)
         else:
-            trabajo = get_object_or_404(TrabajoEmpleado, id=trabajo_id, empleado=perfil_empleado)
+            trabajo = get_object_or_404(TrabajoEmpleado, id=trabajo_id, empleado_id=perfil_id)
         try:
             gastos = trabajo.gastos
             gastos_data = {
@@ -815,20 +847,24 @@ def login_movil_jwt(request):
                 'error': 'Usuario inactivo'
             }, status=401)
 
-        # Generar tokens JWT
-        refresh = RefreshToken.for_user(user)
-        access_token = str(refresh.access_token)
-        refresh_token = str(refresh)
-
         # Obtener datos del perfil
         try:
             perfil = PerfilEmpleado.objects.get(user=user)
             nombre = user.get_full_name() or user.username
+            perfil_id = perfil.id
             cargo = perfil.cargo
         except PerfilEmpleado.DoesNotExist:
             nombre = user.username
+            perfil_id = None
             cargo = None
 
+        # Generar tokens JWT (jwt_required autoriza con perfil_id y cargo)
+        refresh = RefreshToken.for_user(user)
+        refresh['perfil_id'] = perfil_id
+        refresh['cargo'] = cargo
+        access_token = str(refresh.access_token)
+        refresh_token = str(refresh)
+
         logger.info(f"✅ Login JWT exitoso: {username}")
 
         return JsonResponse({
@@ -860,7 +896,16 @@ def refresh_token_movil(request):
             return JsonResponse({'success': False, 'error': 'Refresh token requerido'}, status=400)
 
         refresh = RefreshToken(refresh_token)
-        access_token = str(refresh.access_token)
+
+        # El access token nuevo lleva el perfil y cargo vigentes
+        estado = estado_perfil(refresh.get(api_settings.USER_ID_CLAIM))
+        if estado is None or not estado['activo']:
+            return JsonResponse({'success': False, 'error': 'Usuario inactivo'}, status=401)
+
+        access = refresh.access_token
+        access['perfil_id'] = estado['perfil_id']
+        access['cargo'] = estado['cargo']
+        access_token = str(access)
 
         return JsonResponse({
             'success': True,
@@ -886,7 +931,7 @@ def registrar_push_token(request):
         if not token:
             return JsonResponse({'success': False, 'error': 'Token vacío'}, status=400)
 
-        perfil = PerfilEmpleado.objects.get(user=request.user)
+        perfil = PerfilEmpleado.objects.get(pk=_perfil_id(request))
         perfil.expo_push_token = token
         perfil.save()
 
@@ -6,7 +6,8 @@ from .models import (
     PlantillaCotizacion, ItemPlantillaServicio, ParametroItemServicio,
     CategoriaEmpleado, EmpleadoCategoria, ItemManoObraEmpleado,
     TrabajoEmpleado, PrestamoMaterial, HistorialPrestamo,
-    EvidenciaTrabajo, GastoTrabajo
+    EvidenciaTrabajo, GastoTrabajo, ResumenMensualCotizacion,
+    ProductividadMensualEmpleado, SolicitudExportacion, SecuenciaCotizacion
 )
 
 # Registros básicos
@@ -107,4 +108,30 @@ class GastoTrabajoAdmin(admin.ModelAdmin):
     
     def total_gastos(self, obj):
         return f'${obj.total:,.2f}'
-    total_gastos.short_description = 'Total'
\ No newline at end of file
+    total_gastos.short_description = 'Total'
+
+# Admin para ResumenMensualCotizacion (solo lectura, se mantiene por signals)
+@admin.register(ResumenMensualCotizacion)
+class ResumenMensualCotizacionAdmin(admin.ModelAdmin):
+    list_display = ('anio', 'mes', 'estado', 'cantidad', 'valor_total', 'fecha_actualizacion')
+    list_filter = ('anio', 'estado')
+    readonly_fields = ('anio', 'mes', 'estado', 'cantidad', 'valor_total', 'fecha_actualizacion')
+
+# Admin para ProductividadMensualEmpleado (solo lectura, se mantiene por signals)
+@admin.register(ProductividadMensualEmpleado)
+class ProductividadMensualEmpleadoAdmin(admin.ModelAdmin):
+    list_display = ('empleado', 'anio', 'mes', 'trabajos_asignados', 'trabajos_completados', 'horas_trabajadas')
+    list_filter = ('anio', 'empleado')
+    readonly_fields = ('empleado', 'anio', 'mes', 'trabajos_asignados', 'trabajos_completados', 'horas_trabajadas', 'fecha_actualizacion')
+
+# Admin para SolicitudExportacion (la genera el worker procesar_exportaciones)
+@admin.register(SolicitudExportacion)
+class SolicitudExportacionAdmin(admin.ModelAdmin):
+    list_display = ('id', 'tipo', 'formato', 'estado', 'filas_procesadas', 'total_filas', 'solicitado_por', 'fecha_creacion', 'fecha_fin')
+    list_filter = ('estado', 'tipo', 'formato')
+    readonly_fields = ('tipo', 'formato', 'parametros', 'estado', 'total_filas', 'filas_procesadas', 'archivo', 'error', 'solicitado_por', 'fecha_creacion', 'fecha_inicio', 'ultima_actividad', 'fecha_fin')
+
+# Admin para SecuenciaCotizacion (último número usado por año)
+@admin.register(SecuenciaCotizacion)
+class SecuenciaCotizacionAdmin(admin.ModelAdmin):
+    list_display = ('anio', 'ultimo')
@@ -0,0 +1,50 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from cotizaciones.utils_pdf_lote import consulta_pdf_lote, escribir_zip_pdfs
+
+class Command(BaseCommand):
+    help = 'Genera un ZIP con los PDFs de las cotizaciones filtradas (por defecto aprobadas y finalizadas)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('archivo', help='Ruta del ZIP a crear')
+        parser.add_argument('--mes', default='', help='Mes de creación (AAAA-MM)')
+        parser.add_argument('--desde', default='', help='Fecha de creación desde (AAAA-MM-DD)')
+        parser.add_argument('--hasta', default='', help='Fecha de creación hasta (AAAA-MM-DD)')
+        parser.add_argument(
+            '--estado',
+            default='',
+            help='Estados separados por coma (por defecto aprobada,finalizada)'
+        )
+        parser.add_argument('--cliente', default='', help='ID del cliente')
+        parser.add_argument(
+            '--procesos',
+            type=int,
+            default=None,
+            help='Procesos que dibujan PDFs en paralelo (por defecto uno por núcleo)'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            cotizaciones = consulta_pdf_lote(options)
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        total = cotizaciones.count()
+        self.stdout.write(f'🔄 Generando {total} PDFs en {options["archivo"]}...')
+        inicio = time.monotonic()
+
+        def al_avanzar(escritos):
+            if escritos % 50 == 0:
+                self.stdout.write(f'   {escritos}/{total} PDFs')
+
+        escritos = escribir_zip_pdfs(options['archivo'], cotizaciones, options['procesos'], al_avanzar)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ {escritos} PDFs en {time.monotonic() - inicio:.1f}s'
+        ))
+
+# EJECUTAR CON (cierre de mes para contabilidad):
+# python manage.py exportar_pdfs_cotizaciones cotizaciones_2025_09.zip --mes 2025-09
+
+# OTROS FILTROS:
+# python manage.py exportar_pdfs_cotizaciones pdfs.zip --desde 2025-09-01 --hasta 2025-09-15 --estado finalizada --cliente 12 --procesos 4
@@ -0,0 +1,53 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from cotizaciones.models import Cotizacion
+from cotizaciones.utils_pdf import datos_pdf_cotizacion, construir_pdf_cotizacion, ruta_pdf_cotizacion
+
+class Command(BaseCommand):
+    help = 'Mide el tiempo de generación del PDF de cotizaciones (datos, dibujo y PDF guardado)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--cotizacion',
+            type=int,
+            help='ID de la cotización a medir (por defecto la última creada)'
+        )
+        parser.add_argument(
+            '--repeticiones',
+            type=int,
+            default=50,
+            help='Cantidad de PDFs generados por medición'
+        )
+
+    def medir(self, funcion, repeticiones):
+        inicio = time.perf_counter()
+        for _ in range(repeticiones):
+            funcion()
+        return (time.perf_counter() - inicio) / repeticiones * 1000
+
+    def handle(self, *args, **options):
+        if options['cotizacion']:
+            cotizacion = Cotizacion.objects.filter(pk=options['cotizacion']).first()
+        else:
+            cotizacion = Cotizacion.objects.order_by('-id').first()
+        if cotizacion is None:
+            raise CommandError('No hay cotización para medir')
+
+        repeticiones = max(options['repeticiones'], 1)
+        self.stdout.write(f'🔄 Cotización {cotizacion.numero}: {repeticiones} repeticiones por medición')
+
+        datos = datos_pdf_cotizacion(cotizacion)
+        construir_pdf_cotizacion(datos)  # Primera llamada fuera de la medición (carga de fuentes)
+
+        tiempos = [
+            ('Consulta de datos', self.medir(lambda: datos_pdf_cotizacion(cotizacion), repeticiones)),
+            ('Dibujo del PDF', self.medir(lambda: construir_pdf_cotizacion(datos), repeticiones)),
+            ('PDF guardado (descarga)', self.medir(lambda: ruta_pdf_cotizacion(cotizacion), repeticiones)),
+        ]
+
+        for nombre, milisegundos in tiempos:
+            self.stdout.write(self.style.SUCCESS(f'✅ {nombre}: {milisegundos:.2f} ms por PDF'))
+
+# EJECUTAR CON:
+# python manage.py medir_pdf_cotizaciones
+# python manage.py medir_pdf_cotizaciones --cotizacion 123 --repeticiones 200
@@ -0,0 +1,52 @@
+import time
+from django.core.management.base import BaseCommand
+from cotizaciones.utils_exportacion_diferida import tomar_siguiente_exportacion, procesar_exportacion
+
+class Command(BaseCommand):
+    help = 'Worker que genera las exportaciones encoladas desde la web (Excel/CSV) en MEDIA_ROOT'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--una-vez',
+            action='store_true',
+            help='Procesa las exportaciones pendientes y termina'
+        )
+        parser.add_argument(
+            '--intervalo',
+            type=float,
+            default=2,
+            help='Segundos de espera cuando no hay exportaciones pendientes'
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write('🔄 Esperando exportaciones pendientes...')
+        
+        while True:
+            solicitud = tomar_siguiente_exportacion()
+            
+            if solicitud is None:
+                if options['una_vez']:
+                    break
+                time.sleep(options['intervalo'])
+                continue
+            
+            self.stdout.write(f'🔄 Exportación #{solicitud.id}: {solicitud.get_tipo_display()} ({solicitud.get_formato_display()})')
+            inicio = time.monotonic()
+            
+            solicitud = procesar_exportacion(solicitud)
+            
+            if solicitud.estado == 'completada':
+                self.stdout.write(self.style.SUCCESS(
+                    f'✅ Exportación #{solicitud.id}: {solicitud.filas_procesadas} filas '
+                    f'en {time.monotonic() - inicio:.1f}s'
+                ))
+            else:
+                self.stdout.write(self.style.ERROR(
+                    f'❌ Exportación #{solicitud.id}: {solicitud.error}'
+                ))
+
+# EJECUTAR CON (proceso permanente, junto a gunicorn):
+# python manage.py procesar_exportaciones
+
+# O PROCESAR LO PENDIENTE Y TERMINAR (por ejemplo desde cron):
+# python manage.py procesar_exportaciones --una-vez
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+from cotizaciones.utils_reportes import reconstruir_resumen_mensual, reconstruir_productividad_empleados
+
+class Command(BaseCommand):
+    help = 'Reconstruye los resúmenes mensuales (cotizaciones y productividad de empleados) usados por el dashboard de reportes'
+
+    def handle(self, *args, **kwargs):
+        self.stdout.write('🔄 Reconstruyendo resumen mensual de cotizaciones...')
+        
+        filas = reconstruir_resumen_mensual()
+        
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ Completado: {filas} filas (mes/estado) generadas'
+        ))
+        
+        self.stdout.write('🔄 Reconstruyendo productividad mensual de empleados...')
+        
+        filas = reconstruir_productividad_empleados()
+        
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ Completado: {filas} filas (empleado/mes) generadas'
+        ))
+
+# EJECUTAR CON:
+# python manage.py reconstruir_resumen_reportes
+
+# Necesario después de cargas masivas o de actualizaciones con queryset.update(),
+# que no disparan los signals que mantienen el resumen.
@@ -0,0 +1,80 @@
+from django.core.management.base import BaseCommand
+from cotizaciones.utils_precios import ESTADOS_REPRECIO, vista_previa_reprecio, aplicar_reprecio
+
+class Command(BaseCommand):
+    help = (
+        'Actualiza al precio de catálogo vigente los servicios y materiales de las '
+        'cotizaciones abiertas (borrador / requiere cambios). Sin --aplicar solo muestra las diferencias.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--servicio',
+            type=int,
+            action='append',
+            help='ID de servicio a repreciar (se puede repetir); por defecto todos'
+        )
+        parser.add_argument(
+            '--material',
+            type=int,
+            action='append',
+            help='ID de material a repreciar (se puede repetir); por defecto todos'
+        )
+        parser.add_argument(
+            '--solo-servicios',
+            action='store_true',
+            help='No tocar materiales'
+        )
+        parser.add_argument(
+            '--solo-materiales',
+            action='store_true',
+            help='No tocar servicios'
+        )
+        parser.add_argument(
+            '--aplicar',
+            action='store_true',
+            help='Guardar los cambios (sin esta opción solo se muestra la vista previa)'
+        )
+
+    def handle(self, *args, **options):
+        servicios = [] if options['solo_materiales'] else options['servicio']
+        materiales = [] if options['solo_servicios'] else options['material']
+
+        self.stdout.write(f'🔄 Buscando precios desactualizados en cotizaciones {", ".join(ESTADOS_REPRECIO)}...')
+        previa = vista_previa_reprecio(servicios, materiales)
+
+        if not previa['items']:
+            self.stdout.write(self.style.SUCCESS('✅ Todas las cotizaciones abiertas tienen precios de catálogo vigentes'))
+            return
+
+        numeros = {cot['id']: cot['numero'] for cot in previa['cotizaciones']}
+        for item in previa['items']:
+            self.stdout.write(
+                f"   {numeros.get(item['cotizacion_id'])} | {item['tipo']} {item['nombre']}: "
+                f"${item['precio_actual']} → ${item['precio_nuevo']} "
+                f"(subtotal ${item['subtotal_actual']} → ${item['subtotal_nuevo']})"
+            )
+        for cot in previa['cotizaciones']:
+            self.stdout.write(
+                f"📄 {cot['numero']}: total ${cot['valor_total_actual']} → ${cot['valor_total_nuevo']} "
+                f"({cot['diferencia']:+})"
+            )
+
+        if not options['aplicar']:
+            self.stdout.write(
+                f"🔎 {len(previa['items'])} items en {len(previa['cotizaciones'])} cotizaciones. "
+                f"Ejecutar con --aplicar para guardar."
+            )
+            return
+
+        resultado = aplicar_reprecio(servicios, materiales)
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {resultado['items']} items actualizados en {resultado['cotizaciones']} cotizaciones"
+        ))
+
+# EJECUTAR CON (vista previa):
+# python manage.py repreciar_cotizaciones
+
+# APLICAR (por ejemplo tras actualizar la lista de precios de un proveedor):
+# python manage.py repreciar_cotizaciones --solo-materiales --aplicar
+# python manage.py repreciar_cotizaciones --material 12 --material 15 --aplicar
@@ -0,0 +1,58 @@
+# Generated by Django 5.2.6 on 2026-10-18 03:43
+
+from zoneinfo import ZoneInfo
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncMonth
+
+
+def poblar_resumen(apps, schema_editor):
+    Cotizacion = apps.get_model('cotizaciones', 'Cotizacion')
+    ResumenMensualCotizacion = apps.get_model('cotizaciones', 'ResumenMensualCotizacion')
+
+    stats = Cotizacion.objects.annotate(
+        mes_creacion=TruncMonth('fecha_creacion', tzinfo=ZoneInfo('America/Santiago'))
+    ).order_by().values('mes_creacion', 'estado').annotate(
+        cantidad=Count('id'),
+        valor=Sum('valor_total')
+    )
+
+    ResumenMensualCotizacion.objects.bulk_create([
+        ResumenMensualCotizacion(
+            anio=s['mes_creacion'].year,
+            mes=s['mes_creacion'].month,
+            estado=s['estado'],
+            cantidad=s['cantidad'],
+            valor_total=s['valor'] or 0
+        )
+        for s in stats
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cotizaciones', '0023_alter_evidenciatrabajo_imagen'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumenMensualCotizacion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('anio', models.PositiveSmallIntegerField(verbose_name='Año')),
+                ('mes', models.PositiveSmallIntegerField(verbose_name='Mes')),
+                ('estado', models.CharField(choices=[('borrador', 'Borrador'), ('enviada', 'Enviada'), ('revisada', 'En Revisión'), ('aprobada', 'Aprobada'), ('rechazada', 'Rechazada'), ('requiere_cambios', 'Requiere Cambios'), ('vencida', 'Vencida'), ('finalizada', 'Finalizada')], max_length=20)),
+                ('cantidad', models.PositiveIntegerField(default=0)),
+                ('valor_total', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('fecha_actualizacion', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Resumen Mensual de Cotizaciones',
+                'verbose_name_plural': 'Resúmenes Mensuales de Cotizaciones',
+                'ordering': ['anio', 'mes', 'estado'],
+                'unique_together': {('anio', 'mes', 'estado')},
+            },
+        ),
+        migrations.RunPython(poblar_resumen, migrations.RunPython.noop),
+    ]
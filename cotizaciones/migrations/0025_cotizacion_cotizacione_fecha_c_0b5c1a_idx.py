@@ -0,0 +1,19 @@
+# Generated by Django 5.2.6 on 2026-10-18 03:44
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cotizaciones', '0024_resumenmensualcotizacion'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='cotizacion',
+            index=models.Index(fields=['fecha_creacion', 'estado'], name='cotizacione_fecha_c_0b5c1a_idx'),
+        ),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 5.2.6 on 2026-10-18 03:49
+
+from zoneinfo import ZoneInfo
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import Coalesce, TruncMonth
+
+
+def poblar_productividad(apps, schema_editor):
+    TrabajoEmpleado = apps.get_model('cotizaciones', 'TrabajoEmpleado')
+    ProductividadMensualEmpleado = apps.get_model('cotizaciones', 'ProductividadMensualEmpleado')
+
+    stats = TrabajoEmpleado.objects.annotate(
+        mes_trabajo=TruncMonth(
+            Coalesce('fecha_fin', 'fecha_inicio', 'cotizacion__fecha_creacion'),
+            tzinfo=ZoneInfo('America/Santiago')
+        )
+    ).order_by().values('empleado_id', 'mes_trabajo').annotate(
+        asignados=Count('id'),
+        completados=Count('id', filter=Q(estado='completado')),
+        horas=Sum('horas_trabajadas')
+    )
+
+    ProductividadMensualEmpleado.objects.bulk_create([
+        ProductividadMensualEmpleado(
+            empleado_id=s['empleado_id'],
+            anio=s['mes_trabajo'].year,
+            mes=s['mes_trabajo'].month,
+            trabajos_asignados=s['asignados'],
+            trabajos_completados=s['completados'],
+            horas_trabajadas=s['horas'] or 0
+        )
+        for s in stats
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cotizaciones', '0025_cotizacion_cotizacione_fecha_c_0b5c1a_idx'),
+        ('home', '0005_perfilempleado_expo_push_token'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductividadMensualEmpleado',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('anio', models.PositiveSmallIntegerField(verbose_name='Año')),
+                ('mes', models.PositiveSmallIntegerField(verbose_name='Mes')),
+                ('trabajos_asignados', models.PositiveIntegerField(default=0)),
+                ('trabajos_completados', models.PositiveIntegerField(default=0)),
+                ('horas_trabajadas', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('fecha_actualizacion', models.DateTimeField(auto_now=True)),
+                ('empleado', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='productividad_mensual', to='home.perfilempleado')),
+            ],
+            options={
+                'verbose_name': 'Productividad Mensual de Empleado',
+                'verbose_name_plural': 'Productividad Mensual de Empleados',
+                'ordering': ['empleado', 'anio', 'mes'],
+                'unique_together': {('empleado', 'anio', 'mes')},
+            },
+        ),
+        migrations.RunPython(poblar_productividad, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.6 on 2026-10-18 04:00
+
+import cotizaciones.models
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cotizaciones', '0026_productividadmensualempleado'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SolicitudExportacion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('cotizaciones', 'Cotizaciones'), ('trabajos', 'Seguimiento de Trabajos')], max_length=20)),
+                ('formato', models.CharField(choices=[('excel', 'Excel'), ('csv', 'CSV')], default='excel', max_length=10)),
+                ('parametros', models.JSONField(blank=True, default=dict, help_text='Filtros de la exportación')),
+                ('estado', models.CharField(choices=[('pendiente', 'Pendiente'), ('procesando', 'Procesando'), ('completada', 'Completada'), ('error', 'Error')], default='pendiente', max_length=20)),
+                ('total_filas', models.PositiveIntegerField(blank=True, null=True)),
+                ('filas_procesadas', models.PositiveIntegerField(default=0)),
+                ('archivo', models.FileField(blank=True, storage=cotizaciones.models.almacenamiento_exportaciones, upload_to='exportaciones/%Y/%m/')),
+                ('error', models.TextField(blank=True)),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True)),
+                ('fecha_inicio', models.DateTimeField(blank=True, null=True)),
+                ('fecha_fin', models.DateTimeField(blank=True, null=True)),
+                ('solicitado_por', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Solicitud de Exportación',
+                'verbose_name_plural': 'Solicitudes de Exportación',
+                'ordering': ['-fecha_creacion'],
+                'indexes': [models.Index(fields=['estado', 'fecha_creacion'], name='cotizacione_estado_bc3ca8_idx')],
+            },
+        ),
+    ]
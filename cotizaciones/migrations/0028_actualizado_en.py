@@ -0,0 +1,51 @@
+# Generated by Django 5.2.6 on 2026-10-18 04:10
+
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import F
+
+
+def inicializar_actualizado_en(apps, schema_editor):
+    # Las cotizaciones existentes toman su fecha de creación, así la primera
+    # lectura del feed de cambios las recorre en orden histórico
+    Cotizacion = apps.get_model('cotizaciones', 'Cotizacion')
+    Cotizacion.objects.update(actualizado_en=F('fecha_creacion'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cotizaciones', '0027_solicitudexportacion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cotizacion',
+            name='actualizado_en',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now, verbose_name='Última Actualización'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='itemservicio',
+            name='actualizado_en',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='itemmaterial',
+            name='actualizado_en',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='itemmanoobra',
+            name='actualizado_en',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddIndex(
+            model_name='cotizacion',
+            index=models.Index(fields=['actualizado_en', 'id'], name='cotizacione_actuali_c75c9d_idx'),
+        ),
+        migrations.RunPython(inicializar_actualizado_en, migrations.RunPython.noop),
+    ]
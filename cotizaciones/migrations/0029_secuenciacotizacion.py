@@ -0,0 +1,24 @@
+# Generated by Django 5.2.6 on 2026-10-18 04:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cotizaciones', '0028_actualizado_en'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SecuenciaCotizacion',
+            fields=[
+                ('anio', models.PositiveIntegerField(primary_key=True, serialize=False)),
+                ('ultimo', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Secuencia de Cotizaciones',
+                'verbose_name_plural': 'Secuencias de Cotizaciones',
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-18 04:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cotizaciones', '0029_secuenciacotizacion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='solicitudexportacion',
+            name='ultima_actividad',
+            field=models.DateTimeField(blank=True, help_text='Última señal del worker mientras genera el archivo', null=True),
+        ),
+    ]
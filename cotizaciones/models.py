@@ -1,6 +1,8 @@
-from django.db import models
+from django.db import models, transaction, IntegrityError
+from django.db.models.functions import Coalesce
 from django.contrib.auth.models import User
 from django.core.validators import MinValueValidator
+from django.core.files.storage import FileSystemStorage
 from decimal import Decimal
 from django.utils import timezone
 from datetime import datetime, timedelta
@@ -300,6 +302,49 @@ class Material(models.Model):
             }
         return {'prestado': False}
 
+class SecuenciaCotizacion(models.Model):
+    """
+    Último correlativo de cotización usado en cada año. Lo usan todas las
+    formas de crear cotizaciones (Cotizacion.generar_numero), así dos
+    creaciones simultáneas nunca obtienen el mismo número.
+    """
+    anio = models.PositiveIntegerField(primary_key=True)
+    ultimo = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Secuencia de Cotizaciones"
+        verbose_name_plural = "Secuencias de Cotizaciones"
+
+    def __str__(self):
+        return f"{self.anio}: {self.ultimo}"
+
+    @classmethod
+    def siguiente(cls, anio):
+        """
+        Reserva y retorna el siguiente correlativo del año. El UPDATE con F()
+        incrementa en la base de datos y bloquea la fila hasta el fin de la
+        transacción: si la cotización no llega a guardarse, el correlativo
+        vuelve atrás junto con ella.
+        """
+        with transaction.atomic():
+            if not cls.objects.filter(anio=anio).update(ultimo=models.F('ultimo') + 1):
+                # Primer número del año en este sistema: partir desde el mayor ya usado
+                usados = Cotizacion.objects.filter(
+                    numero__startswith=f"{anio}-"
+                ).values_list('numero', flat=True)
+                ultimo = max(
+                    (int(numero.split('-')[-1]) for numero in usados if numero.split('-')[-1].isdigit()),
+                    default=0
+                )
+                try:
+                    with transaction.atomic():
+                        cls.objects.create(anio=anio, ultimo=ultimo + 1)
+                except IntegrityError:
+                    # Otro proceso creó la fila del año al mismo tiempo
+                    cls.objects.filter(anio=anio).update(ultimo=models.F('ultimo') + 1)
+
+            return cls.objects.get(anio=anio).ultimo
+
 class Cotizacion(models.Model):
     ESTADO_CHOICES = [
         ('borrador', 'Borrador'),
@@ -329,6 +374,7 @@ class Cotizacion(models.Model):
     fecha_finalizacion = models.DateTimeField(blank=True, null=True,verbose_name="Fecha de Finalización",help_text="Fecha en que se completó el trabajo")
     feedback_solicitado = models.BooleanField(default=False,verbose_name="Feedback Solicitado",help_text="Indica si ya se envió el correo de feedback al cliente")
     fecha_feedback = models.DateTimeField(blank=True,null=True,verbose_name="Fecha de Solicitud de Feedback",help_text="Fecha en que se envió la solicitud de feedback")   
+    actualizado_en = models.DateTimeField(auto_now=True, verbose_name="Última Actualización")
     
     estado = models.CharField(max_length=20, choices=ESTADO_CHOICES, default='borrador')
     
@@ -354,13 +400,22 @@ class Cotizacion(models.Model):
 
     class Meta:
         ordering = ['-fecha_creacion']
+        indexes = [
+            # Rangos [inicio, fin) de los reportes por período (y estado)
+            models.Index(fields=['fecha_creacion', 'estado']),
+            # Feed de cambios: recorrido por (actualizado_en, id)
+            models.Index(fields=['actualizado_en', 'id']),
+        ]
 
     def save(self, *args, **kwargs):
-        # Guardar nombre del cliente como respaldo antes de guardar
-        if self.cliente:
+        # Guardar nombre del cliente como respaldo antes de guardar (no en
+        # guardados acotados que no lo incluyen: evita leer cliente y representante)
+        update_fields = kwargs.get('update_fields')
+        
+        if (update_fields is None or 'cliente_nombre_respaldo' in update_fields) and self.cliente:
             self.cliente_nombre_respaldo = self.cliente.nombre
         
-        if self.representante:
+        if (update_fields is None or 'representante_nombre_respaldo' in update_fields) and self.representante:
             self.representante_nombre_respaldo = self.representante.nombre
         
         # ⭐ DEBUG: Imprimir antes de guardar
@@ -368,7 +423,14 @@ class Cotizacion(models.Model):
         print(f"   - fecha_realizacion: {self.fecha_realizacion}")
         print(f"   - fecha_finalizacion: {self.fecha_finalizacion}")
         
-        super().save(*args, **kwargs)
+        if self._state.adding and not self.numero:
+            # El número y la fila se guardan juntos: si el INSERT falla, el
+            # correlativo reservado se libera con el rollback
+            with transaction.atomic():
+                self.generar_numero()
+                super().save(*args, **kwargs)
+        else:
+            super().save(*args, **kwargs)
         
         # ⭐ DEBUG: Imprimir después de guardar
         print(f"✅ GUARDADO OK - ID: {self.pk}")
@@ -388,21 +450,36 @@ class Cotizacion(models.Model):
     def __str__(self):
         return f"Cotización {self.numero} - {self.get_nombre_cliente()}"
 
-    def calcular_totales(self):
-        # Calcular subtotales de servicios
-        self.subtotal_servicios = sum(
-            item.subtotal for item in self.items_servicio.all()
+    # Campos que escribe calcular_totales (guardado acotado con update_fields)
+    CAMPOS_TOTALES = [
+        'subtotal_servicios', 'subtotal_materiales', 'subtotal_mano_obra', 'gastos_traslado',
+        'valor_neto', 'valor_iva', 'valor_total', 'actualizado_en',
+    ]
+
+    @staticmethod
+    def _suma_subtotales(modelo):
+        """Subconsulta: suma de subtotal de los items `modelo` de la cotización"""
+        suma = modelo.objects.filter(
+            cotizacion=models.OuterRef('pk')
+        ).order_by().values('cotizacion').annotate(total=models.Sum('subtotal')).values('total')
+        return Coalesce(
+            models.Subquery(suma),
+            Decimal('0'),
+            output_field=models.DecimalField(max_digits=12, decimal_places=2)
         )
+
+    def calcular_totales(self):
+        # Subtotales de servicios, materiales y mano de obra sumados por la
+        # base de datos en una sola consulta (sin cargar los items)
+        subtotales = Cotizacion.objects.filter(pk=self.pk).values(
+            servicios=self._suma_subtotales(ItemServicio),
+            materiales=self._suma_subtotales(ItemMaterial),
+            mano_obra=self._suma_subtotales(ItemManoObra),
+        ).get()
         
-        # Calcular subtotales de materiales
-        self.subtotal_materiales = sum(
-            item.subtotal for item in self.items_material.all()
-        )
-        
-        # Calcular subtotales de mano de obra
-        self.subtotal_mano_obra = sum(
-            item.subtotal for item in self.items_mano_obra.all()
-        )
+        self.subtotal_servicios = subtotales['servicios']
+        self.subtotal_materiales = subtotales['materiales']
+        self.subtotal_mano_obra = subtotales['mano_obra']
         
         # Calcular valor neto
         self.valor_neto = (
@@ -418,21 +495,13 @@ class Cotizacion(models.Model):
         # Calcular total
         self.valor_total = self.valor_neto + self.valor_iva
         
-        self.save()
+        self.save(update_fields=self.CAMPOS_TOTALES)
 
     def generar_numero(self):
+        """Asigna el número AAAA-NNNN; save() lo llama al crear la cotización"""
         if not self.numero:
-            ultimo_numero = Cotizacion.objects.filter(
-                numero__startswith=f"{self.fecha_creacion.year}"
-            ).order_by('-numero').first()
-            
-            if ultimo_numero:
-                ultimo_num = int(ultimo_numero.numero.split('-')[-1])
-                nuevo_num = ultimo_num + 1
-            else:
-                nuevo_num = 1
-                
-            self.numero = f"{self.fecha_creacion.year}-{nuevo_num:04d}"
+            anio = timezone.localtime(self.fecha_creacion or timezone.now()).year
+            self.numero = f"{anio}-{SecuenciaCotizacion.siguiente(anio):04d}"
     
     # NUEVOS MÉTODOS PARA EMAIL
     def generar_token(self):
@@ -775,6 +844,7 @@ class ItemServicio(models.Model):
     precio_unitario = models.DecimalField(max_digits=10, decimal_places=2, validators=[MinValueValidator(0)])
     subtotal = models.DecimalField(max_digits=12, decimal_places=2, default=0)
     orden = models.IntegerField(default=0)
+    actualizado_en = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['orden']
@@ -806,6 +876,7 @@ class ItemMaterial(models.Model):
         verbose_name='Horas de Uso',
         help_text='Horas de uso estimadas para materiales con mantenimiento por horas'
     )
+    actualizado_en = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['material__categoria', 'material__nombre']
@@ -820,6 +891,7 @@ class ItemManoObra(models.Model):
     horas = models.DecimalField(max_digits=8, decimal_places=2, validators=[MinValueValidator(0)])
     precio_hora = models.DecimalField(max_digits=10, decimal_places=2, validators=[MinValueValidator(0)])
     subtotal = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    actualizado_en = models.DateTimeField(auto_now=True)
 
     def save(self, *args, **kwargs):
         self.subtotal = self.horas * self.precio_hora
@@ -1265,33 +1337,14 @@ class Solicitud_Web(models.Model):
     def convertir_a_cotizacion(self, usuario, cliente, tipo_trabajo):
         from django.utils import timezone
         
-        # Generar número de cotización
-        anio_actual = timezone.now().year
         from cotizaciones.models import Cotizacion
         
-        ultima_cotizacion = Cotizacion.objects.filter(
-            numero__startswith=f'{anio_actual}-'
-        ).exclude(
-            numero__isnull=True
-        ).order_by('-numero').first()
-        
-        if ultima_cotizacion and ultima_cotizacion.numero:
-            try:
-                ultimo_numero = int(ultima_cotizacion.numero.split('-')[1])
-                nuevo_numero = ultimo_numero + 1
-            except (ValueError, IndexError):
-                nuevo_numero = 1
-        else:
-            nuevo_numero = 1
-        
-        numero_cotizacion = f'{anio_actual}-{nuevo_numero:04d}'
-        
         # Preparar observaciones con datos de la solicitud
         observaciones = self.informacion_adicional
         
         # Crear cotización (sin modificar nada existente)
+        # El número se asigna al guardar (SecuenciaCotizacion)
         cotizacion = Cotizacion.objects.create(
-            numero=numero_cotizacion,
             cliente=cliente,
             cliente_nombre_respaldo=cliente.nombre,
             tipo_trabajo=tipo_trabajo,
@@ -1421,4 +1474,119 @@ class GastoTrabajo(models.Model):
         verbose_name_plural = 'Gastos de Trabajos'
     
     def __str__(self):
-        return f"Gastos - Trabajo {self.trabajo.id} - Total: ${self.total}"
\ No newline at end of file
+        return f"Gastos - Trabajo {self.trabajo.id} - Total: ${self.total}"
+# ============================================================
+# REPORTES - RESUMEN PRECALCULADO
+# ============================================================
+
+class ResumenMensualCotizacion(models.Model):
+    """
+    Resumen precalculado de cotizaciones por mes y estado.
+    Se mantiene actualizado desde signals.py y se reconstruye con
+    el comando reconstruir_resumen_reportes.
+    """
+    anio = models.PositiveSmallIntegerField(verbose_name='Año')
+    mes = models.PositiveSmallIntegerField(verbose_name='Mes')
+    estado = models.CharField(max_length=20, choices=Cotizacion.ESTADO_CHOICES)
+    cantidad = models.PositiveIntegerField(default=0)
+    valor_total = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    fecha_actualizacion = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('anio', 'mes', 'estado')
+        ordering = ['anio', 'mes', 'estado']
+        verbose_name = 'Resumen Mensual de Cotizaciones'
+        verbose_name_plural = 'Resúmenes Mensuales de Cotizaciones'
+
+    def __str__(self):
+        return f"{self.mes:02d}/{self.anio} - {self.get_estado_display()}: {self.cantidad}"
+
+
+class ProductividadMensualEmpleado(models.Model):
+    """
+    Resumen precalculado de trabajos por empleado y mes.
+    El mes de cada trabajo es el de su fecha de fin, o de inicio, o el de
+    creación de la cotización si todavía no empieza.
+    Se mantiene actualizado desde signals.py al guardar TrabajoEmpleado.
+    """
+    empleado = models.ForeignKey(
+        'home.PerfilEmpleado',
+        on_delete=models.CASCADE,
+        related_name='productividad_mensual'
+    )
+    anio = models.PositiveSmallIntegerField(verbose_name='Año')
+    mes = models.PositiveSmallIntegerField(verbose_name='Mes')
+    trabajos_asignados = models.PositiveIntegerField(default=0)
+    trabajos_completados = models.PositiveIntegerField(default=0)
+    horas_trabajadas = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    fecha_actualizacion = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('empleado', 'anio', 'mes')
+        ordering = ['empleado', 'anio', 'mes']
+        verbose_name = 'Productividad Mensual de Empleado'
+        verbose_name_plural = 'Productividad Mensual de Empleados'
+
+    def __str__(self):
+        return f"{self.empleado.nombre_completo} - {self.mes:02d}/{self.anio}: {self.trabajos_completados}/{self.trabajos_asignados}"
+
+
+def almacenamiento_exportaciones():
+    """Los archivos exportados se guardan en disco local (MEDIA_ROOT)"""
+    return FileSystemStorage()
+
+
+class SolicitudExportacion(models.Model):
+    """
+    Exportación pesada encolada desde la web y generada por el worker
+    `procesar_exportaciones`, fuera del ciclo de la petición.
+    """
+    TIPO_CHOICES = [
+        ('cotizaciones', 'Cotizaciones'),
+        ('trabajos', 'Seguimiento de Trabajos'),
+    ]
+
+    FORMATO_CHOICES = [
+        ('excel', 'Excel'),
+        ('csv', 'CSV'),
+    ]
+
+    ESTADO_CHOICES = [
+        ('pendiente', 'Pendiente'),
+        ('procesando', 'Procesando'),
+        ('completada', 'Completada'),
+        ('error', 'Error'),
+    ]
+
+    tipo = models.CharField(max_length=20, choices=TIPO_CHOICES)
+    formato = models.CharField(max_length=10, choices=FORMATO_CHOICES, default='excel')
+    parametros = models.JSONField(default=dict, blank=True, help_text='Filtros de la exportación')
+    estado = models.CharField(max_length=20, choices=ESTADO_CHOICES, default='pendiente')
+    total_filas = models.PositiveIntegerField(null=True, blank=True)
+    filas_procesadas = models.PositiveIntegerField(default=0)
+    archivo = models.FileField(upload_to='exportaciones/%Y/%m/', storage=almacenamiento_exportaciones, blank=True)
+    error = models.TextField(blank=True)
+    solicitado_por = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    fecha_creacion = models.DateTimeField(auto_now_add=True)
+    fecha_inicio = models.DateTimeField(null=True, blank=True)
+    ultima_actividad = models.DateTimeField(
+        null=True, blank=True, help_text='Última señal del worker mientras genera el archivo'
+    )
+    fecha_fin = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-fecha_creacion']
+        indexes = [models.Index(fields=['estado', 'fecha_creacion'])]
+        verbose_name = 'Solicitud de Exportación'
+        verbose_name_plural = 'Solicitudes de Exportación'
+
+    def __str__(self):
+        return f"{self.get_tipo_display()} ({self.get_formato_display()}) - {self.get_estado_display()}"
+
+    def get_porcentaje(self):
+        """Avance de la exportación (0-100)"""
+        if self.estado == 'completada':
+            return 100
+        if not self.total_filas:
+            return 0
+        return min(int(self.filas_procesadas * 100 / self.total_filas), 99)
@@ -1,6 +1,11 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
-from .models import Material
+from django.utils import timezone
+from .models import Material, Cotizacion, ItemServicio, ItemMaterial, ItemManoObra, TrabajoEmpleado
+from .utils_reportes import recalcular_resumen_mes, recalcular_productividad_empleado
+from .utils_periodos import ZONA_REPORTES
+from .utils_cache import invalidar_reportes_al_confirmar
+from .utils_pdf import eliminar_pdfs_cotizacion
 
 
 @receiver(post_save, sender=Material)
@@ -42,7 +47,66 @@ def resetear_estado_en_cambio_mantenimiento(sender, instance, created, **kwargs)
         pass
 
 
+@receiver(post_save, sender=Cotizacion)
+@receiver(post_delete, sender=Cotizacion)
+def actualizar_resumen_mensual(sender, instance, **kwargs):
+    """
+    Mantiene al día el resumen mensual de reportes cuando una cotización
+    se crea, cambia de estado/valor o se elimina.
+
+    Solo recalcula el mes de creación de la cotización (una consulta agrupada
+    por estado), por lo que el costo no crece con el historial.
+    """
+    if not instance.fecha_creacion:
+        return
 
+    fecha = timezone.localtime(instance.fecha_creacion, ZONA_REPORTES)
+    recalcular_resumen_mes(fecha.year, fecha.month)
+
+
+@receiver(post_save, sender=Cotizacion)
+@receiver(post_delete, sender=Cotizacion)
+@receiver(post_save, sender=ItemServicio)
+@receiver(post_delete, sender=ItemServicio)
+def invalidar_cache_reportes(sender, instance, **kwargs):
+    """
+    Invalida las respuestas cacheadas de los endpoints de reportes cuando
+    cambia una cotización o sus servicios. La versión se publica al
+    confirmar la transacción para no cachear datos todavía no visibles.
+    """
+    invalidar_reportes_al_confirmar()
 
 
+@receiver(post_delete, sender=Cotizacion)
+def eliminar_pdfs_guardados(sender, instance, **kwargs):
+    """Borra del disco los PDFs generados de una cotización eliminada"""
+    eliminar_pdfs_cotizacion(instance.pk)
 
+
+@receiver(post_save, sender=ItemServicio)
+@receiver(post_delete, sender=ItemServicio)
+@receiver(post_save, sender=ItemMaterial)
+@receiver(post_delete, sender=ItemMaterial)
+@receiver(post_save, sender=ItemManoObra)
+@receiver(post_delete, sender=ItemManoObra)
+def marcar_cotizacion_actualizada(sender, instance, **kwargs):
+    """
+    Marca la cotización como modificada cuando cambian sus items, para que
+    el feed de cambios la vuelva a entregar con sus items vigentes (así
+    también se reflejan los items eliminados). Es un UPDATE de una fila,
+    sin pasar por Cotizacion.save().
+    """
+    Cotizacion.objects.filter(pk=instance.cotizacion_id).update(actualizado_en=timezone.now())
+
+
+@receiver(post_save, sender=TrabajoEmpleado)
+@receiver(post_delete, sender=TrabajoEmpleado)
+def actualizar_productividad_empleado(sender, instance, **kwargs):
+    """
+    Mantiene al día la productividad mensual del empleado cuando uno de
+    sus trabajos se asigna, avanza, se completa o se elimina. El ranking
+    del dashboard lee esa tabla, así que también invalida el caché de
+    reportes.
+    """
+    recalcular_productividad_empleado(instance.empleado_id)
+    invalidar_reportes_al_confirmar()
@@ -0,0 +1,102 @@
+// Exportaciones en segundo plano: se encola la exportación, se consulta su
+// avance cada pocos segundos y al terminar se descarga el archivo.
+
+const URL_SOLICITAR_EXPORTACION = '/cotizaciones/exportaciones/solicitar/';
+const INTERVALO_ESTADO_EXPORTACION = 2000;
+
+function tokenExportacion() {
+    const metaToken = document.querySelector('meta[name="csrf-token"]');
+    if (metaToken) {
+        return metaToken.getAttribute('content');
+    }
+    const cookie = document.cookie.split(';').map(c => c.trim()).find(c => c.startsWith('csrftoken='));
+    return cookie ? decodeURIComponent(cookie.substring('csrftoken='.length)) : '';
+}
+
+function avisoExportacion(texto) {
+    let aviso = document.getElementById('aviso-exportacion');
+    if (!aviso) {
+        aviso = document.createElement('div');
+        aviso.id = 'aviso-exportacion';
+        aviso.style.cssText = 'position: fixed; bottom: 20px; right: 20px; z-index: 2000; ' +
+            'padding: 12px 18px; border-radius: 8px; background: #2575C0; color: #fff; ' +
+            'box-shadow: 0 4px 12px rgba(0,0,0,0.2); font-size: 14px;';
+        document.body.appendChild(aviso);
+    }
+    aviso.textContent = texto;
+    aviso.style.display = texto ? 'block' : 'none';
+}
+
+async function solicitarExportacion(tipo, formato, filtros = {}) {
+    document.querySelectorAll('.export-menu').forEach(menu => {
+        menu.style.display = 'none';
+    });
+
+    const datos = new FormData();
+    datos.append('tipo', tipo);
+    datos.append('formato', formato);
+    Object.entries(filtros).forEach(([clave, valor]) => {
+        if (valor) {
+            datos.append(clave, valor);
+        }
+    });
+
+    try {
+        avisoExportacion('📥 Preparando exportación...');
+        const response = await fetch(URL_SOLICITAR_EXPORTACION, {
+            method: 'POST',
+            headers: {
+                'X-CSRFToken': tokenExportacion()
+            },
+            body: datos
+        });
+        const result = await response.json();
+
+        if (!result.success) {
+            avisoExportacion('');
+            alert('Error: ' + result.error);
+            return;
+        }
+
+        seguirExportacion(result.urlEstado);
+    } catch (error) {
+        console.error('Error solicitando exportación:', error);
+        avisoExportacion('');
+        alert('Error al solicitar la exportación');
+    }
+}
+
+async function seguirExportacion(urlEstado) {
+    try {
+        const response = await fetch(urlEstado);
+        const estado = await response.json();
+
+        if (!estado.success) {
+            avisoExportacion('');
+            alert('Error: ' + estado.error);
+            return;
+        }
+
+        if (estado.estado === 'completada') {
+            avisoExportacion(`✅ Exportación lista (${estado.filasProcesadas} filas)`);
+            window.location.href = estado.urlDescarga;
+            setTimeout(() => avisoExportacion(''), 4000);
+            return;
+        }
+
+        if (estado.estado === 'error') {
+            avisoExportacion('');
+            alert('Error en la exportación: ' + estado.error);
+            return;
+        }
+
+        const avance = estado.totalFilas
+            ? `${estado.porcentaje}% (${estado.filasProcesadas} de ${estado.totalFilas} filas)`
+            : estado.estadoDisplay;
+        avisoExportacion(`📥 Generando exportación... ${avance}`);
+        setTimeout(() => seguirExportacion(urlEstado), INTERVALO_ESTADO_EXPORTACION);
+    } catch (error) {
+        console.error('Error consultando exportación:', error);
+        setTimeout(() => seguirExportacion(urlEstado), INTERVALO_ESTADO_EXPORTACION);
+    }
+}
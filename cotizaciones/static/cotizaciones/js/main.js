@@ -320,6 +320,34 @@ async function agregarManoObra() {
     }
 }
 
+// Agregar varios items en una sola petición
+// items: [{tipo: 'servicio' | 'material' | 'mano_obra', ...campos del item}]
+async function agregarItemsLote(items) {
+    const cotizacionId = window.cotizacionId;
+    if (!cotizacionId) {
+        alert('Error: No se encontró ID de cotización');
+        return;
+    }
+
+    try {
+        const result = await hacerPeticionAjax(`/cotizaciones/${cotizacionId}/items/lote/`, 'POST', {
+            items: items
+        });
+
+        if (result.success) {
+            location.reload();
+        } else {
+            const detalle = (result.errores || [])
+                .map(e => `Item ${e.indice + 1}: ${e.error}`)
+                .join('\n');
+            alert('Error: ' + result.error + (detalle ? '\n' + detalle : ''));
+        }
+    } catch (error) {
+        console.error('Error agregando items:', error);
+        alert('Error al agregar los items');
+    }
+}
+
 // Eliminar items
 async function eliminarItem(tipo, itemId) {
     const cotizacionId = window.cotizacionId;
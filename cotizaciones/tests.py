@@ -0,0 +1,247 @@
+import io
+import os
+import shutil
+import tempfile
+import zipfile
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest import mock
+
+import numpy as np
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from home.models import PerfilEmpleado
+from .models import Cliente, Cotizacion, RepresentanteCliente, SolicitudExportacion, TipoTrabajo
+from .utils_analitica import pronosticar
+from .utils_exportacion_diferida import (
+    TIEMPO_SIN_ACTIVIDAD_EXPORTACION, tomar_siguiente_exportacion, procesar_exportacion,
+)
+from .utils_pdf import abrir_pdf_cotizacion
+
+
+class PronosticoTests(SimpleTestCase):
+
+    def _meses(self, anios=3):
+        return np.arange(2022 * 12, (2022 + anios) * 12)
+
+    def test_mes_sin_valor_ganado_no_produce_nan(self):
+        # Febrero (índice 1) siempre en 0: su índice estacional es 0
+        indices = self._meses()
+        valores = np.where(indices % 12 == 1, 0.0, 100.0)
+        futuros = indices[-1] + 1 + np.arange(3)
+
+        pronostico = pronosticar(indices, valores, futuros)
+
+        self.assertFalse(np.isnan(pronostico).any())
+        np.testing.assert_allclose(pronostico, [100.0, 0.0, 100.0])
+
+    def test_serie_en_cero(self):
+        indices = self._meses()
+        futuros = indices[-1] + 1 + np.arange(3)
+
+        pronostico = pronosticar(indices, np.zeros(len(indices)), futuros)
+
+        np.testing.assert_array_equal(pronostico, [0.0, 0.0, 0.0])
+
+
+class ExportacionesAbandonadasTests(TestCase):
+
+    def test_sin_actividad_se_marca_con_error(self):
+        ahora = timezone.now()
+        sin_actividad = ahora - TIEMPO_SIN_ACTIVIDAD_EXPORTACION - timedelta(minutes=1)
+        abandonada = SolicitudExportacion.objects.create(
+            tipo='cotizaciones', estado='procesando',
+            fecha_inicio=sin_actividad, ultima_actividad=sin_actividad
+        )
+        # Larga pero con el worker vivo: no se toca
+        larga = SolicitudExportacion.objects.create(
+            tipo='cotizaciones', estado='procesando',
+            fecha_inicio=ahora - timedelta(hours=2), ultima_actividad=ahora - timedelta(minutes=1)
+        )
+        pendiente = SolicitudExportacion.objects.create(tipo='trabajos')
+
+        self.assertEqual(tomar_siguiente_exportacion().pk, pendiente.pk)
+
+        abandonada.refresh_from_db()
+        larga.refresh_from_db()
+        self.assertEqual(abandonada.estado, 'error')
+        self.assertTrue(abandonada.error)
+        self.assertIsNotNone(abandonada.fecha_fin)
+        self.assertEqual(larga.estado, 'procesando')
+
+    def test_worker_no_pisa_una_solicitud_cerrada(self):
+        SolicitudExportacion.objects.create(tipo='cotizaciones', formato='csv')
+        solicitud = tomar_siguiente_exportacion()
+        # Se dio por abandonada mientras el worker seguía escribiendo
+        SolicitudExportacion.objects.filter(pk=solicitud.pk).update(estado='error', error='Interrumpida')
+
+        carpeta = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, carpeta, ignore_errors=True)
+        with self.settings(MEDIA_ROOT=carpeta):
+            solicitud = procesar_exportacion(solicitud)
+
+        self.assertEqual(solicitud.estado, 'error')
+        self.assertEqual(SolicitudExportacion.objects.get(pk=solicitud.pk).estado, 'error')
+        # El archivo generado se descarta
+        self.assertEqual([archivos for _, _, archivos in os.walk(carpeta) if archivos], [])
+
+
+# Consultas por request: sesión, usuario y perfil (3) más las de la vista.
+# Dashboard: KPIs, serie mensual, top clientes, top servicios y ranking de
+# empleados; las ventanas móviles ('trimestre') suman el total histórico.
+CONSULTAS_DASHBOARD = {'mes-actual': 8, 'trimestre': 9}
+# Exportaciones de catálogo: una sola consulta de filas
+CONSULTAS_EXPORTAR_CATALOGO = 4
+
+# Cachés en memoria: la de reportes guardaría la respuesta del dashboard y
+# la segunda llamada no llegaría a la BD
+CACHES_PRUEBAS = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'pruebas-default'},
+    'reportes': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'pruebas-reportes'},
+    'perfiles': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'pruebas-perfiles'},
+}
+
+
+@override_settings(CACHES=CACHES_PRUEBAS)
+class ConsultasPorVistaTests(TestCase):
+    """
+    Cantidad de consultas de las vistas optimizadas. Debe ser la misma sin
+    importar cuántas filas haya; si una vista vuelve a consultar por fila,
+    estos tests fallan.
+    """
+
+    def setUp(self):
+        self.usuario = User.objects.create_user('gerente', password='x')
+        PerfilEmpleado.objects.create(
+            user=self.usuario, rut='11111111-1', cargo='gerente', fecha_ingreso=date(2020, 1, 1)
+        )
+        self.client.force_login(self.usuario)
+        self.tipo = TipoTrabajo.objects.create(nombre='Instalación')
+        self.cliente = Cliente.objects.create(nombre='ACME')
+
+    def _contenido(self, url, consultas):
+        """GET de `url` con las cachés vacías, leyendo la respuesta completa dentro de assertNumQueries"""
+        for alias in CACHES_PRUEBAS:
+            caches[alias].clear()
+        with self.assertNumQueries(consultas):
+            respuesta = self.client.get(url)
+            contenido = b''.join(respuesta.streaming_content) if respuesta.streaming else respuesta.content
+        self.assertEqual(respuesta.status_code, 200)
+        return contenido
+
+    def _cotizaciones(self, cantidad):
+        estados = [estado for estado, _ in Cotizacion.ESTADO_CHOICES]
+        for i in range(cantidad):
+            Cotizacion.objects.create(
+                cliente=self.cliente, tipo_trabajo=self.tipo, referencia=f'R{i}', lugar='Planta',
+                creado_por=self.usuario, estado=estados[i % len(estados)], valor_total=Decimal('100.00')
+            )
+
+    def _catalogo(self, cantidad):
+        for i in range(TipoTrabajo.objects.count(), cantidad):
+            TipoTrabajo.objects.create(nombre=f'Tipo {i:03d}', activo=i % 2 == 0)
+        for i in range(Cliente.objects.count(), cantidad):
+            cliente = Cliente.objects.create(nombre=f'Cliente {i:03d}', rut=f'{i}')
+            RepresentanteCliente.objects.create(cliente=cliente, nombre=f'Rep {i}')
+            RepresentanteCliente.objects.create(cliente=cliente, nombre=f'Rep {i}b')
+
+    def test_datos_dashboard_reportes(self):
+        url = reverse('cotizaciones:datos_dashboard_reportes')
+        for cantidad in (3, 30):
+            with self.subTest(cotizaciones=cantidad):
+                self._cotizaciones(cantidad - Cotizacion.objects.count())
+                for periodo in ('mes-actual', 'trimestre'):
+                    self._contenido(f'{url}?periodo={periodo}', CONSULTAS_DASHBOARD[periodo])
+
+    def test_exportar_tipos_trabajo(self):
+        url = reverse('cotizaciones:exportar_tipos_trabajo')
+        self._cotizaciones(5)
+        for cantidad in (3, 50):
+            with self.subTest(tipos=cantidad):
+                self._catalogo(cantidad)
+                self._contenido(f'{url}?formato=excel', CONSULTAS_EXPORTAR_CATALOGO)
+                csv = self._contenido(f'{url}?formato=csv', CONSULTAS_EXPORTAR_CATALOGO)
+                self.assertEqual(csv.decode('utf-8-sig').count('\n'), cantidad + 1)
+
+    def test_exportar_clientes(self):
+        url = reverse('cotizaciones:exportar_clientes')
+        for cantidad in (3, 50):
+            with self.subTest(clientes=cantidad):
+                self._catalogo(cantidad)
+                # Excel: clientes y representantes precargados por lote
+                self._contenido(f'{url}?formato=excel', CONSULTAS_EXPORTAR_CATALOGO + 1)
+                self._contenido(f'{url}?formato=csv', CONSULTAS_EXPORTAR_CATALOGO)
+
+
+class PdfCotizacionTests(TestCase):
+
+    def setUp(self):
+        carpeta = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, carpeta, ignore_errors=True)
+        ajustes = self.settings(PDF_COTIZACIONES_DIR=carpeta)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+
+        usuario = User.objects.create_user('vendedor', password='x')
+        self.cotizacion = Cotizacion.objects.create(
+            cliente=Cliente.objects.create(nombre='ACME'),
+            tipo_trabajo=TipoTrabajo.objects.create(nombre='Instalación'),
+            referencia='R', lugar='Planta', creado_por=usuario
+        )
+
+    def test_reutiliza_el_pdf_guardado(self):
+        with abrir_pdf_cotizacion(self.cotizacion) as primero:
+            contenido = primero.read()
+        with abrir_pdf_cotizacion(self.cotizacion) as segundo:
+            self.assertEqual(segundo.read(), contenido)
+        self.assertTrue(contenido.startswith(b'%PDF'))
+
+    def test_version_borrada_antes_de_abrir(self):
+        # Otra petición guardó una versión nueva y borró la que se iba a abrir
+        borrado = os.path.join(tempfile.gettempdir(), 'pdf-ya-borrado.pdf')
+        with mock.patch('cotizaciones.utils_pdf.pdf_guardado', return_value=borrado):
+            with abrir_pdf_cotizacion(self.cotizacion) as archivo:
+                self.assertTrue(archivo.read().startswith(b'%PDF'))
+
+
+@override_settings(CACHES=CACHES_PRUEBAS)
+class ExportarPdfsWebTests(TestCase):
+
+    def setUp(self):
+        carpeta = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, carpeta, ignore_errors=True)
+        ajustes = self.settings(PDF_COTIZACIONES_DIR=carpeta)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+
+        usuario = User.objects.create_user('gerente', password='x')
+        PerfilEmpleado.objects.create(user=usuario, rut='11111111-1', cargo='gerente', fecha_ingreso=date(2020, 1, 1))
+        self.client.force_login(usuario)
+        cliente = Cliente.objects.create(nombre='ACME')
+        tipo = TipoTrabajo.objects.create(nombre='Instalación')
+        for i in range(3):
+            Cotizacion.objects.create(
+                cliente=cliente, tipo_trabajo=tipo, referencia=f'R{i}', lugar='Planta',
+                creado_por=usuario, estado='aprobada'
+            )
+        self.url = reverse('cotizaciones:exportar_pdfs_cotizaciones')
+
+    def test_dibuja_en_el_proceso_de_la_peticion(self):
+        with mock.patch('cotizaciones.utils_pdf_lote.ProcessPoolExecutor', side_effect=AssertionError('pool en la web')):
+            respuesta = self.client.get(self.url)
+            contenido = b''.join(respuesta.streaming_content)
+
+        self.assertEqual(respuesta.status_code, 200)
+        with zipfile.ZipFile(io.BytesIO(contenido)) as archivo_zip:
+            self.assertEqual(len(archivo_zip.namelist()), 3)
+
+    def test_rechaza_lotes_sobre_el_tope(self):
+        with mock.patch('cotizaciones.views.documentos.MAXIMO_PDFS_WEB', 2):
+            respuesta = self.client.get(self.url)
+
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertIn('3 cotizaciones', respuesta.json()['error'])
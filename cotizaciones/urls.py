@@ -13,6 +13,7 @@ urlpatterns = [
     path('crear/', views.crear_cotizacion, name='crear'),
     path('<int:pk>/', views.detalle_cotizacion, name='detalle'),
     path('<int:pk>/editar/', views.editar_cotizacion, name='editar'),
+    path('<int:pk>/clonar/', views.clonar_cotizacion, name='clonar'),
     path('<int:pk>/pdf/', views.generar_pdf_cotizacion, name='generar_pdf'),
     path('<int:pk>/estado/', views.cambiar_estado_cotizacion, name='cambiar_estado'),
     path('<int:pk>/fecha-realizacion/', views.actualizar_fecha_realizacion, name='actualizar_fecha_realizacion'),
@@ -37,6 +38,7 @@ urlpatterns = [
     path('<int:cotizacion_pk>/item-servicio/', views.agregar_item_servicio, name='agregar_item_servicio'),
     path('<int:cotizacion_pk>/item-material/', views.agregar_item_material, name='agregar_item_material'),
     path('<int:cotizacion_pk>/item-mano-obra/', views.agregar_item_mano_obra, name='agregar_item_mano_obra'),
+    path('<int:cotizacion_pk>/items/lote/', views.agregar_items_lote, name='agregar_items_lote'),
     path('<int:cotizacion_pk>/gastos-traslado/', views.actualizar_gastos_traslado, name='actualizar_gastos_traslado'),
     
     # Eliminar items (AJAX)
@@ -55,6 +57,7 @@ urlpatterns = [
     path('clientes/', views.gestionar_clientes, name='gestionar_clientes'),
     path('servicios/', views.gestionar_servicios, name='gestionar_servicios'),
     path('materiales/', views.gestionar_materiales, name='gestionar_materiales'),
+    path('precios/repreciar/', views.repreciar_cotizaciones, name='repreciar_cotizaciones'),
     path('<int:pk>/eliminar/', views.eliminar_cotizacion, name='eliminar_cotizacion'),
     path('<int:pk>/completar/', views.completar_cotizacion, name='completar_cotizacion'),
 
@@ -137,6 +140,7 @@ urlpatterns = [
     # Resportes
     path('reportes/', views.reportes_dashboard, name='reportes_dashboard'),
     path('api/datos-dashboard/', views.datos_dashboard_reportes, name='datos_dashboard_reportes'),
+    path('api/analitica-reportes/', views.datos_analitica_reportes, name='datos_analitica_reportes'),
     path('api/cotizaciones-mes/', views.obtener_cotizaciones_mes, name='obtener_cotizaciones_mes'),
     path('api/empleado/', views.obtener_datos_empleado, name='obtener_datos_empleado'),
     
@@ -147,6 +151,11 @@ urlpatterns = [
     path('cotizaciones/exportar/', views.exportar_cotizaciones, name='exportar_cotizaciones'),
     path('tipos-trabajo/exportar/', views.exportar_tipos_trabajo, name='exportar_tipos_trabajo'),
     path('seguimiento-trabajos/exportar/', views.exportar_trabajos, name='exportar_trabajos'),
+    path('exportaciones/solicitar/', views.solicitar_exportacion, name='solicitar_exportacion'),
+    path('exportaciones/<int:solicitud_id>/estado/', views.estado_exportacion, name='estado_exportacion'),
+    path('exportaciones/<int:solicitud_id>/descargar/', views.descargar_exportacion, name='descargar_exportacion'),
+    path('cotizaciones/exportar/cambios/', views.exportar_cambios_cotizaciones, name='exportar_cambios_cotizaciones'),
+    path('cotizaciones/exportar/pdfs/', views.exportar_pdfs_cotizaciones, name='exportar_pdfs_cotizaciones'),
 
     # Sistema de Email
     path('<int:pk>/enviar-email/', views.enviar_cotizacion_email, name='enviar_email'),
@@ -0,0 +1,189 @@
+from datetime import datetime
+import numpy as np
+from django.utils import timezone
+from .utils_periodos import ZONA_REPORTES
+
+# Estados que cuentan como negocio ganado (aprobadas y ya finalizadas)
+ESTADOS_GANADOS = ('aprobada', 'finalizada')
+
+
+def _media_movil(valores, ventana):
+    """Media móvil simple; NaN mientras no hay `ventana` meses de historia"""
+    resultado = np.full(valores.shape, np.nan)
+    if len(valores) >= ventana:
+        acumulado = np.cumsum(np.insert(valores, 0, 0.0))
+        resultado[ventana - 1:] = (acumulado[ventana:] - acumulado[:-ventana]) / ventana
+    return resultado
+
+
+def _suma_movil(valores, ventana):
+    """Suma móvil; NaN mientras no hay `ventana` meses de historia"""
+    return _media_movil(valores, ventana) * ventana
+
+
+def _dividir(numerador, denominador):
+    """División elemento a elemento que deja NaN donde el denominador es 0"""
+    resultado = np.full(np.shape(numerador), np.nan)
+    np.divide(numerador, denominador, out=resultado, where=denominador != 0)
+    return resultado
+
+
+def _a_lista(valores, decimales=2):
+    """Convierte un arreglo a lista JSON (NaN -> None)"""
+    return [None if np.isnan(v) else round(float(v), decimales) for v in valores]
+
+
+def _etiqueta(indice_mes):
+    anio, mes = divmod(int(indice_mes), 12)
+    return datetime(anio, mes + 1, 1).strftime('%b %y')
+
+
+def series_mensuales(hasta):
+    """
+    Lee el resumen mensual completo en arreglos, desde el primer mes con
+    datos hasta `hasta` (anio, mes) inclusive. Los meses sin cotizaciones
+    quedan en 0.
+
+    Returns:
+        (indices, cantidad, valor, aprobadas, valor_ganado) - `indices` es
+        anio * 12 + (mes - 1) de cada posición.
+    """
+    from .models import ResumenMensualCotizacion
+
+    filas = np.array(
+        list(ResumenMensualCotizacion.objects.values_list('anio', 'mes', 'cantidad', 'valor_total', 'estado')),
+        dtype=object
+    )
+    fin = hasta[0] * 12 + hasta[1] - 1
+    if not len(filas):
+        return np.array([fin]), np.zeros(1), np.zeros(1), np.zeros(1), np.zeros(1)
+
+    indice_filas = filas[:, 0].astype(int) * 12 + filas[:, 1].astype(int) - 1
+    inicio = min(int(indice_filas.min()), fin)
+    posiciones = indice_filas - inicio
+    dentro = posiciones <= fin - inicio
+    posiciones = posiciones[dentro]
+    cantidades = filas[dentro, 2].astype(float)
+    valores = filas[dentro, 3].astype(float)
+    ganadas = np.isin(filas[dentro, 4], ESTADOS_GANADOS)
+
+    largo = fin - inicio + 1
+    cantidad = np.zeros(largo)
+    valor = np.zeros(largo)
+    aprobadas = np.zeros(largo)
+    valor_ganado = np.zeros(largo)
+    np.add.at(cantidad, posiciones, cantidades)
+    np.add.at(valor, posiciones, valores)
+    np.add.at(aprobadas, posiciones[ganadas], cantidades[ganadas])
+    np.add.at(valor_ganado, posiciones[ganadas], valores[ganadas])
+
+    return np.arange(inicio, fin + 1), cantidad, valor, aprobadas, valor_ganado
+
+
+def indices_estacionales(indices, valores):
+    """
+    Índice estacional multiplicativo por mes calendario: promedio, sobre los
+    años completos, del valor del mes dividido por el promedio de su año.
+    Con menos de dos años completos retorna todos los índices en 1.
+    """
+    primer_enero = np.argmax(indices % 12 == 0) if np.any(indices % 12 == 0) else len(indices)
+    anios_completos = (len(indices) - primer_enero) // 12
+    if anios_completos < 2:
+        return np.ones(12)
+
+    tramo = valores[primer_enero:primer_enero + anios_completos * 12].reshape(anios_completos, 12)
+    promedio_anual = tramo.mean(axis=1, keepdims=True)
+    con_datos = promedio_anual[:, 0] > 0
+    if con_datos.sum() < 2:
+        return np.ones(12)
+
+    indices_mes = (tramo[con_datos] / promedio_anual[con_datos]).mean(axis=0)
+    return indices_mes / indices_mes.mean()
+
+
+def pronosticar(indices, valores, futuros):
+    """
+    Pronóstico estacional simple: desestacionaliza la serie, ajusta una
+    tendencia lineal sobre los últimos 12 meses y la proyecta a los meses
+    `futuros` aplicando el índice estacional de cada mes. Nunca negativo
+    ni NaN.
+
+    Un mes calendario sin valor ganado en ningún año completo tiene índice
+    0: no se puede desestacionalizar, así que queda fuera del ajuste de la
+    tendencia y su pronóstico es 0.
+    """
+    if len(valores) == 0:
+        return np.zeros(len(futuros))
+
+    estacional = indices_estacionales(indices, valores)
+    factor = estacional[indices % 12]
+    desestacionalizado = np.divide(valores, factor, out=np.full(len(valores), np.nan), where=factor > 0)
+
+    ventana = desestacionalizado[-12:]
+    validos = ~np.isnan(ventana)
+    if validos.sum() >= 2:
+        pendiente, intercepto = np.polyfit(np.arange(len(ventana))[validos], ventana[validos], 1)
+    elif validos.any():
+        pendiente, intercepto = 0.0, float(ventana[validos][0])
+    else:
+        pendiente, intercepto = 0.0, 0.0
+
+    x = len(ventana) - 1 + (futuros - indices[-1])
+    pronostico = np.clip((intercepto + pendiente * x) * estacional[futuros % 12], 0, None)
+    return np.nan_to_num(pronostico, nan=0.0, posinf=0.0, neginf=0.0)
+
+
+def analitica_reportes(hoy=None, meses=24):
+    """
+    Tendencias mensuales para el dashboard de reportes, calculadas con
+    NumPy sobre el resumen mensual:
+    - medias móviles de 3 y 12 meses del valor cotizado
+    - tasa de aprobación mensual y móvil de 12 meses, con su pendiente
+    - variación anual (mismo mes del año anterior)
+    - pronóstico estacional del valor ganado para los próximos 3 meses
+
+    El mes en curso se informa pero no se usa para ajustar el pronóstico,
+    porque todavía está incompleto. Se retornan los últimos `meses` meses.
+    """
+    hoy = timezone.localtime(hoy or timezone.now(), ZONA_REPORTES)
+    indices, cantidad, valor, aprobadas, valor_ganado = series_mensuales((hoy.year, hoy.month))
+
+    media_3 = _media_movil(valor, 3)
+    media_12 = _media_movil(valor, 12)
+    tasa = _dividir(aprobadas, cantidad) * 100
+    tasa_12 = _dividir(_suma_movil(aprobadas, 12), _suma_movil(cantidad, 12)) * 100
+
+    variacion_anual = np.full(valor.shape, np.nan)
+    if len(valor) > 12:
+        variacion_anual[12:] = _dividir(valor[12:] - valor[:-12], valor[:-12]) * 100
+
+    # Pendiente de la tasa de aprobación (puntos porcentuales por mes) en el último año cerrado
+    tasa_cerrada = tasa[:-1][-12:]
+    validos = ~np.isnan(tasa_cerrada)
+    tendencia_aprobacion = None
+    if validos.sum() >= 2:
+        tendencia_aprobacion = round(float(np.polyfit(np.arange(len(tasa_cerrada))[validos], tasa_cerrada[validos], 1)[0]), 2)
+
+    # Próximo trimestre: los 3 meses siguientes al mes en curso
+    mes_actual = hoy.year * 12 + hoy.month - 1
+    futuros = mes_actual + 1 + np.arange(3)
+    pronostico = pronosticar(indices[:-1], valor_ganado[:-1], futuros)
+
+    corte = slice(-meses, None) if meses else slice(None)
+    return {
+        'meses': [_etiqueta(i) for i in indices[corte]],
+        'cantidad': [int(v) for v in cantidad[corte]],
+        'valor': _a_lista(valor[corte]),
+        'valorGanado': _a_lista(valor_ganado[corte]),
+        'mediaMovil3': _a_lista(media_3[corte]),
+        'mediaMovil12': _a_lista(media_12[corte]),
+        'tasaAprobacion': _a_lista(tasa[corte], 1),
+        'tasaAprobacion12m': _a_lista(tasa_12[corte], 1),
+        'variacionAnual': _a_lista(variacion_anual[corte], 1),
+        'tendenciaAprobacion': tendencia_aprobacion,
+        'pronostico': {
+            'meses': [_etiqueta(i) for i in futuros],
+            'valores': _a_lista(pronostico),
+            'total': round(float(pronostico.sum()), 2)
+        }
+    }
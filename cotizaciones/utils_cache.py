@@ -0,0 +1,70 @@
+import hashlib
+import time
+from functools import wraps
+from urllib.parse import urlencode
+from django.core.cache import caches
+from django.db import transaction
+from django.http import HttpResponse
+from django.utils import timezone
+from .utils_periodos import ZONA_REPORTES
+
+# Clave con la versión vigente de los datos de reportes
+CLAVE_VERSION_REPORTES = 'reportes:version'
+
+
+def _cache_reportes():
+    return caches['reportes']
+
+
+def version_reportes():
+    """
+    Versión vigente de los reportes. Si la clave no existe (primera vez o
+    expulsada de la caché) se crea con la hora actual, así nunca reutiliza
+    una versión anterior.
+    """
+    return _cache_reportes().get_or_set(CLAVE_VERSION_REPORTES, time.time_ns(), None)
+
+
+def invalidar_reportes():
+    """
+    Publica una versión nueva; las respuestas cacheadas con la versión
+    anterior dejan de leerse y expiran solas.
+    """
+    _cache_reportes().set(CLAVE_VERSION_REPORTES, time.time_ns(), None)
+
+
+def invalidar_reportes_al_confirmar():
+    """Invalida cuando la transacción en curso se confirma (o de inmediato si no hay una)"""
+    transaction.on_commit(invalidar_reportes)
+
+
+def cache_reportes(vista):
+    """
+    Cachea la respuesta JSON de un endpoint de reportes.
+
+    La clave combina la versión de reportes, la vista, los parámetros GET y
+    el día actual (los períodos relativos como 'mes-actual' cambian con la
+    fecha). Las respuestas en streaming y las que no son 200 no se cachean.
+    Debe ir debajo de los decoradores de autenticación y permisos.
+    """
+    @wraps(vista)
+    def envoltura(request, *args, **kwargs):
+        if request.GET.get('stream') == '1':
+            return vista(request, *args, **kwargs)
+
+        parametros = urlencode(sorted(request.GET.lists()), doseq=True)
+        hoy = timezone.localdate(timezone=ZONA_REPORTES)
+        firma = hashlib.md5(f'{vista.__name__}|{hoy}|{parametros}'.encode()).hexdigest()
+        clave = f'reportes:{version_reportes()}:{firma}'
+
+        cache = _cache_reportes()
+        contenido = cache.get(clave)
+        if contenido is not None:
+            return HttpResponse(contenido, content_type='application/json')
+
+        response = vista(request, *args, **kwargs)
+        if response.status_code == 200 and not response.streaming:
+            cache.set(clave, response.content)
+        return response
+
+    return envoltura
@@ -0,0 +1,143 @@
+import json
+from datetime import timedelta
+from django.db.models import Q, Prefetch
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from .utils_paginacion import codificar_cursor, decodificar_cursor
+
+# Los cambios más recientes que este margen no se entregan todavía: una
+# transacción que empezó antes puede confirmar después con un actualizado_en
+# anterior al último entregado, y el cursor ya la habría dejado atrás
+MARGEN_CAMBIOS = timedelta(seconds=30)
+
+# Cotizaciones leídas (con sus items) por consulta
+COTIZACIONES_POR_LOTE = 500
+
+
+def _decimal(valor):
+    return float(valor) if valor is not None else None
+
+
+def _fecha(valor):
+    return valor.isoformat() if valor else None
+
+
+def _cotizacion_cambio(cot):
+    """Registro del feed: la cotización con todos sus items vigentes"""
+    return {
+        'id': cot.id,
+        'numero': cot.numero,
+        'estado': cot.estado,
+        'cliente_id': cot.cliente_id,
+        'cliente': cot.get_nombre_cliente(),
+        'representante_id': cot.representante_id,
+        'representante': cot.get_nombre_representante(),
+        'tipo_trabajo_id': cot.tipo_trabajo_id,
+        'referencia': cot.referencia,
+        'lugar': cot.lugar,
+        'fecha_creacion': _fecha(cot.fecha_creacion),
+        'fecha_vencimiento': _fecha(cot.fecha_vencimiento),
+        'fecha_realizacion': _fecha(cot.fecha_realizacion),
+        'fecha_finalizacion': _fecha(cot.fecha_finalizacion),
+        'subtotal_servicios': _decimal(cot.subtotal_servicios),
+        'subtotal_materiales': _decimal(cot.subtotal_materiales),
+        'subtotal_mano_obra': _decimal(cot.subtotal_mano_obra),
+        'gastos_traslado': _decimal(cot.gastos_traslado),
+        'valor_neto': _decimal(cot.valor_neto),
+        'valor_iva': _decimal(cot.valor_iva),
+        'valor_total': _decimal(cot.valor_total),
+        'creado_por_id': cot.creado_por_id,
+        'actualizado_en': _fecha(cot.actualizado_en),
+        'items_servicio': [
+            {
+                'id': item.id,
+                'servicio_id': item.servicio_id,
+                'descripcion': item.descripcion_personalizada,
+                'cantidad': _decimal(item.cantidad),
+                'precio_unitario': _decimal(item.precio_unitario),
+                'subtotal': _decimal(item.subtotal),
+                'orden': item.orden,
+                'actualizado_en': _fecha(item.actualizado_en),
+            }
+            for item in cot.items_servicio.all()
+        ],
+        'items_material': [
+            {
+                'id': item.id,
+                'material_id': item.material_id,
+                'descripcion': item.descripcion_personalizada,
+                'cantidad': _decimal(item.cantidad),
+                'precio_unitario': _decimal(item.precio_unitario),
+                'subtotal': _decimal(item.subtotal),
+                'horas_uso': _decimal(item.horas_uso),
+                'actualizado_en': _fecha(item.actualizado_en),
+            }
+            for item in cot.items_material.all()
+        ],
+        'items_mano_obra': [
+            {
+                'id': item.id,
+                'descripcion': item.descripcion,
+                'horas': _decimal(item.horas),
+                'precio_hora': _decimal(item.precio_hora),
+                'subtotal': _decimal(item.subtotal),
+                'actualizado_en': _fecha(item.actualizado_en),
+            }
+            for item in cot.items_mano_obra.all()
+        ],
+    }
+
+
+def cotizaciones_cambiadas(cursor=None, ahora=None):
+    """
+    Cotizaciones modificadas después del cursor y antes de
+    ahora - MARGEN_CAMBIOS, en orden (actualizado_en, id) ascendente y con
+    sus items precargados.
+
+    Raises:
+        ValueError si el cursor está mal formado.
+    """
+    from .models import Cotizacion, ItemServicio, ItemMaterial, ItemManoObra
+
+    hasta = (ahora or timezone.now()) - MARGEN_CAMBIOS
+    cotizaciones = Cotizacion.objects.filter(actualizado_en__lt=hasta)
+
+    if cursor:
+        fecha, pk = decodificar_cursor(cursor)
+        cotizaciones = cotizaciones.filter(
+            Q(actualizado_en__gt=fecha) | Q(actualizado_en=fecha, id__gt=pk)
+        )
+
+    return cotizaciones.select_related('cliente', 'representante').prefetch_related(
+        # Sin el orden por defecto de ItemMaterial (join a material y categoría)
+        Prefetch('items_servicio', queryset=ItemServicio.objects.order_by('orden', 'id')),
+        Prefetch('items_material', queryset=ItemMaterial.objects.order_by('id')),
+        Prefetch('items_mano_obra', queryset=ItemManoObra.objects.order_by('id')),
+    ).order_by('actualizado_en', 'id')
+
+
+def respuesta_feed_cambios(cursor=None, limite=None):
+    """
+    StreamingHttpResponse en JSON Lines: una línea por cotización cambiada
+    y una última línea {"cursor": ..., "cantidad": ..., "hay_mas": ...}.
+    El cliente guarda ese cursor y lo envía en la siguiente sincronización;
+    si hay_mas es true, debe pedir de nuevo de inmediato.
+    """
+    cotizaciones = cotizaciones_cambiadas(cursor)
+    if limite:
+        cotizaciones = cotizaciones[:limite + 1]
+
+    def generar():
+        ultimo_cursor = cursor
+        cantidad = 0
+        hay_mas = False
+        for cot in cotizaciones.iterator(chunk_size=COTIZACIONES_POR_LOTE):
+            if limite and cantidad == limite:
+                hay_mas = True
+                break
+            yield json.dumps(_cotizacion_cambio(cot)) + '\n'
+            ultimo_cursor = codificar_cursor(cot.actualizado_en, cot.pk)
+            cantidad += 1
+        yield json.dumps({'cursor': ultimo_cursor, 'cantidad': cantidad, 'hay_mas': hay_mas}) + '\n'
+
+    return StreamingHttpResponse(generar(), content_type='application/x-ndjson')
@@ -0,0 +1,226 @@
+import csv
+import io
+import tempfile
+from copy import copy
+from operator import itemgetter
+from django.http import StreamingHttpResponse, FileResponse
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import NamedStyle, PatternFill, Font, Border, Side, Alignment
+from openpyxl.utils import get_column_letter
+
+# Filas por bloque enviado al cliente y por lote leído desde la base de datos
+FILAS_POR_BLOQUE = 500
+FILAS_POR_LOTE = 2000
+
+
+class _Eco:
+    """Pseudo-archivo para csv.writer: en vez de guardar la línea, la retorna"""
+
+    def write(self, valor):
+        return valor
+
+
+def filas_queryset(queryset, *campos, convertir=None):
+    """
+    Recorre `queryset.values_list(*campos)` con un cursor del lado del
+    servidor (iterator), sin cachear instancias. `convertir` recibe cada
+    tupla y retorna la fila a escribir.
+    """
+    filas = queryset.values_list(*campos).iterator(chunk_size=FILAS_POR_LOTE)
+    if convertir is None:
+        return filas
+    return (convertir(fila) for fila in filas)
+
+
+def respuesta_csv_streaming(nombre_archivo, encabezados, filas):
+    """
+    StreamingHttpResponse que escribe un CSV (UTF-8 con BOM, para Excel)
+    en bloques de FILAS_POR_BLOQUE filas a medida que se consume `filas`.
+    La descarga empieza de inmediato y la memoria no crece con el total.
+    """
+    writer = csv.writer(_Eco())
+
+    def generar():
+        bloque = ['\ufeff' + writer.writerow(encabezados)]
+        for fila in filas:
+            bloque.append(writer.writerow(fila))
+            if len(bloque) >= FILAS_POR_BLOQUE:
+                yield ''.join(bloque)
+                bloque = []
+        if bloque:
+            yield ''.join(bloque)
+
+    response = StreamingHttpResponse(generar(), content_type='text/csv; charset=utf-8')
+    response['Content-Disposition'] = f'attachment; filename="{nombre_archivo}"'
+    return response
+
+
+
+def escribir_csv(destino, encabezados, filas, al_avanzar=None):
+    """
+    Escribe un CSV (UTF-8 con BOM) en el archivo binario `destino`.
+    `al_avanzar(n)` se llama cada FILAS_POR_LOTE filas con el total escrito.
+
+    Returns:
+        Cantidad de filas de datos escritas.
+    """
+    texto = io.TextIOWrapper(destino, encoding='utf-8-sig', newline='')
+    writer = csv.writer(texto)
+    writer.writerow(encabezados)
+
+    escritas = 0
+    for fila in filas:
+        writer.writerow(fila)
+        escritas += 1
+        if al_avanzar and escritas % FILAS_POR_LOTE == 0:
+            al_avanzar(escritas)
+
+    texto.flush()
+    texto.detach()
+    if al_avanzar:
+        al_avanzar(escritas)
+    return escritas
+
+# ============================================================================
+# EXCEL - MOTOR DE EXPORTACIÓN EN MODO SOLO ESCRITURA
+# ============================================================================
+
+CONTENT_TYPE_XLSX = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+# Rellenos de las celdas de estado
+COLORES_ESTADO = {
+    'estado_verde': 'D4EDDA',
+    'estado_amarillo': 'FFF3CD',
+    'estado_rojo': 'F8D7DA',
+}
+
+
+class Columna:
+    """
+    Definición de una columna de exportación Excel.
+
+    - titulo: texto del encabezado
+    - valor: clave de la fila (filas de .values()) o función fila -> valor
+    - ancho: ancho de la columna
+    - estilo: nombre de un estilo registrado o función fila -> nombre
+    """
+
+    def __init__(self, titulo, valor, ancho=15, estilo='celda'):
+        self.titulo = titulo
+        self.valor = valor if callable(valor) else itemgetter(valor)
+        self.ancho = ancho
+        self.estilo = estilo if callable(estilo) else (lambda fila, nombre=estilo: nombre)
+
+
+def _registrar_estilos(wb, color_encabezado):
+    """Crea una sola vez los estilos con nombre que usan las celdas"""
+    borde = Border(
+        left=Side(style='thin'),
+        right=Side(style='thin'),
+        top=Side(style='thin'),
+        bottom=Side(style='thin')
+    )
+
+    wb.add_named_style(NamedStyle(
+        name='encabezado',
+        font=Font(bold=True, color='FFFFFF', size=11),
+        fill=PatternFill(start_color=color_encabezado, end_color=color_encabezado, fill_type='solid'),
+        border=borde,
+        alignment=Alignment(horizontal='center', vertical='center', wrap_text=True)
+    ))
+    wb.add_named_style(NamedStyle(
+        name='celda',
+        border=borde,
+        alignment=Alignment(vertical='center')
+    ))
+    wb.add_named_style(NamedStyle(
+        name='celda_ajustada',
+        border=borde,
+        alignment=Alignment(vertical='center', wrap_text=True)
+    ))
+    for nombre, color in COLORES_ESTADO.items():
+        wb.add_named_style(NamedStyle(
+            name=nombre,
+            font=Font(bold=True),
+            fill=PatternFill(start_color=color, end_color=color, fill_type='solid'),
+            border=borde,
+            alignment=Alignment(vertical='center', wrap_text=True)
+        ))
+
+
+def escribir_excel(destino, titulo_hoja, columnas, filas, color_encabezado='4472C4',
+                   fijar_encabezado=False, alto_encabezado=None, al_avanzar=None):
+    """
+    Escribe `filas` en un .xlsx usando el modo solo escritura de openpyxl:
+    cada fila se serializa a disco al agregarla, así la memoria depende del
+    ancho de la fila y no de la cantidad de filas.
+
+    `destino` es una ruta o un archivo binario. `al_avanzar(n)`, si se
+    entrega, se llama cada FILAS_POR_LOTE filas con el total escrito.
+
+    Returns:
+        Cantidad de filas de datos escritas.
+    """
+    wb = Workbook(write_only=True)
+    _registrar_estilos(wb, color_encabezado)
+    ws = wb.create_sheet(title=titulo_hoja)
+
+    for indice, columna in enumerate(columnas, 1):
+        ws.column_dimensions[get_column_letter(indice)].width = columna.ancho
+    if alto_encabezado:
+        ws.row_dimensions[1].height = alto_encabezado
+    if fijar_encabezado:
+        ws.freeze_panes = 'A2'
+
+    encabezados = []
+    for columna in columnas:
+        celda = WriteOnlyCell(ws, value=columna.titulo)
+        celda.style = 'encabezado'
+        encabezados.append(celda)
+    ws.append(encabezados)
+
+    # Resolver un estilo con nombre es costoso (busca en el libro y arma el
+    # arreglo de estilo); se resuelve una vez por nombre y luego se copia
+    estilos = {}
+
+    def estilo(nombre):
+        if nombre not in estilos:
+            plantilla = WriteOnlyCell(ws)
+            plantilla.style = nombre
+            estilos[nombre] = plantilla._style
+        return copy(estilos[nombre])
+
+    escritas = 0
+    for fila in filas:
+        celdas = []
+        for columna in columnas:
+            celda = WriteOnlyCell(ws, value=columna.valor(fila))
+            celda._style = estilo(columna.estilo(fila))
+            celdas.append(celda)
+        ws.append(celdas)
+        escritas += 1
+        if al_avanzar and escritas % FILAS_POR_LOTE == 0:
+            al_avanzar(escritas)
+
+    wb.save(destino)
+    if al_avanzar:
+        al_avanzar(escritas)
+    return escritas
+
+
+def respuesta_excel(nombre_archivo, titulo_hoja, columnas, filas, **opciones):
+    """
+    Descarga .xlsx generada con escribir_excel. El libro se escribe en un
+    archivo temporal (no en memoria) y se envía por bloques con FileResponse;
+    el archivo se elimina al cerrar la respuesta.
+    """
+    archivo = tempfile.TemporaryFile(suffix='.xlsx')
+    escribir_excel(archivo, titulo_hoja, columnas, filas, **opciones)
+    archivo.seek(0)
+    return FileResponse(
+        archivo,
+        as_attachment=True,
+        filename=nombre_archivo,
+        content_type=CONTENT_TYPE_XLSX
+    )
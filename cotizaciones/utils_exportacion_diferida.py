@@ -0,0 +1,385 @@
+import tempfile
+from datetime import timedelta
+from django.core.files import File
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from .utils_exportacion import FILAS_POR_LOTE, Columna, filas_queryset, escribir_csv, escribir_excel
+from .utils_seguimiento import trabajos_seguimiento
+
+
+# ============================================================================
+# COTIZACIONES
+# ============================================================================
+
+def consulta_cotizaciones(parametros):
+    """Cotizaciones a exportar según los filtros (busqueda, estado, cliente)"""
+    from .models import Cotizacion
+
+    cotizaciones = Cotizacion.objects.select_related('cliente', 'tipo_trabajo').order_by('-fecha_creacion')
+
+    busqueda = parametros.get('busqueda', '')
+    estado = parametros.get('estado', '')
+    cliente_id = parametros.get('cliente', '')
+
+    if busqueda:
+        cotizaciones = cotizaciones.filter(
+            Q(numero__icontains=busqueda) |
+            Q(cliente__nombre__icontains=busqueda) |
+            Q(referencia__icontains=busqueda)
+        )
+
+    if estado:
+        cotizaciones = cotizaciones.filter(estado=estado)
+
+    if cliente_id:
+        cotizaciones = cotizaciones.filter(cliente_id=cliente_id)
+
+    return cotizaciones
+
+
+def csv_cotizaciones(cotizaciones):
+    """Encabezados y filas CSV de las cotizaciones"""
+    from .models import Cotizacion
+
+    estados = dict(Cotizacion.ESTADO_CHOICES)
+
+    def convertir(fila):
+        numero, cliente, referencia, lugar, tipo_trabajo, fecha, estado, neto, iva, total = fila
+        return [
+            numero,
+            cliente or 'Sin cliente',
+            referencia,
+            lugar,
+            tipo_trabajo or 'Sin tipo',
+            fecha.strftime('%d/%m/%Y'),
+            estados.get(estado, estado),
+            float(neto),
+            float(iva),
+            float(total)
+        ]
+
+    encabezados = [
+        'Número', 'Cliente', 'Referencia', 'Lugar', 'Tipo Trabajo',
+        'Fecha Creación', 'Estado', 'Valor Neto', 'IVA', 'Valor Total'
+    ]
+    filas = filas_queryset(
+        cotizaciones,
+        'numero', 'cliente__nombre', 'referencia', 'lugar', 'tipo_trabajo__nombre',
+        'fecha_creacion', 'estado', 'valor_neto', 'valor_iva', 'valor_total',
+        convertir=convertir
+    )
+    return encabezados, filas
+
+
+def excel_cotizaciones(cotizaciones):
+    """Argumentos de escribir_excel para las cotizaciones"""
+    from .models import Cotizacion
+
+    estados = dict(Cotizacion.ESTADO_CHOICES)
+
+    columnas = [
+        Columna('Número', 'numero', ancho=18),
+        Columna('Cliente', lambda c: c['cliente__nombre'] or 'Sin cliente', ancho=18),
+        Columna('Referencia', 'referencia', ancho=18),
+        Columna('Lugar', 'lugar', ancho=18),
+        Columna('Tipo Trabajo', lambda c: c['tipo_trabajo__nombre'] or 'Sin tipo', ancho=18),
+        Columna('Fecha Creación', lambda c: c['fecha_creacion'].strftime('%d/%m/%Y'), ancho=18),
+        Columna('Estado', lambda c: estados.get(c['estado'], c['estado']), ancho=18),
+        Columna('Valor Neto', lambda c: float(c['valor_neto']), ancho=18),
+        Columna('IVA', lambda c: float(c['valor_iva']), ancho=18),
+        Columna('Valor Total', lambda c: float(c['valor_total']), ancho=18),
+    ]
+    filas = cotizaciones.values(
+        'numero', 'cliente__nombre', 'referencia', 'lugar', 'tipo_trabajo__nombre',
+        'fecha_creacion', 'estado', 'valor_neto', 'valor_iva', 'valor_total'
+    ).iterator(chunk_size=FILAS_POR_LOTE)
+
+    return {'titulo_hoja': 'Cotizaciones', 'columnas': columnas, 'filas': filas}
+
+
+# ============================================================================
+# SEGUIMIENTO DE TRABAJOS
+# ============================================================================
+
+def consulta_trabajos(parametros):
+    """
+    Trabajos de cotizaciones aprobadas según los filtros (estado, empleado,
+    busqueda), con cotización, empleado e item cargados y el progreso
+    calculado en SQL.
+    """
+    trabajos = trabajos_seguimiento().filter(
+        cotizacion__estado='aprobada'
+    ).select_related('cotizacion__cliente').order_by('-cotizacion__fecha_creacion', 'cotizacion_id', '-fecha_inicio')
+
+    filtro_estado = parametros.get('estado', '')
+    filtro_empleado = parametros.get('empleado', '')
+    busqueda = parametros.get('busqueda', '')
+
+    if filtro_estado:
+        trabajos = trabajos.filter(estado=filtro_estado)
+
+    if filtro_empleado:
+        trabajos = trabajos.filter(empleado_id=filtro_empleado)
+
+    if busqueda:
+        trabajos = trabajos.filter(
+            Q(cotizacion__numero__icontains=busqueda) |
+            Q(cotizacion__cliente__nombre__icontains=busqueda) |
+            Q(cotizacion__cliente__isnull=True, cotizacion__cliente_nombre_respaldo__icontains=busqueda) |
+            Q(item_mano_obra__descripcion__icontains=busqueda)
+        )
+
+    return trabajos
+
+
+def csv_trabajos(trabajos):
+    """Encabezados y filas CSV del seguimiento de trabajos"""
+    from .models import TrabajoEmpleado
+    from home.models import PerfilEmpleado
+
+    estados = dict(TrabajoEmpleado.ESTADO_CHOICES)
+    cargos = dict(PerfilEmpleado.CARGO_CHOICES)
+
+    def convertir(fila):
+        (numero, cliente, cliente_respaldo, lugar, descripcion, nombre, apellido, usuario,
+         cargo, estado, progreso, horas, precio_hora, fecha_inicio, fecha_fin, observaciones) = fila
+        return [
+            numero,
+            cliente or cliente_respaldo or 'Cliente Eliminado',
+            lugar,
+            descripcion,
+            f"{nombre} {apellido}".strip() or usuario,
+            cargos.get(cargo, cargo),
+            estados.get(estado, estado),
+            f"{progreso:.0f}",
+            f"{float(horas):.1f}",
+            f"{float(precio_hora):,.0f}",
+            fecha_inicio.strftime('%d/%m/%Y %H:%M') if fecha_inicio else 'No iniciado',
+            fecha_fin.strftime('%d/%m/%Y %H:%M') if fecha_fin else 'En curso' if estado == 'en_progreso' else '-',
+            observaciones or '-'
+        ]
+
+    encabezados = [
+        'Cotización', 'Cliente', 'Lugar', 'Trabajo', 'Empleado', 'Cargo',
+        'Estado', 'Progreso (%)', 'Horas Trabajadas', 'Precio/Hora',
+        'Fecha Inicio', 'Fecha Fin', 'Observaciones'
+    ]
+    filas = filas_queryset(
+        trabajos,
+        'cotizacion__numero', 'cotizacion__cliente__nombre', 'cotizacion__cliente_nombre_respaldo',
+        'cotizacion__lugar', 'item_mano_obra__descripcion',
+        'empleado__user__first_name', 'empleado__user__last_name', 'empleado__user__username',
+        'empleado__cargo', 'estado', 'progreso_estimado', 'horas_trabajadas',
+        'item_mano_obra__precio_hora', 'fecha_inicio', 'fecha_fin', 'observaciones_empleado',
+        convertir=convertir
+    )
+    return encabezados, filas
+
+
+def _estilo_estado_trabajo(trabajo):
+    """Relleno de la celda de estado según el estado del trabajo"""
+    if trabajo.estado == 'completado':
+        return 'estado_verde'
+    if trabajo.estado == 'en_progreso':
+        return 'estado_amarillo'
+    return 'estado_rojo'
+
+
+def excel_trabajos(trabajos):
+    """Argumentos de escribir_excel para el seguimiento de trabajos"""
+    columnas = [
+        Columna('Cotización', lambda t: t.cotizacion.numero, estilo='celda_ajustada'),
+        Columna('Cliente', lambda t: t.cotizacion.get_nombre_cliente(), ancho=25, estilo='celda_ajustada'),
+        Columna('Lugar', lambda t: t.cotizacion.lugar, ancho=20, estilo='celda_ajustada'),
+        Columna('Trabajo', lambda t: t.item_mano_obra.descripcion, ancho=30, estilo='celda_ajustada'),
+        Columna('Empleado', lambda t: t.empleado.nombre_completo, ancho=25, estilo='celda_ajustada'),
+        Columna('Cargo', lambda t: t.empleado.get_cargo_display(), estilo='celda_ajustada'),
+        Columna('Estado', lambda t: t.get_estado_display(), estilo=_estilo_estado_trabajo),
+        Columna('Progreso (%)', lambda t: f"{t.progreso_estimado:.0f}%", ancho=12, estilo='celda_ajustada'),
+        Columna('Horas Trabajadas', lambda t: f"{float(t.horas_trabajadas):.1f}", estilo='celda_ajustada'),
+        Columna('Precio/Hora', lambda t: f"${float(t.item_mano_obra.precio_hora):,.0f}", ancho=12, estilo='celda_ajustada'),
+        Columna(
+            'Fecha Inicio',
+            lambda t: t.fecha_inicio.strftime('%d/%m/%Y %H:%M') if t.fecha_inicio else 'No iniciado',
+            ancho=18, estilo='celda_ajustada'
+        ),
+        Columna(
+            'Fecha Fin',
+            lambda t: t.fecha_fin.strftime('%d/%m/%Y %H:%M') if t.fecha_fin else ('En curso' if t.estado == 'en_progreso' else '-'),
+            ancho=18, estilo='celda_ajustada'
+        ),
+        Columna('Observaciones', lambda t: t.observaciones_empleado or '-', ancho=40, estilo='celda_ajustada'),
+    ]
+
+    return {
+        'titulo_hoja': 'Seguimiento Trabajos',
+        'columnas': columnas,
+        'filas': trabajos.iterator(chunk_size=FILAS_POR_LOTE),
+        'color_encabezado': '2575C0',
+        'fijar_encabezado': True,
+        'alto_encabezado': 30,
+    }
+
+
+# ============================================================================
+# COLA DE EXPORTACIONES
+# ============================================================================
+
+# Exportaciones que se pueden encolar: nombre de archivo, consulta y formatos
+EXPORTACIONES = {
+    'cotizaciones': {
+        'archivo': 'cotizaciones',
+        'consulta': consulta_cotizaciones,
+        'csv': csv_cotizaciones,
+        'excel': excel_cotizaciones,
+    },
+    'trabajos': {
+        'archivo': 'seguimiento_trabajos',
+        'consulta': consulta_trabajos,
+        'csv': csv_trabajos,
+        'excel': excel_trabajos,
+    },
+}
+
+# Filtros que se guardan con la solicitud
+PARAMETROS_EXPORTACION = ('busqueda', 'estado', 'cliente', 'empleado')
+
+# Una exportación 'procesando' cuyo worker no da señales (ultima_actividad)
+# en este tiempo se considera abandonada: el worker murió a mitad de camino.
+# El worker la renueva cada FILAS_POR_LOTE filas escritas.
+TIEMPO_SIN_ACTIVIDAD_EXPORTACION = timedelta(minutes=10)
+
+
+def encolar_exportacion(tipo, formato, parametros, usuario):
+    """
+    Registra una exportación pendiente; el worker `procesar_exportaciones`
+    la genera. Solo guarda los filtros conocidos y no vacíos.
+
+    Raises:
+        ValueError: si el tipo o el formato no son válidos.
+    """
+    from .models import SolicitudExportacion
+
+    if tipo not in EXPORTACIONES:
+        raise ValueError(f'Tipo de exportación no válido: {tipo}')
+    if formato not in dict(SolicitudExportacion.FORMATO_CHOICES):
+        raise ValueError(f'Formato de exportación no válido: {formato}')
+
+    return SolicitudExportacion.objects.create(
+        tipo=tipo,
+        formato=formato,
+        parametros={
+            clave: str(parametros[clave]).strip()
+            for clave in PARAMETROS_EXPORTACION
+            if str(parametros.get(clave) or '').strip()
+        },
+        solicitado_por=usuario
+    )
+
+
+def cerrar_exportaciones_abandonadas():
+    """
+    Marca con error las exportaciones 'procesando' cuyo worker lleva más de
+    TIEMPO_SIN_ACTIVIDAD_EXPORTACION sin dar señales, para que el usuario
+    deje de esperar y pueda volver a solicitarla. Una exportación larga con
+    el worker vivo no se toca. No se reencolan: si el worker murió por esa
+    misma exportación, volvería a caerse. Retorna la cantidad marcada.
+    """
+    from .models import SolicitudExportacion
+
+    ahora = timezone.now()
+    limite = ahora - TIEMPO_SIN_ACTIVIDAD_EXPORTACION
+    return SolicitudExportacion.objects.filter(
+        Q(ultima_actividad__lt=limite) | Q(ultima_actividad__isnull=True, fecha_inicio__lt=limite),
+        estado='procesando'
+    ).update(
+        estado='error',
+        error='La exportación se interrumpió antes de terminar. Vuelve a solicitarla.',
+        fecha_fin=ahora
+    )
+
+
+def tomar_siguiente_exportacion():
+    """
+    Marca como 'procesando' la exportación pendiente más antigua y la
+    retorna (None si no hay). Con SKIP LOCKED varios workers pueden
+    trabajar en paralelo sin tomar la misma solicitud. Antes cierra las
+    exportaciones abandonadas (ver cerrar_exportaciones_abandonadas).
+    """
+    from .models import SolicitudExportacion
+
+    cerrar_exportaciones_abandonadas()
+
+    with transaction.atomic():
+        solicitud = SolicitudExportacion.objects.select_for_update(skip_locked=True).filter(
+            estado='pendiente'
+        ).order_by('fecha_creacion').first()
+
+        if solicitud is None:
+            return None
+
+        solicitud.estado = 'procesando'
+        solicitud.fecha_inicio = solicitud.ultima_actividad = timezone.now()
+        solicitud.save(update_fields=['estado', 'fecha_inicio', 'ultima_actividad'])
+
+    return solicitud
+
+
+def procesar_exportacion(solicitud):
+    """
+    Genera el archivo de una solicitud en un temporal y lo guarda en
+    `solicitud.archivo`. El avance (filas_procesadas) y la señal de vida
+    (ultima_actividad) se publican cada FILAS_POR_LOTE filas para que el
+    endpoint de estado lo informe y la solicitud no se dé por abandonada.
+
+    El resultado solo se guarda si la solicitud sigue 'procesando': si se
+    cerró por abandonada mientras tanto, se conserva ese estado y se
+    descarta el archivo.
+    """
+    from .models import SolicitudExportacion
+
+    pendientes = SolicitudExportacion.objects.filter(pk=solicitud.pk)
+    definicion = EXPORTACIONES[solicitud.tipo]
+
+    def al_avanzar(filas):
+        pendientes.update(filas_procesadas=filas, ultima_actividad=timezone.now())
+
+    try:
+        consulta = definicion['consulta'](solicitud.parametros)
+        solicitud.total_filas = consulta.count()
+        pendientes.update(total_filas=solicitud.total_filas, ultima_actividad=timezone.now())
+
+        extension = 'csv' if solicitud.formato == 'csv' else 'xlsx'
+        nombre = f"{definicion['archivo']}_{timezone.localtime().strftime('%Y%m%d_%H%M%S')}.{extension}"
+
+        with tempfile.TemporaryFile() as archivo:
+            if solicitud.formato == 'csv':
+                encabezados, filas = definicion['csv'](consulta)
+                escritas = escribir_csv(archivo, encabezados, filas, al_avanzar=al_avanzar)
+            else:
+                escritas = escribir_excel(archivo, al_avanzar=al_avanzar, **definicion['excel'](consulta))
+            archivo.seek(0)
+            solicitud.archivo.save(nombre, File(archivo), save=False)
+
+        solicitud.filas_procesadas = escritas
+        solicitud.total_filas = escritas
+        solicitud.estado = 'completada'
+    except Exception as e:
+        solicitud.estado = 'error'
+        solicitud.error = str(e)
+
+    solicitud.fecha_fin = timezone.now()
+    guardada = pendientes.filter(estado='procesando').update(
+        archivo=solicitud.archivo.name or '',
+        filas_procesadas=solicitud.filas_procesadas,
+        total_filas=solicitud.total_filas,
+        estado=solicitud.estado,
+        error=solicitud.error,
+        fecha_fin=solicitud.fecha_fin
+    )
+    if not guardada:
+        if solicitud.archivo:
+            solicitud.archivo.delete(save=False)
+        solicitud.refresh_from_db()
+    return solicitud
@@ -0,0 +1,360 @@
+from decimal import Decimal, InvalidOperation
+from django.db import transaction
+from .utils_reportes import recalcular_productividad_empleado
+
+# Máximo de items aceptados en una sola solicitud
+MAXIMO_ITEMS_LOTE = 500
+
+TIPOS_ITEM = ('servicio', 'material', 'mano_obra')
+
+
+def _decimal(datos, campo, defecto=None):
+    """Valor decimal >= 0 de `campo`; sin valor usa `defecto` (None: obligatorio)"""
+    valor = datos.get(campo)
+    if valor in ('', None):
+        if defecto is None:
+            raise ValueError(f'{campo} es obligatorio')
+        valor = defecto
+
+    try:
+        numero = Decimal(str(valor))
+    except (InvalidOperation, ValueError):
+        raise ValueError(f'{campo} no es un número válido')
+
+    if not numero.is_finite() or numero < 0:
+        raise ValueError(f'{campo} debe ser un número mayor o igual a 0')
+    return numero
+
+
+def _ids(valores, campo):
+    try:
+        return [int(valor) for valor in valores]
+    except (TypeError, ValueError):
+        raise ValueError(f'{campo} debe contener IDs numéricos')
+
+
+def preparar_items_lote(cotizacion, items):
+    """
+    Valida en conjunto una lista de items mixtos y arma los objetos sin
+    guardarlos. Cada item es un dict con 'tipo' (servicio, material o
+    mano_obra) y los mismos campos que aceptan los endpoints de un item.
+    Servicios, materiales, parámetros y empleados referenciados se leen
+    con una consulta por tabla, no una por item.
+
+    Returns:
+        (lote, errores): `errores` es una lista de {'indice', 'error'};
+        si está vacía, `lote` se puede pasar a guardar_items_lote.
+
+    Raises:
+        ValueError si `items` no es una lista válida.
+    """
+    from .models import (
+        ServicioBase, ParametroServicio, Material, ItemServicio, ItemMaterial, ItemManoObra
+    )
+    from home.models import PerfilEmpleado
+
+    if not isinstance(items, list) or not items:
+        raise ValueError('items debe ser una lista con al menos un item')
+    if len(items) > MAXIMO_ITEMS_LOTE:
+        raise ValueError(f'Se aceptan hasta {MAXIMO_ITEMS_LOTE} items por solicitud')
+
+    errores = []
+    por_tipo = {tipo: [] for tipo in TIPOS_ITEM}
+    for indice, datos in enumerate(items):
+        tipo = datos.get('tipo') if isinstance(datos, dict) else None
+        if tipo not in TIPOS_ITEM:
+            errores.append({'indice': indice, 'error': f'tipo debe ser uno de: {", ".join(TIPOS_ITEM)}'})
+            continue
+        por_tipo[tipo].append((indice, datos))
+
+    # Referencias de todo el lote: una consulta por tabla
+    def referencias(tipo, campo):
+        valores = set()
+        for indice, datos in por_tipo[tipo]:
+            try:
+                valores.update(_ids([datos.get(campo)], campo))
+            except ValueError:
+                pass
+        return valores
+
+    servicios = ServicioBase.objects.in_bulk(referencias('servicio', 'servicio_id'))
+    materiales = Material.objects.in_bulk(referencias('material', 'material_id'))
+
+    ids_parametros = set()
+    ids_empleados = set()
+    for indice, datos in por_tipo['servicio']:
+        try:
+            ids_parametros.update(_ids((datos.get('parametros') or {}).keys(), 'parametros'))
+        except (AttributeError, ValueError):
+            pass
+    for indice, datos in por_tipo['mano_obra']:
+        try:
+            ids_empleados.update(_ids(datos.get('empleados_seleccionados') or [], 'empleados_seleccionados'))
+        except ValueError:
+            pass
+
+    servicio_de_parametro = dict(
+        ParametroServicio.objects.filter(pk__in=ids_parametros).values_list('id', 'servicio_id')
+    )
+    empleados = PerfilEmpleado.objects.filter(activo=True, cargo='empleado').in_bulk(ids_empleados)
+
+    lote = {'servicios': [], 'materiales': [], 'mano_obra': [], 'orden': []}
+    siguiente_orden = cotizacion.items_servicio.count()
+
+    for indice, datos in por_tipo['servicio']:
+        try:
+            servicio_id = _ids([datos.get('servicio_id')], 'servicio_id')[0]
+            servicio = servicios.get(servicio_id)
+            if servicio is None:
+                raise ValueError(f'Servicio {servicio_id} no existe')
+
+            parametros = datos.get('parametros') or {}
+            if not isinstance(parametros, dict):
+                raise ValueError('parametros debe ser un objeto {id: valor}')
+            valores = []
+            for parametro_id, valor in zip(_ids(parametros.keys(), 'parametros'), parametros.values()):
+                if servicio_de_parametro.get(parametro_id) != servicio.id:
+                    raise ValueError(f'Parámetro {parametro_id} no pertenece al servicio')
+                if valor:
+                    valores.append((parametro_id, valor))
+
+            cantidad = _decimal(datos, 'cantidad', 1)
+            precio_unitario = _decimal(datos, 'precio_unitario', 0)
+        except ValueError as e:
+            errores.append({'indice': indice, 'error': str(e)})
+            continue
+
+        item = ItemServicio(
+            cotizacion=cotizacion,
+            servicio=servicio,
+            cantidad=cantidad,
+            precio_unitario=precio_unitario,
+            subtotal=cantidad * precio_unitario,
+            descripcion_personalizada=datos.get('descripcion_personalizada', ''),
+            orden=siguiente_orden
+        )
+        siguiente_orden += 1
+        lote['servicios'].append((item, valores))
+        lote['orden'].append((indice, 'servicio', item))
+
+    for indice, datos in por_tipo['material']:
+        try:
+            material_id = _ids([datos.get('material_id')], 'material_id')[0]
+            material = materiales.get(material_id)
+            if material is None:
+                raise ValueError(f'Material {material_id} no existe')
+
+            cantidad = _decimal(datos, 'cantidad', 1)
+            precio_unitario = _decimal(datos, 'precio_unitario', 0)
+
+            # Materiales con mantenimiento por horas deben indicar las horas de uso
+            horas_uso = None
+            if material.requiere_mantenimiento and material.tipo_mantenimiento == 'horas':
+                horas_uso = _decimal(datos, 'horas_uso', 0)
+                if horas_uso == 0:
+                    raise ValueError('Este material requiere especificar las horas de uso')
+        except ValueError as e:
+            errores.append({'indice': indice, 'error': str(e)})
+            continue
+
+        item = ItemMaterial(
+            cotizacion=cotizacion,
+            material=material,
+            cantidad=cantidad,
+            precio_unitario=precio_unitario,
+            subtotal=cantidad * precio_unitario,
+            descripcion_personalizada=datos.get('descripcion_personalizada', ''),
+            horas_uso=horas_uso
+        )
+        lote['materiales'].append(item)
+        lote['orden'].append((indice, 'material', item))
+
+    for indice, datos in por_tipo['mano_obra']:
+        try:
+            descripcion = str(datos.get('descripcion') or '').strip()
+            if not descripcion:
+                raise ValueError('descripcion es obligatoria')
+
+            horas = _decimal(datos, 'horas', 0)
+            precio_hora = _decimal(datos, 'precio_hora', 0)
+
+            asignados = []
+            for empleado_id in _ids(datos.get('empleados_seleccionados') or [], 'empleados_seleccionados'):
+                if empleado_id not in empleados:
+                    raise ValueError(f'Empleado {empleado_id} no existe o no está activo')
+                if empleados[empleado_id] in asignados:
+                    raise ValueError(f'Empleado {empleado_id} está repetido')
+                asignados.append(empleados[empleado_id])
+        except ValueError as e:
+            errores.append({'indice': indice, 'error': str(e)})
+            continue
+
+        item = ItemManoObra(
+            cotizacion=cotizacion,
+            descripcion=descripcion,
+            horas=horas,
+            precio_hora=precio_hora,
+            subtotal=horas * precio_hora
+        )
+        lote['mano_obra'].append((item, asignados))
+        lote['orden'].append((indice, 'mano_obra', item))
+
+    lote['orden'].sort(key=lambda entrada: entrada[0])
+    errores.sort(key=lambda error: error['indice'])
+    return lote, errores
+
+
+def guardar_items_lote(cotizacion, lote):
+    """
+    Inserta un lote armado por preparar_items_lote con bulk_create (una
+    inserción por tabla) y recalcula los totales una sola vez.
+
+    bulk_create no llama a save() ni emite post_save: el subtotal ya viene
+    calculado, calcular_totales marca la cotización como actualizada y la
+    productividad se recalcula una vez por empleado asignado.
+
+    Returns:
+        Lista de (tipo, item) en el orden en que llegaron los items.
+    """
+    from .models import (
+        ItemServicio, ParametroItemServicio, ItemMaterial, ItemManoObra,
+        ItemManoObraEmpleado, TrabajoEmpleado
+    )
+
+    with transaction.atomic():
+        ItemServicio.objects.bulk_create([item for item, _ in lote['servicios']])
+        ParametroItemServicio.objects.bulk_create([
+            ParametroItemServicio(item_servicio=item, parametro_id=parametro_id, valor=valor)
+            for item, valores in lote['servicios']
+            for parametro_id, valor in valores
+        ])
+
+        ItemMaterial.objects.bulk_create(lote['materiales'])
+
+        ItemManoObra.objects.bulk_create([item for item, _ in lote['mano_obra']])
+        asignaciones = []
+        trabajos = []
+        for item, empleados in lote['mano_obra']:
+            if not empleados:
+                continue
+            # Distribuir horas entre empleados (equitativamente)
+            horas_por_empleado = item.horas / len(empleados)
+            for empleado in empleados:
+                asignaciones.append(ItemManoObraEmpleado(
+                    item_mano_obra=item,
+                    empleado=empleado,
+                    horas_asignadas=horas_por_empleado
+                ))
+                trabajos.append(TrabajoEmpleado(
+                    empleado=empleado,
+                    cotizacion=cotizacion,
+                    item_mano_obra=item,
+                    horas_estimadas=horas_por_empleado,
+                    estado='pendiente'
+                ))
+        ItemManoObraEmpleado.objects.bulk_create(asignaciones)
+        TrabajoEmpleado.objects.bulk_create(trabajos)
+
+        for empleado_id in {trabajo.empleado_id for trabajo in trabajos}:
+            recalcular_productividad_empleado(empleado_id)
+
+        cotizacion.calcular_totales()
+
+    return [(tipo, item) for _, tipo, item in lote['orden']]
+
+
+def aplicar_plantilla_lote(cotizacion, plantilla):
+    """
+    Agrega los servicios de la plantilla a la cotización: las líneas se
+    leen con su servicio en una consulta, se insertan con un bulk_create y
+    los totales se recalculan una vez.
+
+    Returns:
+        Cantidad de items agregados.
+    """
+    from .models import ItemServicio
+
+    items = []
+    for item_plantilla in plantilla.servicios.select_related('servicio'):
+        precio = item_plantilla.servicio.precio_base
+        items.append(ItemServicio(
+            cotizacion=cotizacion,
+            servicio=item_plantilla.servicio,
+            cantidad=item_plantilla.cantidad_default,
+            precio_unitario=precio,
+            subtotal=item_plantilla.cantidad_default * precio,
+            orden=item_plantilla.orden
+        ))
+
+    with transaction.atomic():
+        ItemServicio.objects.bulk_create(items)
+        cotizacion.calcular_totales()
+
+    return len(items)
+
+
+def copiar_cotizacion(original, usuario):
+    """
+    Crea una cotización en borrador con los datos de `original` y copias de
+    todos sus items de servicio (con parámetros), material y mano de obra.
+    Usa una cantidad fija de consultas sin importar cuántos items tenga:
+    una lectura y un bulk_create por tabla.
+
+    No se copian el número, el estado, las fechas de realización, los datos
+    de envío ni la asignación de empleados: son propios de cada trabajo.
+    """
+    from .models import (
+        Cotizacion, ItemServicio, ParametroItemServicio, ItemMaterial, ItemManoObra
+    )
+
+    campos_servicio = ['servicio_id', 'descripcion_personalizada', 'cantidad', 'precio_unitario', 'subtotal', 'orden']
+    campos_material = ['material_id', 'descripcion_personalizada', 'cantidad', 'precio_unitario', 'subtotal', 'horas_uso']
+    campos_mano_obra = ['descripcion', 'horas', 'precio_hora', 'subtotal']
+
+    with transaction.atomic():
+        copia = Cotizacion(
+            cliente_id=original.cliente_id,
+            cliente_nombre_respaldo=original.cliente_nombre_respaldo,
+            representante_id=original.representante_id,
+            representante_nombre_respaldo=original.representante_nombre_respaldo,
+            referencia=original.referencia,
+            lugar=original.lugar,
+            tipo_trabajo_id=original.tipo_trabajo_id,
+            fecha_vencimiento=original.fecha_vencimiento,
+            gastos_traslado=original.gastos_traslado,
+            observaciones=original.observaciones,
+            creado_por=usuario,
+            estado='borrador'
+        )
+        copia.save()  # Asigna el número (SecuenciaCotizacion)
+
+        servicios = list(original.items_servicio.order_by('orden', 'id').values('id', *campos_servicio))
+        nuevos_servicios = ItemServicio.objects.bulk_create([
+            ItemServicio(cotizacion=copia, **{campo: fila[campo] for campo in campos_servicio})
+            for fila in servicios
+        ])
+        item_nuevo = {fila['id']: item for fila, item in zip(servicios, nuevos_servicios)}
+
+        ParametroItemServicio.objects.bulk_create([
+            ParametroItemServicio(
+                item_servicio=item_nuevo[item_servicio_id],
+                parametro_id=parametro_id,
+                valor=valor
+            )
+            for item_servicio_id, parametro_id, valor in ParametroItemServicio.objects.filter(
+                item_servicio__cotizacion=original
+            ).order_by('id').values_list('item_servicio_id', 'parametro_id', 'valor')
+        ])
+
+        ItemMaterial.objects.bulk_create([
+            ItemMaterial(cotizacion=copia, **fila)
+            for fila in original.items_material.order_by('id').values(*campos_material)
+        ])
+        ItemManoObra.objects.bulk_create([
+            ItemManoObra(cotizacion=copia, **fila)
+            for fila in original.items_mano_obra.order_by('id').values(*campos_mano_obra)
+        ])
+
+        copia.calcular_totales()
+
+    return copia
@@ -0,0 +1,73 @@
+import base64
+import json
+from datetime import datetime
+from django.db.models import Q
+from django.http import StreamingHttpResponse
+
+# Tamaño de página de los endpoints paginados por cursor
+LIMITE_POR_DEFECTO = 100
+LIMITE_MAXIMO = 500
+
+
+def codificar_cursor(fecha, pk):
+    """Codifica la posición (fecha, id) de la última fila entregada"""
+    valor = f'{fecha.isoformat()}|{pk}'
+    return base64.urlsafe_b64encode(valor.encode()).decode()
+
+
+def decodificar_cursor(cursor):
+    """
+    Decodifica un cursor generado por codificar_cursor.
+
+    Raises:
+        ValueError si el cursor está mal formado.
+    """
+    fecha, pk = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+    return datetime.fromisoformat(fecha), int(pk)
+
+
+def leer_limite(valor):
+    """Convierte el parámetro 'limite' en un tamaño de página acotado"""
+    limite = int(valor) if valor else LIMITE_POR_DEFECTO
+    return max(1, min(limite, LIMITE_MAXIMO))
+
+
+def paginar_keyset(queryset, cursor=None, limite=LIMITE_POR_DEFECTO, campo='fecha_creacion'):
+    """
+    Retorna una página del queryset ordenado por (campo, id) descendente.
+
+    En vez de OFFSET se filtra por la posición del cursor, así cada página
+    cuesta lo mismo sin importar qué tan atrás se esté leyendo.
+
+    Returns:
+        (filas, siguiente_cursor) - siguiente_cursor es None en la última página.
+    """
+    queryset = queryset.order_by(f'-{campo}', '-id')
+    if cursor:
+        fecha, pk = decodificar_cursor(cursor)
+        queryset = queryset.filter(
+            Q(**{f'{campo}__lt': fecha}) | Q(**{campo: fecha, 'id__lt': pk})
+        )
+
+    filas = list(queryset[:limite + 1])
+    siguiente_cursor = None
+    if len(filas) > limite:
+        filas = filas[:limite]
+        ultima = filas[-1]
+        siguiente_cursor = codificar_cursor(getattr(ultima, campo), ultima.pk)
+    return filas, siguiente_cursor
+
+
+def respuesta_json_streaming(datos, clave, filas):
+    """
+    StreamingHttpResponse con el objeto JSON `datos` más la lista `clave`,
+    escrita fila por fila a medida que se consume el iterable `filas`.
+    """
+    def generar():
+        cabecera = json.dumps(datos)[:-1]
+        yield f'{cabecera}{", " if datos else ""}"{clave}": ['
+        for i, fila in enumerate(filas):
+            yield (',' if i else '') + json.dumps(fila)
+        yield ']}'
+
+    return StreamingHttpResponse(generar(), content_type='application/json')
@@ -0,0 +1,437 @@
+import hashlib
+import io
+import json
+import os
+import shutil
+import tempfile
+from django.conf import settings
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.units import cm
+from reportlab.lib import colors
+from reportlab.lib.enums import TA_CENTER, TA_LEFT
+
+# Cambiar al modificar el diseño del PDF: invalida todos los PDFs guardados
+VERSION_PDF = 1
+
+MESES_PDF = {
+    1: 'ENERO', 2: 'FEBRERO', 3: 'MARZO', 4: 'ABRIL', 5: 'MAYO', 6: 'JUNIO',
+    7: 'JULIO', 8: 'AGOSTO', 9: 'SEPTIEMBRE', 10: 'OCTUBRE', 11: 'NOVIEMBRE', 12: 'DICIEMBRE'
+}
+
+
+def _pesos(valor):
+    return f"${int(valor):,}".replace(',', '.')
+
+
+# ============================================================================
+# DATOS DEL PDF
+# ============================================================================
+
+def datos_pdf_cotizacion(cotizacion):
+    """
+    Todo lo que se imprime en el PDF de una cotización, ya formateado.
+    El PDF depende solo de estos datos, así que su firma identifica el
+    contenido del documento.
+    """
+    from .models import ItemServicio, ItemMaterial, ItemManoObra
+
+    servicios = []
+    for item in ItemServicio.objects.filter(cotizacion=cotizacion).select_related('servicio'):
+        descripcion = item.descripcion_personalizada or str(item.servicio)
+        servicios.append([
+            descripcion,
+            f"{item.cantidad} {item.servicio.unidad if item.servicio else 'UND'}",
+            _pesos(item.precio_unitario),
+            _pesos(item.subtotal)
+        ])
+
+    materiales = []
+    for item in ItemMaterial.objects.filter(cotizacion=cotizacion).select_related('material__unidad'):
+        if item.descripcion_personalizada:
+            descripcion = item.descripcion_personalizada
+        elif item.material:
+            descripcion = f"{item.material.codigo} - {item.material.nombre}"
+        else:
+            descripcion = "Material sin especificar"
+
+        unidad = item.material.unidad if item.material else "UND"
+        materiales.append([
+            descripcion,
+            f"{item.cantidad} {unidad}",
+            _pesos(item.precio_unitario),
+            _pesos(item.subtotal)
+        ])
+
+    mano_obra = [
+        [item.descripcion, f"{item.horas}", _pesos(item.precio_hora), _pesos(item.subtotal)]
+        for item in ItemManoObra.objects.filter(cotizacion=cotizacion)
+    ]
+
+    fecha = cotizacion.fecha_creacion
+    return {
+        'numero': cotizacion.numero,
+        'cliente': cotizacion.get_nombre_cliente().upper(),
+        'representante': cotizacion.get_nombre_representante().upper(),
+        'referencia': cotizacion.referencia.upper(),
+        'lugar': cotizacion.lugar.upper(),
+        'servicios': servicios,
+        'materiales': materiales,
+        'mano_obra': mano_obra,
+        'totales': [
+            ['VALOR TOTAL TRABAJOS', _pesos(cotizacion.subtotal_servicios)],
+            ['MATERIALES', _pesos(cotizacion.subtotal_materiales)],
+            ['MANO DE OBRA', _pesos(cotizacion.subtotal_mano_obra)],
+            ['GASTOS DE TRASLADO', _pesos(cotizacion.gastos_traslado)],
+            ['', ''],  # Espacio
+            ['VALOR NETO', _pesos(cotizacion.valor_neto)],
+            ['VALOR IVA (19%)', _pesos(cotizacion.valor_iva)],
+            ['VALOR TOTAL', _pesos(cotizacion.valor_total)]
+        ],
+        'observaciones': cotizacion.observaciones or '',
+        # Formato como en el documento en papel: "OSORNO 20 DE SEPTIEMBRE DE 2022"
+        'fecha': f"OSORNO {fecha.day} DE {MESES_PDF[fecha.month]} DE {fecha.year}",
+    }
+
+
+def firma_pdf_cotizacion(datos):
+    """
+    Firma (sha256) del contenido del PDF: los datos de la cotización, la
+    configuración de empresa y VERSION_PDF. Cualquier edición genera una
+    firma distinta, así un PDF guardado nunca queda desactualizado.
+    """
+    from .models import ConfiguracionEmpresa
+
+    config = ConfiguracionEmpresa.get_config()
+    contenido = {
+        'version': VERSION_PDF,
+        'datos': datos,
+        'empresa': [config.nombre, config.descripcion, config.direccion, config.telefono, config.email],
+    }
+    return hashlib.sha256(json.dumps(contenido, sort_keys=True).encode()).hexdigest()
+
+
+# ============================================================================
+# REGISTRO DE ESTILOS
+# ============================================================================
+
+def _crear_estilos():
+    """Estilos de párrafo de los documentos; se crean una sola vez al importar"""
+    normal = getSampleStyleSheet()['Normal']
+
+    return {
+        'normal': normal,
+        # Encabezado empresa (centrado)
+        'empresa': ParagraphStyle(
+            'EmpresaStyle',
+            parent=normal,
+            fontSize=12,
+            textColor=colors.black,
+            alignment=TA_CENTER,
+            spaceBefore=0,
+            spaceAfter=3,
+            fontName='Helvetica-Bold'
+        ),
+        'info_empresa': ParagraphStyle(
+            'InfoEmpresaStyle',
+            parent=normal,
+            fontSize=10,
+            textColor=colors.black,
+            alignment=TA_CENTER,
+            spaceBefore=1,
+            spaceAfter=1
+        ),
+        # Título cotización (centrado)
+        'titulo': ParagraphStyle(
+            'TituloCotStyle',
+            parent=normal,
+            fontSize=16,
+            textColor=colors.black,
+            alignment=TA_CENTER,
+            spaceBefore=15,
+            spaceAfter=15,
+            fontName='Helvetica-Bold'
+        ),
+        # Información del cliente (alineado a la izquierda)
+        'cliente': ParagraphStyle(
+            'ClienteStyle',
+            parent=normal,
+            fontSize=11,
+            textColor=colors.black,
+            alignment=TA_LEFT,
+            spaceBefore=3,
+            spaceAfter=3,
+            fontName='Helvetica-Bold'
+        ),
+        # Subtítulos de secciones
+        'seccion': ParagraphStyle(
+            'SeccionStyle',
+            parent=normal,
+            fontSize=12,
+            textColor=colors.black,
+            spaceBefore=15,
+            spaceAfter=10,
+            fontName='Helvetica-Bold',
+            alignment=TA_LEFT
+        ),
+        'fecha': ParagraphStyle(
+            'FechaStyle',
+            parent=normal,
+            fontSize=10,
+            alignment=TA_LEFT,
+            fontName='Helvetica'
+        ),
+    }
+
+
+# Estilos compartidos por todos los PDFs (solo lectura)
+ESTILOS_PDF = _crear_estilos()
+
+ESTILOS_TABLA_PDF = {
+    'linea': TableStyle([
+        ('ALIGN', (0, 0), (0, 0), 'CENTER'),
+        ('FONTSIZE', (0, 0), (0, 0), 12),
+        ('TEXTCOLOR', (0, 0), (0, 0), colors.black),
+    ]),
+    'items': TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.black),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, 0), 9),
+        ('ALIGN', (0, 0), (-1, 0), 'CENTER'),
+        ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+        ('FONTSIZE', (0, 1), (-1, -1), 9),
+        ('ALIGN', (1, 1), (-1, -1), 'CENTER'),
+        ('ALIGN', (0, 1), (0, -1), 'LEFT'),
+        ('GRID', (0, 0), (-1, -1), 0.5, colors.black),
+        ('LEFTPADDING', (0, 0), (-1, -1), 5),
+        ('RIGHTPADDING', (0, 0), (-1, -1), 5),
+        ('TOPPADDING', (0, 0), (-1, -1), 4),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 4),
+        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+    ]),
+    'totales': TableStyle([
+        ('ALIGN', (0, 0), (0, -1), 'LEFT'),   # Conceptos a la izquierda
+        ('ALIGN', (1, 0), (1, -1), 'RIGHT'),  # Valores a la derecha
+        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+        ('FONTNAME', (0, 0), (-1, -3), 'Helvetica'),
+        ('FONTNAME', (0, -2), (-1, -1), 'Helvetica-Bold'),  # Últimas dos filas en negrita
+        ('FONTSIZE', (0, 0), (-1, -1), 11),
+        ('LINEABOVE', (0, -2), (-1, -2), 1, colors.black),  # Línea antes del valor neto
+        ('LINEABOVE', (0, -1), (-1, -1), 2, colors.black),  # Línea más gruesa antes del total
+        ('LEFTPADDING', (0, 0), (-1, -1), 10),
+        ('RIGHTPADDING', (0, 0), (-1, -1), 10),
+        ('TOPPADDING', (0, 0), (-1, -1), 4),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 4),
+    ]),
+    'firmas': TableStyle([
+        ('ALIGN', (0, 0), (0, 0), 'LEFT'),     # SALUDA ATTE a la izquierda
+        ('ALIGN', (0, 2), (0, 2), 'LEFT'),     # FIRMA a la izquierda
+        ('ALIGN', (2, 2), (2, 2), 'CENTER'),   # NOMBRE Y RUT centrado
+        ('ALIGN', (2, 3), (2, 3), 'CENTER'),   # ACEPTADO CLIENTE centrado
+        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+        ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
+        ('FONTSIZE', (0, 0), (-1, -1), 10),
+        ('LEFTPADDING', (0, 0), (-1, -1), 0),
+        ('RIGHTPADDING', (0, 0), (-1, -1), 0),
+        ('TOPPADDING', (0, 0), (-1, -1), 5),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 5),
+    ]),
+}
+
+# Encabezado fijo de la empresa: (texto, estilo)
+ENCABEZADO_EMPRESA = [
+    ("JOSE E. ALVARADO N.", 'empresa'),
+    ("SERVICIOS ELECTROMECANICOS", 'info_empresa'),
+    ("INSTALACIÓN, MANTENCIÓN Y REPARACIÓN DE BOMBAS DE AGUA.", 'info_empresa'),
+    ("SUPERFICIE Y SUMERGIBLES", 'info_empresa'),
+    ("Pje. Santa Elisa 2437 Osorno", 'info_empresa'),
+    ("TELEFONOS: 9-76193683/ EMAIL: seelmec@gmail.com", 'info_empresa'),
+]
+
+FIRMAS_PDF = [
+    ['SALUDA ATTE.       JOSE E. ALVARADO N.', '', ''],
+    ['', '', ''],
+    ['FIRMA:_________________', '', 'NOMBRE Y RUT:_________________'],
+    ['', '', 'ACEPTADO CLIENTE']
+]
+
+
+# ============================================================================
+# CONSTRUCCIÓN DEL PDF
+# ============================================================================
+
+def nuevo_documento(destino):
+    """Documento A4 con los márgenes de los PDFs de la empresa"""
+    return SimpleDocTemplate(
+        destino,
+        pagesize=A4,
+        rightMargin=2*cm,
+        leftMargin=2*cm,
+        topMargin=1.5*cm,
+        bottomMargin=1.5*cm
+    )
+
+
+def elementos_pdf_cotizacion(datos):
+    """
+    Flowables del PDF de una cotización a partir de datos_pdf_cotizacion.
+    Los flowables guardan estado al dibujarse, por eso se crean por
+    documento; los estilos vienen del registro compartido.
+    """
+    estilos = ESTILOS_PDF
+    elements = [Paragraph(texto, estilos[estilo]) for texto, estilo in ENCABEZADO_EMPRESA]
+
+    # LÍNEA DE SEPARACIÓN
+    elements.append(Spacer(1, 10))
+    line_table = Table([['_' * 80]], colWidths=[17*cm])
+    line_table.setStyle(ESTILOS_TABLA_PDF['linea'])
+    elements.append(line_table)
+    elements.append(Spacer(1, 10))
+
+    # TÍTULO COTIZACIÓN (CENTRADO)
+    elements.append(Paragraph(f"COTIZACIÓN   N°  {datos['numero']}", estilos['titulo']))
+
+    # INFORMACIÓN DEL CLIENTE (ALINEADO A LA IZQUIERDA)
+    elements.append(Paragraph(f"SEÑOR(ES): {datos['cliente']}", estilos['cliente']))
+    if datos['representante']:
+        elements.append(Paragraph(f"ATENCIÓN: {datos['representante']}", estilos['cliente']))
+    elements.append(Paragraph(f"REFERENCIA: {datos['referencia']}", estilos['cliente']))
+    elements.append(Paragraph(f"LUGAR: {datos['lugar']}", estilos['cliente']))
+
+    # SUBTÍTULO DESCRIPCIÓN
+    elements.append(Paragraph("A.- DESCRIPCIÓN DE TRABAJOS, DETALLE Y VALORIZACIÓN.", estilos['seccion']))
+    elements.append(Spacer(1, 10))
+
+    # TABLAS DE SERVICIOS, MATERIALES Y MANO DE OBRA
+    secciones = [
+        (datos['servicios'], ['DESCRIPCIÓN DEL TRABAJO', 'CANTIDAD', 'PRECIO UNIT.', 'SUBTOTAL'], 10),
+        (datos['materiales'], ['MATERIAL', 'CANTIDAD', 'PRECIO UNIT.', 'SUBTOTAL'], 10),
+        (datos['mano_obra'], ['MANO DE OBRA', 'HORAS', 'PRECIO/HORA', 'SUBTOTAL'], 15),
+    ]
+    for filas, encabezado, espacio in secciones:
+        if not filas:
+            continue
+        tabla = Table([encabezado] + filas, colWidths=[9*cm, 2.5*cm, 2.5*cm, 3*cm])
+        tabla.setStyle(ESTILOS_TABLA_PDF['items'])
+        elements.append(tabla)
+        elements.append(Spacer(1, espacio))
+
+    # SECCIÓN DE TOTALES
+    elements.append(Spacer(1, 20))
+    totales_table = Table(datos['totales'], colWidths=[10*cm, 7*cm])
+    totales_table.setStyle(ESTILOS_TABLA_PDF['totales'])
+    elements.append(totales_table)
+
+    # OBSERVACIONES
+    elements.append(Spacer(1, 25))
+    nota = datos['observaciones'] or 'Sin observaciones adicionales.'
+    elements.append(Paragraph(f"NOTA: {nota}", estilos['normal']))
+
+    # SECCIÓN DE FIRMAS
+    elements.append(Spacer(1, 20))
+    firmas_table = Table(FIRMAS_PDF, colWidths=[7*cm, 3*cm, 7*cm])
+    firmas_table.setStyle(ESTILOS_TABLA_PDF['firmas'])
+    elements.append(firmas_table)
+
+    # FECHA (alineada a la izquierda)
+    elements.append(Spacer(1, 30))
+    elements.append(Paragraph(datos['fecha'], estilos['fecha']))
+
+    return elements
+
+
+def construir_pdf_cotizacion(datos):
+    """Genera el PDF (bytes) de una cotización a partir de datos_pdf_cotizacion"""
+    buffer = io.BytesIO()
+    nuevo_documento(buffer).build(elementos_pdf_cotizacion(datos))
+    return buffer.getvalue()
+
+
+# ============================================================================
+# PDFs GUARDADOS POR FIRMA
+# ============================================================================
+
+def _carpeta_pdf(cotizacion_id):
+    return os.path.join(settings.PDF_COTIZACIONES_DIR, str(cotizacion_id))
+
+
+def pdf_guardado(cotizacion_id, firma):
+    """Ruta del PDF guardado con esa firma, o None si no existe"""
+    ruta = os.path.join(_carpeta_pdf(cotizacion_id), f'{firma}.pdf')
+    return ruta if os.path.exists(ruta) else None
+
+
+def guardar_pdf(cotizacion_id, firma, pdf):
+    """
+    Guarda el PDF con su firma y borra las versiones anteriores de esa
+    cotización. Retorna la ruta del archivo.
+    """
+    carpeta = _carpeta_pdf(cotizacion_id)
+    ruta = os.path.join(carpeta, f'{firma}.pdf')
+    os.makedirs(carpeta, exist_ok=True)
+
+    # Escribir en un temporal de la misma carpeta y renombrar: otro proceso
+    # nunca lee un PDF a medio escribir
+    descriptor, temporal = tempfile.mkstemp(dir=carpeta, suffix='.tmp')
+    with os.fdopen(descriptor, 'wb') as archivo:
+        archivo.write(pdf)
+    os.replace(temporal, ruta)
+
+    for nombre in os.listdir(carpeta):
+        if nombre.endswith('.pdf') and nombre != f'{firma}.pdf':
+            try:
+                os.remove(os.path.join(carpeta, nombre))
+            except FileNotFoundError:
+                pass
+
+    return ruta
+
+
+def ruta_pdf_cotizacion(cotizacion):
+    """
+    Ruta del PDF de la cotización en disco. Si ya existe uno con la firma
+    del contenido actual se reutiliza (una firma y una lectura de archivo);
+    si no, se genera, se escribe de forma atómica y se borran las versiones
+    anteriores de esa cotización.
+    """
+    datos = datos_pdf_cotizacion(cotizacion)
+    firma = firma_pdf_cotizacion(datos)
+
+    ruta = pdf_guardado(cotizacion.pk, firma)
+    if ruta:
+        return ruta
+
+    return guardar_pdf(cotizacion.pk, firma, construir_pdf_cotizacion(datos))
+
+
+def abrir_pdf_cotizacion(cotizacion):
+    """
+    PDF de la cotización abierto para lectura binaria, con el mismo criterio
+    de reutilización que ruta_pdf_cotizacion.
+
+    Entre obtener la ruta y abrirla, otra petición puede guardar una versión
+    más nueva y borrar esta; en ese caso se sirve el PDF generado en memoria
+    con los datos ya leídos. Una vez abierto, borrar el archivo no afecta la
+    lectura.
+    """
+    datos = datos_pdf_cotizacion(cotizacion)
+    firma = firma_pdf_cotizacion(datos)
+
+    pdf = None
+    ruta = pdf_guardado(cotizacion.pk, firma)
+    if ruta is None:
+        pdf = construir_pdf_cotizacion(datos)
+        ruta = guardar_pdf(cotizacion.pk, firma, pdf)
+
+    try:
+        return open(ruta, 'rb')
+    except FileNotFoundError:
+        return io.BytesIO(pdf or construir_pdf_cotizacion(datos))
+
+
+def eliminar_pdfs_cotizacion(cotizacion_id):
+    """Borra los PDFs guardados de una cotización eliminada"""
+    shutil.rmtree(_carpeta_pdf(cotizacion_id), ignore_errors=True)
+
@@ -0,0 +1,198 @@
+import os
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+from django.http import StreamingHttpResponse
+from .utils_periodos import rango_dias, filtrar_periodo, filtrar_rango
+from .utils_pdf import (
+    datos_pdf_cotizacion, firma_pdf_cotizacion, construir_pdf_cotizacion,
+    pdf_guardado, guardar_pdf,
+)
+
+# Estados que se envían a contabilidad si no se indica otro
+ESTADOS_PDF_LOTE = ['aprobada', 'finalizada']
+
+# Cotizaciones leídas y repartidas entre los procesos por vuelta; acota la
+# memoria (PDFs en espera de entrar al ZIP) sin dejar procesos ociosos
+COTIZACIONES_POR_LOTE_PDF = 64
+
+# Tope de cotizaciones para la descarga web: se dibuja en el proceso de la
+# petición (sin pool) y debe terminar dentro del timeout de gunicorn. Lotes
+# mayores se generan con el comando exportar_pdfs_cotizaciones.
+MAXIMO_PDFS_WEB = 200
+
+
+def _fecha(valor, nombre, formato='AAAA-MM-DD'):
+    try:
+        return date.fromisoformat(valor)
+    except ValueError:
+        raise ValueError(f'{nombre} debe tener formato {formato}')
+
+
+def consulta_pdf_lote(parametros):
+    """
+    Cotizaciones cuyo PDF va en el ZIP, según los filtros:
+    - desde / hasta: fechas AAAA-MM-DD de creación (inclusive)
+    - mes: AAAA-MM, alternativa a desde/hasta
+    - estado: uno o varios separados por coma (por defecto ESTADOS_PDF_LOTE)
+    - cliente: ID del cliente
+
+    Raises:
+        ValueError si una fecha o estado no es válido.
+    """
+    from .models import Cotizacion
+
+    cotizaciones = Cotizacion.objects.select_related('cliente', 'representante').order_by('fecha_creacion', 'id')
+
+    # Rangos [inicio, fin) con gte/lt, que aprovechan el índice (fecha_creacion, estado)
+    mes = parametros.get('mes', '')
+    if mes:
+        inicio = _fecha(f'{mes}-01', 'mes', 'AAAA-MM')
+        cotizaciones = filtrar_periodo(cotizaciones, f'mes-{inicio.month}-{inicio.year}')
+
+    desde = parametros.get('desde', '')
+    hasta = parametros.get('hasta', '')
+    cotizaciones = filtrar_rango(cotizaciones, *rango_dias(
+        _fecha(desde, 'desde') if desde else None,
+        _fecha(hasta, 'hasta') if hasta else None,
+    ))
+
+    estados = [e.strip() for e in parametros.get('estado', '').split(',') if e.strip()] or ESTADOS_PDF_LOTE
+    validos = dict(Cotizacion.ESTADO_CHOICES)
+    invalidos = [e for e in estados if e not in validos]
+    if invalidos:
+        raise ValueError(f'Estado no válido: {", ".join(invalidos)}')
+    cotizaciones = cotizaciones.filter(estado__in=estados)
+
+    cliente_id = parametros.get('cliente', '')
+    if cliente_id:
+        cotizaciones = cotizaciones.filter(cliente_id=cliente_id)
+
+    return cotizaciones
+
+
+def pdfs_cotizaciones(cotizaciones, procesos=None):
+    """
+    Genera (nombre_archivo, contenido) por cotización, en el orden del
+    queryset. Los PDFs guardados con la firma vigente se leen de disco;
+    el resto se dibuja en un ProcessPoolExecutor (ReportLab es CPU puro y
+    con hilos no escala por el GIL) y se guarda para próximas descargas.
+
+    Las consultas se hacen en este proceso: a los procesos hijos solo
+    viajan los datos ya formateados y vuelven los bytes del PDF.
+    `procesos=1` dibuja todo en el proceso actual.
+    """
+    procesos = procesos or os.cpu_count() or 1
+    pool = None
+
+    def dibujar(todos_datos):
+        # El pool se crea recién cuando hay más de un PDF que dibujar: si
+        # todos están guardados no se paga el arranque de los procesos
+        nonlocal pool
+        if procesos == 1 or len(todos_datos) < 2:
+            return map(construir_pdf_cotizacion, todos_datos)
+        if pool is None:
+            pool = ProcessPoolExecutor(max_workers=procesos)
+        return pool.map(construir_pdf_cotizacion, todos_datos)
+
+    try:
+        lote = []
+        for cotizacion in cotizaciones.iterator(chunk_size=COTIZACIONES_POR_LOTE_PDF):
+            lote.append(cotizacion)
+            if len(lote) == COTIZACIONES_POR_LOTE_PDF:
+                yield from _pdfs_lote(lote, dibujar)
+                lote = []
+        if lote:
+            yield from _pdfs_lote(lote, dibujar)
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+
+
+def _pdfs_lote(cotizaciones, dibujar):
+    pendientes = []
+    guardados = {}
+    for cotizacion in cotizaciones:
+        datos = datos_pdf_cotizacion(cotizacion)
+        firma = firma_pdf_cotizacion(datos)
+        ruta = pdf_guardado(cotizacion.pk, firma)
+        if ruta:
+            guardados[cotizacion.pk] = ruta
+        else:
+            pendientes.append((cotizacion, firma, datos))
+
+    dibujados = dibujar([datos for _, _, datos in pendientes])
+
+    nuevos = {}
+    for (cotizacion, firma, _), pdf in zip(pendientes, dibujados):
+        guardar_pdf(cotizacion.pk, firma, pdf)
+        nuevos[cotizacion.pk] = pdf
+
+    for cotizacion in cotizaciones:
+        # Las cotizaciones sin número usan su ID para no repetir nombres en el ZIP
+        nombre = f'Cotizacion_{cotizacion.numero or cotizacion.pk}.pdf'
+        if cotizacion.pk in nuevos:
+            yield nombre, nuevos.pop(cotizacion.pk)
+        else:
+            with open(guardados[cotizacion.pk], 'rb') as archivo:
+                yield nombre, archivo.read()
+
+
+def escribir_zip_pdfs(destino, cotizaciones, procesos=None, al_avanzar=None):
+    """
+    Escribe los PDFs de `cotizaciones` en un ZIP. `destino` es una ruta o
+    un archivo binario (no necesita ser buscable). Los PDFs ya vienen
+    comprimidos, así que se guardan sin volver a comprimir.
+    `al_avanzar(n)` se llama después de cada PDF con el total escrito.
+
+    Returns:
+        Cantidad de PDFs escritos.
+    """
+    escritos = 0
+    with zipfile.ZipFile(destino, 'w', compression=zipfile.ZIP_STORED) as archivo_zip:
+        for nombre, pdf in pdfs_cotizaciones(cotizaciones, procesos):
+            archivo_zip.writestr(nombre, pdf)
+            escritos += 1
+            if al_avanzar:
+                al_avanzar(escritos)
+    return escritos
+
+
+class _Acumulador:
+    """Pseudo-archivo de solo escritura: guarda lo escrito hasta que se retira"""
+
+    def __init__(self):
+        self.partes = []
+
+    def write(self, datos):
+        self.partes.append(bytes(datos))
+        return len(datos)
+
+    def flush(self):
+        pass
+
+    def retirar(self):
+        datos = b''.join(self.partes)
+        self.partes = []
+        return datos
+
+
+def respuesta_zip_pdfs(nombre_archivo, cotizaciones):
+    """
+    StreamingHttpResponse con el ZIP de PDFs: cada PDF se envía al cliente
+    apenas entra al archivo, sin armar el ZIP completo en memoria ni en disco.
+    Los PDFs faltantes se dibujan en el proceso de la petición: el pool de
+    procesos queda para el comando. El llamador acota la cantidad
+    (MAXIMO_PDFS_WEB).
+    """
+    def generar():
+        salida = _Acumulador()
+        with zipfile.ZipFile(salida, 'w', compression=zipfile.ZIP_STORED) as archivo_zip:
+            for nombre, pdf in pdfs_cotizaciones(cotizaciones, procesos=1):
+                archivo_zip.writestr(nombre, pdf)
+                yield salida.retirar()
+        yield salida.retirar()
+
+    response = StreamingHttpResponse(generar(), content_type='application/zip')
+    response['Content-Disposition'] = f'attachment; filename="{nombre_archivo}"'
+    return response
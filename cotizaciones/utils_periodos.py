@@ -0,0 +1,110 @@
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+from django.utils import timezone
+
+# Zona horaria en la que se interpretan los períodos de los reportes
+ZONA_REPORTES = ZoneInfo('America/Santiago')
+
+
+def rango_mes(anio, mes):
+    """Retorna el rango [inicio, fin) de un mes en la zona horaria de reportes"""
+    inicio = datetime(anio, mes, 1, tzinfo=ZONA_REPORTES)
+    if mes == 12:
+        fin = datetime(anio + 1, 1, 1, tzinfo=ZONA_REPORTES)
+    else:
+        fin = datetime(anio, mes + 1, 1, tzinfo=ZONA_REPORTES)
+    return inicio, fin
+
+
+def rango_anio(anio):
+    """Retorna el rango [inicio, fin) de un año en la zona horaria de reportes"""
+    return (
+        datetime(anio, 1, 1, tzinfo=ZONA_REPORTES),
+        datetime(anio + 1, 1, 1, tzinfo=ZONA_REPORTES)
+    )
+
+
+def rango_dias(desde=None, hasta=None):
+    """
+    Rango [inicio, fin) que cubre los días `desde` y `hasta` (date,
+    inclusive) en la zona horaria de reportes. None deja el extremo abierto.
+    """
+    inicio = datetime(desde.year, desde.month, desde.day, tzinfo=ZONA_REPORTES) if desde else None
+    fin = None
+    if hasta:
+        siguiente = hasta + timedelta(days=1)
+        fin = datetime(siguiente.year, siguiente.month, siguiente.day, tzinfo=ZONA_REPORTES)
+    return inicio, fin
+
+
+def resolver_periodo(periodo, ahora=None):
+    """
+    Traduce un token de período de los reportes a un rango [inicio, fin).
+
+    Tokens soportados:
+    - 'todos': sin filtro
+    - 'mes-actual', 'mes-anterior', 'mes-M-AAAA': un mes calendario
+    - 'ano', 'ano-AAAA': un año calendario
+    - 'trimestre', 'semestre': últimos 90 / 180 días hasta ahora
+    Cualquier otro valor se interpreta como el año en curso.
+
+    Returns:
+        (inicio, fin) como datetimes con zona horaria; None deja el extremo abierto.
+
+    Raises:
+        ValueError si el token tiene un mes o año inválido.
+    """
+    ahora = timezone.localtime(ahora or timezone.now(), ZONA_REPORTES)
+
+    if periodo == 'todos':
+        return None, None
+
+    if periodo == 'mes-actual':
+        return rango_mes(ahora.year, ahora.month)
+
+    if periodo == 'mes-anterior':
+        if ahora.month > 1:
+            return rango_mes(ahora.year, ahora.month - 1)
+        return rango_mes(ahora.year - 1, 12)
+
+    if periodo.startswith('mes-') and len(periodo.split('-')) == 3:
+        partes = periodo.split('-')
+        mes, anio = int(partes[1]), int(partes[2])
+        if not 1 <= mes <= 12:
+            raise ValueError(f'Mes inválido: {mes}')
+        return rango_mes(anio, mes)
+
+    if periodo.startswith('ano-'):
+        return rango_anio(int(periodo.split('-')[1]))
+
+    if periodo == 'trimestre':
+        return ahora - timedelta(days=90), None
+
+    if periodo == 'semestre':
+        return ahora - timedelta(days=180), None
+
+    # 'ano' y valores desconocidos: año en curso
+    return rango_anio(ahora.year)
+
+
+def filtrar_periodo(queryset, periodo, ahora=None, campo='fecha_creacion'):
+    """
+    Aplica el rango de un período a un queryset con comparaciones
+    gte/lt sobre `campo`, que sí aprovechan el índice de la columna.
+    """
+    return filtrar_rango(queryset, *resolver_periodo(periodo, ahora), campo=campo)
+
+
+def filtrar_rango(queryset, inicio, fin, campo='fecha_creacion'):
+    """Filtra `campo` en [inicio, fin) con gte/lt; None deja el extremo abierto"""
+    if inicio is not None:
+        queryset = queryset.filter(**{f'{campo}__gte': inicio})
+    if fin is not None:
+        queryset = queryset.filter(**{f'{campo}__lt': fin})
+    return queryset
+
+
+def es_inicio_de_mes(fecha):
+    """Indica si un datetime corresponde a las 00:00 del día 1 en la zona de reportes"""
+    fecha = timezone.localtime(fecha, ZONA_REPORTES)
+    return (fecha.day, fecha.hour, fecha.minute, fecha.second, fecha.microsecond) == (1, 0, 0, 0, 0)
@@ -0,0 +1,160 @@
+from collections import defaultdict
+from decimal import Decimal
+from django.db import transaction
+from django.db.models import F, Q, OuterRef, Subquery, DecimalField
+from django.utils import timezone
+from .utils_cache import invalidar_reportes_al_confirmar
+from .utils_periodos import ZONA_REPORTES
+from .utils_reportes import recalcular_resumen_mes
+
+# Cotizaciones todavía abiertas a cambios de precio
+ESTADOS_REPRECIO = ['borrador', 'requiere_cambios']
+
+
+def _catalogos():
+    """(tipo, modelo del item, relación, modelo del catálogo, campo de precio)"""
+    from .models import ItemServicio, ItemMaterial, ServicioBase, Material
+
+    return [
+        ('servicio', ItemServicio, 'servicio', ServicioBase, 'precio_base'),
+        ('material', ItemMaterial, 'material', Material, 'precio_unitario'),
+    ]
+
+
+def _items_desactualizados(modelo, relacion, campo, ids):
+    """Items de cotizaciones abiertas cuyo precio difiere del precio de catálogo"""
+    items = modelo.objects.filter(
+        cotizacion__estado__in=ESTADOS_REPRECIO
+    ).filter(
+        ~Q(precio_unitario=F(f'{relacion}__{campo}'))
+    ).order_by()
+
+    if ids is not None:
+        items = items.filter(**{f'{relacion}_id__in': ids})
+    return items
+
+
+def vista_previa_reprecio(servicios=None, materiales=None):
+    """
+    Diferencias que aplicaría aplicar_reprecio, sin modificar nada.
+    `servicios` / `materiales` acotan el cambio a esos IDs de catálogo
+    (None: todos; lista vacía: ninguno).
+
+    Returns:
+        {'items': [...], 'cotizaciones': [...]} con precio y subtotal actual
+        y nuevo de cada item, y valor total actual y estimado de cada
+        cotización (sus subtotales guardados más la diferencia).
+    """
+    from .models import Cotizacion
+
+    filtros = {'servicio': servicios, 'material': materiales}
+    items = []
+    diferencias = defaultdict(Decimal)
+
+    for tipo, modelo, relacion, catalogo, campo in _catalogos():
+        filas = _items_desactualizados(modelo, relacion, campo, filtros[tipo]).values(
+            'id', 'cotizacion_id', 'cantidad', 'precio_unitario', 'subtotal',
+            catalogo_id=F(f'{relacion}_id'),
+            nombre=F(f'{relacion}__nombre'),
+            precio_nuevo=F(f'{relacion}__{campo}'),
+        ).order_by('cotizacion_id', 'id')
+
+        for fila in filas:
+            subtotal_nuevo = fila['cantidad'] * fila['precio_nuevo']
+            diferencias[fila['cotizacion_id']] += subtotal_nuevo - fila['subtotal']
+            items.append({
+                'tipo': tipo,
+                'item_id': fila['id'],
+                'cotizacion_id': fila['cotizacion_id'],
+                'catalogo_id': fila['catalogo_id'],
+                'nombre': fila['nombre'],
+                'cantidad': fila['cantidad'],
+                'precio_actual': fila['precio_unitario'],
+                'precio_nuevo': fila['precio_nuevo'],
+                'subtotal_actual': fila['subtotal'],
+                'subtotal_nuevo': subtotal_nuevo,
+            })
+
+    cotizaciones = []
+    for cot in Cotizacion.objects.filter(pk__in=diferencias).order_by('id').values(
+        'id', 'numero', 'estado', 'valor_neto', 'valor_total'
+    ):
+        neto_nuevo = cot['valor_neto'] + diferencias[cot['id']]
+        total_nuevo = neto_nuevo + neto_nuevo * Decimal('0.19')
+        cotizaciones.append({
+            'id': cot['id'],
+            'numero': cot['numero'],
+            'estado': cot['estado'],
+            'valor_total_actual': cot['valor_total'],
+            'valor_total_nuevo': total_nuevo.quantize(Decimal('0.01')),
+            'diferencia': (total_nuevo - cot['valor_total']).quantize(Decimal('0.01')),
+        })
+
+    return {'items': items, 'cotizaciones': cotizaciones}
+
+
+def aplicar_reprecio(servicios=None, materiales=None):
+    """
+    Lleva al precio de catálogo vigente los items de servicio y material de
+    las cotizaciones abiertas (ESTADOS_REPRECIO) y recalcula sus totales.
+    Todo con UPDATE por conjunto: una lectura de IDs y un UPDATE por tabla
+    de items, y un UPDATE para todas las cotizaciones afectadas, sin
+    importar cuántos items cambien.
+
+    update() no emite post_save: aquí se marca actualizado_en, se rehace
+    el resumen mensual de los meses tocados y se invalida el caché de
+    reportes.
+
+    Returns:
+        {'items': cantidad de items actualizados, 'cotizaciones': cantidad de cotizaciones}
+    """
+    from .models import Cotizacion, ItemServicio, ItemMaterial, ItemManoObra
+
+    filtros = {'servicio': servicios, 'material': materiales}
+    decimal = DecimalField(max_digits=12, decimal_places=2)
+    ahora = timezone.now()
+
+    with transaction.atomic():
+        ids_cotizaciones = set()
+        actualizados = 0
+
+        for tipo, modelo, relacion, catalogo, campo in _catalogos():
+            pendientes = _items_desactualizados(modelo, relacion, campo, filtros[tipo])
+            ids_cotizaciones.update(pendientes.values_list('cotizacion_id', flat=True).distinct())
+
+            precio = Subquery(
+                catalogo.objects.filter(pk=OuterRef(f'{relacion}_id')).values(campo)[:1],
+                output_field=decimal
+            )
+            actualizados += pendientes.update(
+                precio_unitario=precio,
+                subtotal=F('cantidad') * precio,
+                actualizado_en=ahora
+            )
+
+        if not ids_cotizaciones:
+            return {'items': 0, 'cotizaciones': 0}
+
+        # Mismo cálculo que Cotizacion.calcular_totales, para todas a la vez
+        servicios_total = Cotizacion._suma_subtotales(ItemServicio)
+        materiales_total = Cotizacion._suma_subtotales(ItemMaterial)
+        mano_obra_total = Cotizacion._suma_subtotales(ItemManoObra)
+        neto = servicios_total + materiales_total + mano_obra_total + F('gastos_traslado')
+        iva = neto * Decimal('0.19')
+
+        cotizaciones = Cotizacion.objects.filter(pk__in=ids_cotizaciones)
+        cotizaciones.update(
+            subtotal_servicios=servicios_total,
+            subtotal_materiales=materiales_total,
+            subtotal_mano_obra=mano_obra_total,
+            valor_neto=neto,
+            valor_iva=iva,
+            valor_total=neto + iva,
+            actualizado_en=ahora
+        )
+
+        for mes in cotizaciones.order_by().datetimes('fecha_creacion', 'month', tzinfo=ZONA_REPORTES):
+            recalcular_resumen_mes(mes.year, mes.month)
+        invalidar_reportes_al_confirmar()
+
+    return {'items': actualizados, 'cotizaciones': len(ids_cotizaciones)}
@@ -0,0 +1,276 @@
+from datetime import datetime, timedelta
+from decimal import Decimal
+from django.db import transaction
+from django.db.models import Q, Count, Sum
+from django.db.models.functions import Coalesce, TruncMonth
+from django.utils import timezone
+from .utils_periodos import ZONA_REPORTES, rango_mes, resolver_periodo, es_inicio_de_mes
+
+
+def filtro_meses(desde, hasta):
+    """
+    Construye un Q sobre (anio, mes) para el rango de meses [desde, hasta].
+    desde y hasta son tuplas (anio, mes); None deja el extremo abierto.
+    """
+    filtro = Q()
+    if desde:
+        filtro &= Q(anio__gt=desde[0]) | Q(anio=desde[0], mes__gte=desde[1])
+    if hasta:
+        filtro &= Q(anio__lt=hasta[0]) | Q(anio=hasta[0], mes__lte=hasta[1])
+    return filtro
+
+
+def meses_periodo(periodo, ahora=None):
+    """
+    Traduce un período del dashboard a un rango de meses completos.
+
+    Returns:
+        ((anio, mes), (anio, mes)) para períodos alineados a meses,
+        (None, None) para 'todos' y None para ventanas móviles
+        (trimestre/semestre), que no se pueden leer desde el resumen.
+    """
+    inicio, fin = resolver_periodo(periodo, ahora)
+    if inicio is None and fin is None:
+        return None, None
+    if inicio is None or fin is None or not (es_inicio_de_mes(inicio) and es_inicio_de_mes(fin)):
+        return None
+
+    ultimo_mes = timezone.localtime(fin, ZONA_REPORTES) - timedelta(days=1)
+    return (inicio.year, inicio.month), (ultimo_mes.year, ultimo_mes.month)
+
+
+def recalcular_resumen_mes(anio, mes):
+    """Recalcula las filas del resumen mensual de un mes a partir de Cotizacion"""
+    from .models import Cotizacion, ResumenMensualCotizacion
+
+    inicio, fin = rango_mes(anio, mes)
+    stats = Cotizacion.objects.filter(
+        fecha_creacion__gte=inicio,
+        fecha_creacion__lt=fin
+    ).order_by().values('estado').annotate(
+        cantidad=Count('id'),
+        valor=Sum('valor_total')
+    )
+
+    filas = [
+        ResumenMensualCotizacion(
+            anio=anio,
+            mes=mes,
+            estado=s['estado'],
+            cantidad=s['cantidad'],
+            valor_total=s['valor'] or 0
+        )
+        for s in stats
+    ]
+
+    with transaction.atomic():
+        ResumenMensualCotizacion.objects.filter(anio=anio, mes=mes).exclude(
+            estado__in=[f.estado for f in filas]
+        ).delete()
+        if filas:
+            ResumenMensualCotizacion.objects.bulk_create(
+                filas,
+                update_conflicts=True,
+                unique_fields=['anio', 'mes', 'estado'],
+                update_fields=['cantidad', 'valor_total', 'fecha_actualizacion']
+            )
+
+
+def reconstruir_resumen_mensual():
+    """Reconstruye el resumen mensual completo. Retorna la cantidad de filas creadas"""
+    from .models import Cotizacion, ResumenMensualCotizacion
+
+    stats = Cotizacion.objects.annotate(
+        mes_creacion=TruncMonth('fecha_creacion', tzinfo=ZONA_REPORTES)
+    ).order_by().values('mes_creacion', 'estado').annotate(
+        cantidad=Count('id'),
+        valor=Sum('valor_total')
+    )
+
+    filas = [
+        ResumenMensualCotizacion(
+            anio=s['mes_creacion'].year,
+            mes=s['mes_creacion'].month,
+            estado=s['estado'],
+            cantidad=s['cantidad'],
+            valor_total=s['valor'] or 0
+        )
+        for s in stats
+    ]
+
+    with transaction.atomic():
+        ResumenMensualCotizacion.objects.all().delete()
+        ResumenMensualCotizacion.objects.bulk_create(filas, batch_size=1000)
+
+    return len(filas)
+
+
+def _productividad_agrupada(trabajos):
+    """Agrupa trabajos por empleado y mes (fin, inicio o creación de la cotización)"""
+    return trabajos.annotate(
+        mes_trabajo=TruncMonth(
+            Coalesce('fecha_fin', 'fecha_inicio', 'cotizacion__fecha_creacion'),
+            tzinfo=ZONA_REPORTES
+        )
+    ).order_by().values('empleado_id', 'mes_trabajo').annotate(
+        asignados=Count('id'),
+        completados=Count('id', filter=Q(estado='completado')),
+        horas=Sum('horas_trabajadas')
+    )
+
+
+def _filas_productividad(stats):
+    from .models import ProductividadMensualEmpleado
+
+    return [
+        ProductividadMensualEmpleado(
+            empleado_id=s['empleado_id'],
+            anio=s['mes_trabajo'].year,
+            mes=s['mes_trabajo'].month,
+            trabajos_asignados=s['asignados'],
+            trabajos_completados=s['completados'],
+            horas_trabajadas=s['horas'] or 0
+        )
+        for s in stats
+    ]
+
+
+def recalcular_productividad_empleado(empleado_id):
+    """
+    Recalcula todas las filas de productividad de un empleado. Un trabajo
+    puede cambiar de mes al iniciarse o terminarse, así que se rehace el
+    historial completo del empleado (una consulta agrupada por mes).
+    """
+    from .models import TrabajoEmpleado, ProductividadMensualEmpleado
+
+    filas = _filas_productividad(
+        _productividad_agrupada(TrabajoEmpleado.objects.filter(empleado_id=empleado_id))
+    )
+
+    with transaction.atomic():
+        ProductividadMensualEmpleado.objects.filter(empleado_id=empleado_id).delete()
+        ProductividadMensualEmpleado.objects.bulk_create(filas)
+
+
+def reconstruir_productividad_empleados():
+    """Reconstruye la productividad mensual de todos los empleados. Retorna la cantidad de filas creadas"""
+    from .models import TrabajoEmpleado, ProductividadMensualEmpleado
+
+    filas = _filas_productividad(_productividad_agrupada(TrabajoEmpleado.objects.all()))
+
+    with transaction.atomic():
+        ProductividadMensualEmpleado.objects.all().delete()
+        ProductividadMensualEmpleado.objects.bulk_create(filas, batch_size=1000)
+
+    return len(filas)
+
+
+def _agregados_por_estado(filtro, cantidad, valor):
+    """
+    Arma un agregado filtrado de cantidad y valor por cada estado de cotización.
+    `cantidad` y `valor` reciben el Q del estado y retornan la expresión de agregación.
+    """
+    from .models import Cotizacion
+
+    agregados = {}
+    for estado, _ in Cotizacion.ESTADO_CHOICES:
+        filtro_estado = filtro & Q(estado=estado)
+        agregados[f'cantidad_{estado}'] = cantidad(filtro_estado)
+        agregados[f'valor_{estado}'] = valor(filtro_estado)
+    return agregados
+
+
+def _por_estado_desde_agregados(datos):
+    """Convierte el resultado de _agregados_por_estado en {estado: {'cantidad', 'valor'}}"""
+    from .models import Cotizacion
+
+    por_estado = {}
+    for estado, _ in Cotizacion.ESTADO_CHOICES:
+        cantidad = datos[f'cantidad_{estado}'] or 0
+        if cantidad:
+            por_estado[estado] = {
+                'cantidad': cantidad,
+                'valor': datos[f'valor_{estado}'] or Decimal('0')
+            }
+    return por_estado
+
+
+def kpis_por_estado(periodo, ahora=None):
+    """
+    Cantidad y valor por estado del período, más las cotizaciones enviadas
+    (pendientes) de todo el historial, con agregados filtrados.
+
+    Períodos alineados a meses: una sola consulta sobre el resumen mensual.
+    Ventanas móviles: una consulta sobre el rango de Cotizacion más la
+    lectura de pendientes desde el resumen.
+
+    Returns:
+        ({estado: {'cantidad': int, 'valor': Decimal}}, pendientes)
+    """
+    from .models import Cotizacion, ResumenMensualCotizacion
+
+    meses = meses_periodo(periodo, ahora)
+    if meses is not None:
+        agregados = _agregados_por_estado(
+            filtro_meses(*meses),
+            cantidad=lambda f: Sum('cantidad', filter=f),
+            valor=lambda f: Sum('valor_total', filter=f)
+        )
+        agregados['pendientes'] = Sum('cantidad', filter=Q(estado='enviada'))
+        datos = ResumenMensualCotizacion.objects.aggregate(**agregados)
+        return _por_estado_desde_agregados(datos), datos['pendientes'] or 0
+
+    inicio, fin = resolver_periodo(periodo, ahora)
+    filtro = Q()
+    if inicio is not None:
+        filtro &= Q(fecha_creacion__gte=inicio)
+    if fin is not None:
+        filtro &= Q(fecha_creacion__lt=fin)
+
+    datos = Cotizacion.objects.filter(filtro).aggregate(**_agregados_por_estado(
+        Q(),
+        cantidad=lambda f: Count('id', filter=f),
+        valor=lambda f: Sum('valor_total', filter=f)
+    ))
+    pendientes = ResumenMensualCotizacion.objects.filter(
+        estado='enviada'
+    ).aggregate(total=Sum('cantidad'))['total'] or 0
+    return _por_estado_desde_agregados(datos), pendientes
+
+
+def serie_mensual(hoy, meses=12):
+    """
+    Serie de los últimos `meses` meses (incluido el actual) para la gráfica
+    de evolución, leída desde el resumen mensual.
+    """
+    from .models import ResumenMensualCotizacion
+
+    hoy = timezone.localtime(hoy, ZONA_REPORTES)
+    claves = []
+    anio, mes = hoy.year, hoy.month
+    for _ in range(meses):
+        claves.append((anio, mes))
+        anio, mes = (anio, mes - 1) if mes > 1 else (anio - 1, 12)
+    claves.reverse()
+
+    acumulado = {clave: {'cotizaciones': 0, 'valor': Decimal('0'), 'aprobadas': 0} for clave in claves}
+    filas = ResumenMensualCotizacion.objects.filter(
+        filtro_meses(claves[0], claves[-1])
+    ).values_list('anio', 'mes', 'estado', 'cantidad', 'valor_total')
+
+    for anio, mes, estado, cantidad, valor in filas:
+        datos = acumulado[(anio, mes)]
+        datos['cotizaciones'] += cantidad
+        datos['valor'] += valor
+        if estado == 'aprobada':
+            datos['aprobadas'] += cantidad
+
+    return [
+        {
+            'mes': datetime(anio, mes, 1).strftime('%b %y'),
+            'cotizaciones': acumulado[(anio, mes)]['cotizaciones'],
+            'valor': float(acumulado[(anio, mes)]['valor']),
+            'aprobadas': acumulado[(anio, mes)]['aprobadas']
+        }
+        for anio, mes in claves
+    ]
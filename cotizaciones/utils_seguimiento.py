@@ -0,0 +1,96 @@
+from django.db.models import (
+    Q, F, Count, Sum, Case, When, Value, Exists, OuterRef, Prefetch,
+    FloatField, ExpressionWrapper
+)
+from django.db.models.functions import Cast, Least
+
+
+def progreso_trabajo():
+    """
+    Progreso estimado (%) de un TrabajoEmpleado calculado en SQL:
+    - completado: 100
+    - en progreso con horas registradas: horas trabajadas / horas del item, tope 99
+    - en progreso sin horas (o item sin horas): 50
+    - pendiente / suspendido: 0
+    """
+    return Case(
+        When(estado='completado', then=Value(100.0)),
+        When(
+            estado='en_progreso',
+            horas_trabajadas__gt=0,
+            item_mano_obra__horas__gt=0,
+            then=Least(
+                Cast(F('horas_trabajadas'), FloatField()) * 100.0
+                / Cast(F('item_mano_obra__horas'), FloatField()),
+                Value(99.0)
+            )
+        ),
+        When(estado='en_progreso', then=Value(50.0)),
+        default=Value(0.0),
+        output_field=FloatField()
+    )
+
+
+def trabajos_seguimiento():
+    """TrabajoEmpleado con empleado e item cargados y el progreso anotado"""
+    from .models import TrabajoEmpleado
+
+    return TrabajoEmpleado.objects.select_related(
+        'empleado__user',
+        'item_mano_obra'
+    ).annotate(progreso_estimado=progreso_trabajo())
+
+
+def cotizaciones_seguimiento(filtro_estado=''):
+    """
+    Cotizaciones aprobadas con trabajos (o con trabajos en `filtro_estado`).
+
+    Retorna la consulta base, sin anotaciones, para poder reutilizarla en
+    subconsultas (estadísticas, paginación).
+    """
+    from .models import Cotizacion, TrabajoEmpleado
+
+    trabajos = TrabajoEmpleado.objects.filter(cotizacion=OuterRef('pk'))
+    if filtro_estado:
+        trabajos = trabajos.filter(estado=filtro_estado)
+
+    return Cotizacion.objects.filter(estado='aprobada').filter(Exists(trabajos))
+
+
+def anotar_seguimiento(cotizaciones, filtro_estado=''):
+    """
+    Agrega conteos por estado, horas y progreso (%) a las cotizaciones, y
+    precarga sus trabajos en `cotizacion.trabajos` con una sola consulta.
+    Ordena por progreso ascendente (más urgente primero).
+    """
+    trabajos = trabajos_seguimiento().order_by('estado', '-fecha_inicio')
+    if filtro_estado:
+        trabajos = trabajos.filter(estado=filtro_estado)
+
+    return cotizaciones.annotate(
+        total_trabajos=Count('trabajos_empleados'),
+        trabajos_completados=Count('trabajos_empleados', filter=Q(trabajos_empleados__estado='completado')),
+        trabajos_en_progreso=Count('trabajos_empleados', filter=Q(trabajos_empleados__estado='en_progreso')),
+        trabajos_pendientes=Count('trabajos_empleados', filter=Q(trabajos_empleados__estado='pendiente')),
+        horas_trabajadas=Sum('trabajos_empleados__horas_trabajadas')
+    ).annotate(
+        progreso_porcentaje=ExpressionWrapper(
+            Cast(F('trabajos_completados'), FloatField()) * 100.0 / F('total_trabajos'),
+            output_field=FloatField()
+        )
+    ).select_related('cliente', 'tipo_trabajo').prefetch_related(
+        Prefetch('trabajos_empleados', queryset=trabajos, to_attr='trabajos')
+    ).order_by('progreso_porcentaje', '-fecha_creacion')
+
+
+def estadisticas_seguimiento(cotizaciones):
+    """Conteo de trabajos por estado de todas las cotizaciones de la consulta, en una consulta"""
+    from .models import TrabajoEmpleado
+
+    return TrabajoEmpleado.objects.filter(
+        cotizacion__in=cotizaciones.values('pk')
+    ).aggregate(
+        trabajos_pendientes=Count('id', filter=Q(estado='pendiente')),
+        trabajos_en_progreso=Count('id', filter=Q(estado='en_progreso')),
+        trabajos_completados=Count('id', filter=Q(estado='completado'))
+    )
@@ -22,6 +22,7 @@ from notificaciones.models import Notificacion
 from notificaciones.utils import crear_notificacion
 from home.models import PerfilEmpleado
 from ..utils_mantenimiento import verificar_mantenimientos_materiales
+from ..utils_exportacion import FILAS_POR_LOTE, Columna, respuesta_excel
 
 @login_required
 @requiere_gerente_o_superior
@@ -351,74 +352,43 @@ def agregar_nota_solicitud_web(request, pk):
 @requiere_gerente_o_superior
 def exportar_solicitudes_web(request):
     """
-    Exporta solicitudes web a Excel.
+    Exporta solicitudes web a Excel (modo solo escritura, memoria constante).
+    Usuario y cotización se leen con la misma consulta, sin una por fila.
     """
-    from openpyxl import Workbook
-    from openpyxl.styles import Font, PatternFill, Alignment
-    from django.http import HttpResponse
+    estados = dict(Solicitud_Web.ESTADO_CHOICES)
+    ahora = timezone.now()
     
-    # Crear workbook
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Solicitudes Web"
-    
-    # Estilos
-    header_fill = PatternFill(start_color="2575C0", end_color="2575C0", fill_type="solid")
-    header_font = Font(bold=True, color="FFFFFF", size=11)
-    
-    # Headers
-    headers = [
-        'ID', 'Fecha', 'Estado', 'Nombre', 'Email', 'Teléfono',
-        'Servicio', 'Ubicación', 'Info Extra', 'Días Pendiente',
-        'Procesada Por', 'Cotización'
+    columnas = [
+        Columna('ID', 'id', ancho=8),
+        Columna('Fecha', lambda s: s['fecha_solicitud'].strftime('%d/%m/%Y %H:%M'), ancho=18),
+        Columna('Estado', lambda s: estados.get(s['estado'], s['estado'])),
+        Columna('Nombre', 'nombre_solicitante', ancho=25),
+        Columna('Email', lambda s: s['email_solicitante'] or '', ancho=30),
+        Columna('Teléfono', 'telefono_solicitante'),
+        Columna('Servicio', 'tipo_servicio_solicitado', ancho=30),
+        Columna('Ubicación', 'ubicacion_trabajo', ancho=40),
+        Columna('Info Extra', lambda s: s['informacion_adicional'] or '', ancho=40),
+        Columna(
+            'Días Pendiente',
+            lambda s: (ahora - s['fecha_solicitud']).days if s['estado'] == 'pendiente' else '-',
+            ancho=12
+        ),
+        Columna('Procesada Por', lambda s: s['procesada_por__username'] or '', ancho=20),
+        Columna('Cotización', lambda s: s['cotizacion_generada__numero'] or ''),
     ]
+    filas = Solicitud_Web.objects.order_by('-fecha_solicitud').values(
+        'id', 'fecha_solicitud', 'estado', 'nombre_solicitante', 'email_solicitante',
+        'telefono_solicitante', 'tipo_servicio_solicitado', 'ubicacion_trabajo',
+        'informacion_adicional', 'procesada_por__username', 'cotizacion_generada__numero'
+    ).iterator(chunk_size=FILAS_POR_LOTE)
     
-    for col, header in enumerate(headers, 1):
-        cell = ws.cell(row=1, column=col)
-        cell.value = header
-        cell.fill = header_fill
-        cell.font = header_font
-        cell.alignment = Alignment(horizontal='center', vertical='center')
-    
-    # Datos
-    solicitudes = Solicitud_Web.objects.all().order_by('-fecha_solicitud')
-    
-    for row, sol in enumerate(solicitudes, 2):
-        ws.cell(row=row, column=1, value=sol.id)
-        ws.cell(row=row, column=2, value=sol.fecha_solicitud.strftime('%d/%m/%Y %H:%M'))
-        ws.cell(row=row, column=3, value=sol.get_estado_display())
-        ws.cell(row=row, column=4, value=sol.nombre_solicitante)
-        ws.cell(row=row, column=5, value=sol.email_solicitante or '')
-        ws.cell(row=row, column=6, value=sol.telefono_solicitante)
-        ws.cell(row=row, column=7, value=sol.tipo_servicio_solicitado)
-        ws.cell(row=row, column=8, value=sol.ubicacion_trabajo)
-        ws.cell(row=row, column=9, value=sol.informacion_adicional or '')
-        ws.cell(row=row, column=10, value=sol.get_dias_pendiente() if sol.estado == 'pendiente' else '-')
-        ws.cell(row=row, column=11, value=sol.procesada_por.username if sol.procesada_por else '')
-        ws.cell(row=row, column=12, value=sol.cotizacion_generada.numero if sol.cotizacion_generada else '')
-    
-    # Ajustar anchos
-    ws.column_dimensions['A'].width = 8
-    ws.column_dimensions['B'].width = 18
-    ws.column_dimensions['C'].width = 15
-    ws.column_dimensions['D'].width = 25
-    ws.column_dimensions['E'].width = 30
-    ws.column_dimensions['F'].width = 15
-    ws.column_dimensions['G'].width = 30
-    ws.column_dimensions['H'].width = 40
-    ws.column_dimensions['I'].width = 40
-    ws.column_dimensions['J'].width = 12
-    ws.column_dimensions['K'].width = 20
-    ws.column_dimensions['L'].width = 15
-    
-    # Respuesta
-    response = HttpResponse(
-        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    return respuesta_excel(
+        f'solicitudes_web_{timezone.now().strftime("%Y%m%d")}.xlsx',
+        'Solicitudes Web',
+        columnas,
+        filas,
+        color_encabezado='2575C0'
     )
-    response['Content-Disposition'] = f'attachment; filename=solicitudes_web_{timezone.now().strftime("%Y%m%d")}.xlsx'
-    
-    wb.save(response)
-    return response
 
 @login_required
 @requiere_gerente_o_superior
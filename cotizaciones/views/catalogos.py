@@ -22,6 +22,7 @@ from notificaciones.models import Notificacion
 from notificaciones.utils import crear_notificacion
 from home.models import PerfilEmpleado
 from ..utils_mantenimiento import verificar_mantenimientos_materiales
+from ..utils_precios import vista_previa_reprecio, aplicar_reprecio
 
 
 # === Crud Tipo de Trabajo === 
@@ -950,3 +951,72 @@ def obtener_empleados_categoria(request, categoria_id):
     
     return JsonResponse(empleados_data, safe=False)
 
+# === Actualización de precios en cotizaciones abiertas ===
+
+def _ids_catalogo(datos, campo):
+    """IDs separados por coma; sin el parámetro: None (todos)"""
+    if campo not in datos:
+        return None
+    valor = datos[campo]
+    if isinstance(valor, list):
+        return [int(v) for v in valor]
+    return [int(v) for v in str(valor).split(',') if v.strip()]
+
+@login_required
+@requiere_gerente_o_superior
+@require_http_methods(["GET", "POST"])
+def repreciar_cotizaciones(request):
+    """
+    GET: vista previa de los items de cotizaciones en borrador / requiere
+    cambios cuyo precio difiere del catálogo actual. POST: aplica esos
+    precios y recalcula los totales. Parámetros opcionales `servicios` y
+    `materiales` (IDs separados por coma) acotan los catálogos a revisar.
+    """
+    try:
+        datos = json.loads(request.body or '{}') if request.method == 'POST' else request.GET
+        servicios = _ids_catalogo(datos, 'servicios')
+        materiales = _ids_catalogo(datos, 'materiales')
+        
+        if request.method == 'POST':
+            resultado = aplicar_reprecio(servicios, materiales)
+            return JsonResponse({
+                'success': True,
+                'itemsActualizados': resultado['items'],
+                'cotizacionesActualizadas': resultado['cotizaciones']
+            })
+        
+        previa = vista_previa_reprecio(servicios, materiales)
+        return JsonResponse({
+            'success': True,
+            'items': [
+                {
+                    'tipo': item['tipo'],
+                    'itemId': item['item_id'],
+                    'cotizacionId': item['cotizacion_id'],
+                    'catalogoId': item['catalogo_id'],
+                    'nombre': item['nombre'],
+                    'cantidad': float(item['cantidad']),
+                    'precioActual': float(item['precio_actual']),
+                    'precioNuevo': float(item['precio_nuevo']),
+                    'subtotalActual': float(item['subtotal_actual']),
+                    'subtotalNuevo': float(item['subtotal_nuevo']),
+                }
+                for item in previa['items']
+            ],
+            'cotizaciones': [
+                {
+                    'id': cot['id'],
+                    'numero': cot['numero'],
+                    'estado': cot['estado'],
+                    'valorTotalActual': float(cot['valor_total_actual']),
+                    'valorTotalNuevo': float(cot['valor_total_nuevo']),
+                    'diferencia': float(cot['diferencia']),
+                }
+                for cot in previa['cotizaciones']
+            ]
+        })
+        
+    except ValueError as e:
+        return JsonResponse({'success': False, 'error': f'Parámetros inválidos: {str(e)}'}, status=400)
+    except Exception as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=500)
@@ -1,7 +1,7 @@
 import json
 import csv
 from decimal import Decimal
-from datetime import datetime, timedelta
+from datetime import datetime
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
@@ -9,7 +9,7 @@ from django.http import JsonResponse, HttpResponse
 from django.views.decorators.http import require_http_methods
 from django.db import transaction
 from django.core.paginator import Paginator
-from django.db.models import Q, Count, Sum, Avg
+from django.db.models import Q, F, Count, Sum, Avg, Exists, OuterRef, Subquery
 from django.utils import timezone
 from django.template.loader import render_to_string
 from django.conf import settings
@@ -22,6 +22,12 @@ from notificaciones.models import Notificacion
 from notificaciones.utils import crear_notificacion
 from home.models import PerfilEmpleado
 from ..utils_mantenimiento import verificar_mantenimientos_materiales
+from ..utils_reportes import kpis_por_estado, serie_mensual
+from ..utils_analitica import analitica_reportes
+from ..utils_periodos import ZONA_REPORTES, filtrar_periodo, rango_mes
+from ..utils_cache import cache_reportes
+from ..utils_seguimiento import cotizaciones_seguimiento, anotar_seguimiento, estadisticas_seguimiento
+from ..utils_paginacion import leer_limite, paginar_keyset, respuesta_json_streaming
 
 @login_required
 @requiere_gerente_o_superior
@@ -188,7 +194,7 @@ def ver_feedbacks_pendientes(request):
     """
     # Verificar permisos
     try:
-        perfil = PerfilEmpleado.objects.get(user=request.user)
+        perfil = request.user.perfilempleado
         if not perfil.es_gerente_o_superior():
             messages.error(request, 'No tienes permisos para acceder a esta sección')
             return redirect('home:panel_empleados')
@@ -218,113 +224,39 @@ def ver_feedbacks_pendientes(request):
 
 @login_required
 @requiere_gerente_o_superior
+@cache_reportes
 def datos_dashboard_reportes(request):
     """API endpoint para datos del dashboard de reportes"""
     try:
         periodo = request.GET.get('periodo', 'mes-actual')
         hoy = timezone.now()
         
-        # Determinar base_query según el período (SOLO PARA KPIs, NO PARA GRÁFICA)
-        if periodo == 'todos':
-            base_query = Cotizacion.objects.all()
-            
-        elif periodo == 'mes-actual':
-            base_query = Cotizacion.objects.filter(
-                fecha_creacion__year=hoy.year,
-                fecha_creacion__month=hoy.month
-            )
-            
-        elif periodo == 'mes-anterior':
-            mes_anterior = hoy.month - 1 if hoy.month > 1 else 12
-            ano_anterior = hoy.year if hoy.month > 1 else hoy.year - 1
-            base_query = Cotizacion.objects.filter(
-                fecha_creacion__year=ano_anterior,
-                fecha_creacion__month=mes_anterior
-            )
-            
-        elif periodo.startswith('mes-') and len(periodo.split('-')) == 3:
-            parts = periodo.split('-')
-            mes = int(parts[1])
-            ano = int(parts[2])
-            base_query = Cotizacion.objects.filter(
-                fecha_creacion__year=ano,
-                fecha_creacion__month=mes
-            )
-            
-        elif periodo == 'ano':
-            base_query = Cotizacion.objects.filter(fecha_creacion__year=hoy.year)
-            
-        elif periodo.startswith('ano-'):
-            ano = int(periodo.split('-')[1])
-            base_query = Cotizacion.objects.filter(fecha_creacion__year=ano)
-            
-        elif periodo == 'trimestre':
-            fecha_inicio = hoy - timedelta(days=90)
-            base_query = Cotizacion.objects.filter(fecha_creacion__gte=fecha_inicio)
-            
-        elif periodo == 'semestre':
-            fecha_inicio = hoy - timedelta(days=180)
-            base_query = Cotizacion.objects.filter(fecha_creacion__gte=fecha_inicio)
-            
-        else:
-            base_query = Cotizacion.objects.filter(fecha_creacion__year=hoy.year)
-            
-        
-        total_encontradas = base_query.count()
+        # Determinar base_query según el período (rango [inicio, fin) indexable)
+        base_query = filtrar_periodo(Cotizacion.objects.all(), periodo, hoy)
         
+        # KPIs y estados en una sola pasada con agregados filtrados: desde el
+        # resumen mensual si el período calza con meses completos, o sobre el
+        # rango de base_query para ventanas móviles
+        por_estado, cotizaciones_pendientes = kpis_por_estado(periodo, hoy)
         
-        # KPIs - Usan base_query (filtrado según período)
-        total_cotizaciones = base_query.count()
-        valor_total = base_query.aggregate(Sum('valor_total'))['valor_total__sum'] or 0
-        cotizaciones_aprobadas = base_query.filter(estado='aprobada').count()
-        dinero_teorico = base_query.filter(estado='aprobada').aggregate(Sum('valor_total'))['valor_total__sum'] or 0
-        ingresos_reales = base_query.filter(estado='finalizada').aggregate(Sum('valor_total'))['valor_total__sum'] or 0
+        # KPIs derivados de los agregados por estado del período
+        total_cotizaciones = sum(s['cantidad'] for s in por_estado.values())
+        valor_total = sum(s['valor'] for s in por_estado.values())
+        cotizaciones_aprobadas = por_estado.get('aprobada', {}).get('cantidad', 0)
+        dinero_teorico = por_estado.get('aprobada', {}).get('valor', 0)
+        ingresos_reales = por_estado.get('finalizada', {}).get('valor', 0)
         ticket_promedio = (valor_total / total_cotizaciones) if total_cotizaciones > 0 else 0
         tasa_aprobacion = round((cotizaciones_aprobadas / total_cotizaciones * 100) if total_cotizaciones > 0 else 0)
-        cotizaciones_pendientes = Cotizacion.objects.filter(estado='enviada').count()
         
         # ====================================================================
         # GRÁFICA DE EVOLUCIÓN - SIEMPRE ÚLTIMOS 12 MESES (SIN FILTRAR)
+        # Se lee del resumen mensual: 12 meses = unas pocas decenas de filas
         # ====================================================================
-        cotizaciones_mes = []
-        for i in range(11, -1, -1):
-            mes_actual = hoy.month
-            ano_actual = hoy.year
-            mes_calculo = mes_actual - i
-            ano_calculo = ano_actual
-            while mes_calculo <= 0:
-                mes_calculo += 12
-                ano_calculo -= 1
-            fecha = hoy.replace(year=ano_calculo, month=mes_calculo, day=1, hour=0, minute=0, second=0, microsecond=0)
-            mes_siguiente = mes_calculo + 1
-            ano_siguiente = ano_calculo
-            if mes_siguiente > 12:
-                mes_siguiente = 1
-                ano_siguiente += 1
-            fecha_fin = hoy.replace(year=ano_siguiente, month=mes_siguiente, day=1, hour=0, minute=0, second=0, microsecond=0)
-            
-            # 🔥 IMPORTANTE: Usar Cotizacion.objects.all() NO base_query
-            # Esto asegura que SIEMPRE muestre los últimos 12 meses completos
-            stats_mes = Cotizacion.objects.filter(
-                fecha_creacion__gte=fecha, 
-                fecha_creacion__lt=fecha_fin
-            ).aggregate(
-                total=Count('id'),
-                valor=Sum('valor_total'),
-                aprobadas=Count('id', filter=Q(estado='aprobada'))
-            )
-            
-            cotizaciones_mes.append({
-                'mes': fecha.strftime('%b %y'),
-                'cotizaciones': stats_mes['total'] or 0,
-                'valor': float(stats_mes['valor'] or 0),
-                'aprobadas': stats_mes['aprobadas'] or 0
-            })
+        cotizaciones_mes = serie_mensual(hoy, meses=12)
         # ====================================================================
         
         # Estados - USAR base_query (filtrado según período)
-        estados_stats = base_query.values('estado').annotate(cantidad=Count('id'))
-        total_estados = sum([s['cantidad'] for s in estados_stats])
+        total_estados = total_cotizaciones
         estados_cotizaciones = []
         colores = {
             'aprobada': '#22c55e',
@@ -334,86 +266,68 @@ def datos_dashboard_reportes(request):
             'vencida': '#6b7280',
             'finalizada': '#10b981'
         }
-        for estado in estados_stats:
-            porcentaje = round((estado['cantidad'] / total_estados * 100) if total_estados > 0 else 0)
+        for estado, stats_estado in por_estado.items():
+            porcentaje = round((stats_estado['cantidad'] / total_estados * 100) if total_estados > 0 else 0)
             estados_cotizaciones.append({
-                'estado': dict(Cotizacion.ESTADO_CHOICES)[estado['estado']],
+                'estado': dict(Cotizacion.ESTADO_CHOICES)[estado],
                 'valor': porcentaje,
-                'color': colores.get(estado['estado'], '#6b7280')
+                'color': colores.get(estado, '#6b7280')
             })
         
-        # Top clientes - filtrar por cotizaciones en base_query
-        cotizaciones_ids = list(base_query.values_list('id', flat=True))
-        top_clientes = Cliente.objects.annotate(
-            total_cotizaciones=Count('cotizacion', filter=Q(cotizacion__id__in=cotizaciones_ids)),
-            valor_total=Sum('cotizacion__valor_total', filter=Q(cotizacion__id__in=cotizaciones_ids)),
-            cotizaciones_aprobadas=Count('cotizacion', filter=Q(cotizacion__id__in=cotizaciones_ids, cotizacion__estado='aprobada'))
-        ).filter(total_cotizaciones__gt=0).order_by('-valor_total')[:5]
+        # Top clientes - agrupado sobre base_query (join al cliente, sin listas de ids)
+        top_clientes = base_query.filter(cliente__isnull=False).order_by().values('cliente_id', 'cliente__nombre').annotate(
+            total_cotizaciones=Count('id'),
+            valor_total=Sum('valor_total'),
+            cotizaciones_aprobadas=Count('id', filter=Q(estado='aprobada'))
+        ).order_by(F('valor_total').desc(nulls_last=True))[:5]
         clientes_data = []
         for cliente in top_clientes:
-            tasa_cliente = round((cliente.cotizaciones_aprobadas / cliente.total_cotizaciones * 100) if cliente.total_cotizaciones > 0 else 0)
+            tasa_cliente = round((cliente['cotizaciones_aprobadas'] / cliente['total_cotizaciones'] * 100) if cliente['total_cotizaciones'] > 0 else 0)
             clientes_data.append({
-                'nombre': cliente.nombre,
-                'cotizaciones': cliente.total_cotizaciones,
-                'valorTotal': float(cliente.valor_total or 0),
+                'nombre': cliente['cliente__nombre'],
+                'cotizaciones': cliente['total_cotizaciones'],
+                'valorTotal': float(cliente['valor_total'] or 0),
                 'tasaAprobacion': tasa_cliente
             })
         
-        # Servicios - filtrar por items de cotizaciones en base_query
-        servicios_stats = ItemServicio.objects.filter(cotizacion__id__in=cotizaciones_ids).values('servicio__nombre').annotate(
+        # Servicios - mismo rango del período aplicado vía join a la cotización
+        servicios_stats = filtrar_periodo(
+            ItemServicio.objects.all(), periodo, hoy, campo='cotizacion__fecha_creacion'
+        ).order_by().values('servicio_id', 'servicio__nombre').annotate(
             cantidad=Count('id'),
             valor_total=Sum('subtotal')
         ).order_by('-cantidad')[:5]
         servicios_cotizados = []
         for servicio in servicios_stats:
             servicios_cotizados.append({
+                'servicioId': servicio['servicio_id'],
                 'servicio': servicio['servicio__nombre'],
                 'cantidad': servicio['cantidad'],
                 'valor': float(servicio['valor_total'] or 0)
             })
         
+        # Empleados - ranking leído desde la productividad mensual precalculada
         empleados_productivos = []
-        try:
-            from home.models import PerfilEmpleado
-            
-            # Intentar obtener empleados con trabajos asignados
-            try:
-                empleados = PerfilEmpleado.objects.filter(activo=True).annotate(
-                    trabajos_asignados_count=Count('trabajos_asignados'),
-                    horas_total=Sum('trabajos_asignados__horas_trabajadas'),
-                    trabajos_completados=Count('trabajos_asignados', filter=Q(trabajos_asignados__estado='completado'))
-                ).filter(trabajos_asignados_count__gt=0).order_by('-trabajos_asignados_count')[:5]
-                
-                for empleado in empleados:
-                    tasa_completada = round((empleado.trabajos_completados / empleado.trabajos_asignados_count * 100) if empleado.trabajos_asignados_count > 0 else 0)
-                    empleados_productivos.append({
-                        'nombre': empleado.nombre_completo,
-                        'trabajos': empleado.trabajos_asignados_count,
-                        'horasTotal': empleado.horas_total or 0,
-                        'tasaCompleta': tasa_completada
-                    })
-            except Exception as e:
-                # Si no existe el campo trabajos_asignados, generar datos de ejemplo
-                # para mostrar cómo funciona la interfaz
-                print(f"No se pudo cargar empleados reales: {str(e)}")
-                
-                # Obtener empleados activos para mostrar datos de ejemplo
-                empleados_activos = PerfilEmpleado.objects.filter(activo=True)[:10]  # Aumentar a 10
-                for i, empleado in enumerate(empleados_activos):
-                    # Datos de ejemplo proporcionales y más variados
-                    trabajos_base = max(35 - (i * 3), 8)  # 35, 32, 29... hasta mínimo 8
-                    horas_base = trabajos_base * 7.5  # ~7.5 horas por trabajo
-                    tasa_base = max(95 - (i * 3), 70)  # 95%, 92%, 89%... hasta mínimo 70%
-                    
-                    empleados_productivos.append({
-                        'nombre': empleado.nombre_completo,
-                        'trabajos': int(trabajos_base),
-                        'horasTotal': int(horas_base),
-                        'tasaCompleta': int(tasa_base)
-                    })
-        except Exception as e:
-            print(f"Error general en empleados_productivos: {str(e)}")
-            pass
+        ranking = ProductividadMensualEmpleado.objects.filter(
+            empleado__activo=True
+        ).values(
+            'empleado_id', 'empleado__user__first_name', 'empleado__user__last_name', 'empleado__user__username'
+        ).annotate(
+            trabajos=Sum('trabajos_asignados'),
+            completados=Sum('trabajos_completados'),
+            horas=Sum('horas_trabajadas')
+        ).filter(trabajos__gt=0).order_by('-trabajos')[:5]
+        
+        for empleado in ranking:
+            nombre = f"{empleado['empleado__user__first_name']} {empleado['empleado__user__last_name']}".strip()
+            tasa_completada = round(empleado['completados'] / empleado['trabajos'] * 100)
+            empleados_productivos.append({
+                'id': empleado['empleado_id'],
+                'nombre': nombre or empleado['empleado__user__username'],
+                'trabajos': empleado['trabajos'],
+                'horasTotal': float(empleado['horas'] or 0),
+                'tasaCompleta': tasa_completada
+            })
         
         data = {
             'metricasActuales': {
@@ -433,6 +347,28 @@ def datos_dashboard_reportes(request):
             'empleadosProductivos': empleados_productivos
         }
         return JsonResponse(data)
+    except ValueError as e:
+        return JsonResponse({'error': f'Parámetros inválidos: {str(e)}'}, status=400)
+    except Exception as e:
+        return JsonResponse({'error': str(e)}, status=500)
+
+@login_required
+@requiere_gerente_o_superior
+@cache_reportes
+def datos_analitica_reportes(request):
+    """
+    API endpoint con tendencias y pronóstico para el dashboard de reportes
+    (medias móviles, tasa de aprobación, variación anual, próximo trimestre).
+    Parámetro opcional 'meses' (por defecto 24, 0 = todo el historial).
+    """
+    try:
+        meses = int(request.GET.get('meses', 24))
+        if meses < 0:
+            raise ValueError('meses debe ser mayor o igual a 0')
+        
+        return JsonResponse(analitica_reportes(timezone.now(), meses=meses))
+    except ValueError as e:
+        return JsonResponse({'error': f'Parámetros inválidos: {str(e)}'}, status=400)
     except Exception as e:
         return JsonResponse({'error': str(e)}, status=500)
 
@@ -512,9 +448,10 @@ def obtener_cotizaciones_mes(request):
             return JsonResponse({'error': 'Año inválido'}, status=400)
         
         # Obtener todas las cotizaciones del mes
+        inicio, fin = rango_mes(ano, mes)
         cotizaciones = Cotizacion.objects.filter(
-            fecha_creacion__year=ano,
-            fecha_creacion__month=mes
+            fecha_creacion__gte=inicio,
+            fecha_creacion__lt=fin
         ).select_related('cliente', 'representante', 'tipo_trabajo').order_by('-fecha_creacion')
         
         # Separar por estado
@@ -563,70 +500,69 @@ def obtener_cotizaciones_mes(request):
 @requiere_gerente_o_superior
 def obtener_datos_empleado(request):
     """
-    API endpoint para obtener datos detallados de un empleado
+    API endpoint para obtener datos detallados de un empleado.
+    Recibe empleado_id; las estadísticas salen de la productividad mensual
+    precalculada.
     """
     try:
-        empleado_nombre = request.GET.get('nombre', '')
+        empleado_id = request.GET.get('empleado_id', '')
         
-        if not empleado_nombre:
-            return JsonResponse({'error': 'Nombre de empleado requerido'}, status=400)
+        if not empleado_id:
+            return JsonResponse({'error': 'Empleado requerido'}, status=400)
         
-        # Buscar el empleado por nombre
-        empleado = PerfilEmpleado.objects.filter(
-            Q(user__first_name__icontains=empleado_nombre) |
-            Q(user__last_name__icontains=empleado_nombre)
-        ).first()
+        empleado = PerfilEmpleado.objects.select_related('user').filter(pk=int(empleado_id)).first()
         
         if not empleado:
             return JsonResponse({'error': 'Empleado no encontrado'}, status=404)
         
-        # Obtener trabajos asignados (si tienes modelo de trabajos)
-        trabajos_data = []
-        try:
-            # Intenta obtener trabajos si el modelo existe
-            trabajos = empleado.trabajos_asignados.all().order_by('-fecha_asignacion')[:15]
-            
-            for trabajo in trabajos:
-                trabajos_data.append({
-                    'id': trabajo.id,
-                    'numero': f"Trabajo #{trabajo.id}",
-                    'cliente': trabajo.cotizacion.cliente.nombre if hasattr(trabajo, 'cotizacion') else 'N/A',
-                    'horas': float(trabajo.horas_trabajadas or 0),
-                    'estado': trabajo.estado,
-                    'fecha': trabajo.fecha_asignacion.strftime('%d/%m/%Y') if trabajo.fecha_asignacion else 'N/A',
-                    'descripcion': trabajo.descripcion[:50] + '...' if len(trabajo.descripcion) > 50 else trabajo.descripcion
-                })
-        except:
-            # Si no existe el modelo de trabajos, generar datos simulados
-            pass
-        
-        # Calcular estadísticas
-        trabajos_totales = empleado.trabajos_asignados.count() if hasattr(empleado, 'trabajos_asignados') else 0
-        trabajos_completados = empleado.trabajos_asignados.filter(estado='completado').count() if hasattr(empleado, 'trabajos_asignados') else 0
-        horas_total = empleado.trabajos_asignados.aggregate(total=Sum('horas_trabajadas'))['total'] or 0 if hasattr(empleado, 'trabajos_asignados') else 0
+        # Últimos trabajos del empleado
+        trabajos = TrabajoEmpleado.objects.filter(empleado=empleado).select_related(
+            'cotizacion__cliente', 'item_mano_obra'
+        ).order_by('-fecha_inicio', '-id')[:15]
         
-        # Datos de rendimiento por mes (últimos 6 meses)
-        rendimiento_mensual = []
-        for i in range(5, -1, -1):
-            fecha = timezone.now() - timedelta(days=30*i)
-            mes_inicio = fecha.replace(day=1)
-            mes_fin = (mes_inicio + timedelta(days=32)).replace(day=1)
-            
-            trabajos_mes = 0
-            if hasattr(empleado, 'trabajos_asignados'):
-                trabajos_mes = empleado.trabajos_asignados.filter(
-                    fecha_asignacion__gte=mes_inicio,
-                    fecha_asignacion__lt=mes_fin,
-                    estado='completado'
-                ).count()
-            
-            rendimiento_mensual.append({
-                'mes': fecha.strftime('%b'),
-                'trabajos': trabajos_mes
+        trabajos_data = []
+        for trabajo in trabajos:
+            descripcion = trabajo.item_mano_obra.descripcion or ''
+            trabajos_data.append({
+                'id': trabajo.id,
+                'numero': trabajo.cotizacion.numero or f"Trabajo #{trabajo.id}",
+                'cliente': trabajo.cotizacion.get_nombre_cliente(),
+                'horas': float(trabajo.horas_trabajadas or 0),
+                'estado': trabajo.estado,
+                'fecha': trabajo.fecha_inicio.strftime('%d/%m/%Y') if trabajo.fecha_inicio else 'N/A',
+                'descripcion': descripcion[:50] + '...' if len(descripcion) > 50 else descripcion
             })
         
+        # Estadísticas y rendimiento de los últimos 6 meses desde el resumen
+        hoy = timezone.localtime(timezone.now(), ZONA_REPORTES)
+        ultimos_meses = []
+        anio, mes = hoy.year, hoy.month
+        for _ in range(6):
+            ultimos_meses.append((anio, mes))
+            anio, mes = (anio, mes - 1) if mes > 1 else (anio - 1, 12)
+        ultimos_meses.reverse()
+        
+        trabajos_totales = 0
+        trabajos_completados = 0
+        horas_total = Decimal('0')
+        completados_por_mes = {}
+        for fila in empleado.productividad_mensual.all():
+            trabajos_totales += fila.trabajos_asignados
+            trabajos_completados += fila.trabajos_completados
+            horas_total += fila.horas_trabajadas
+            completados_por_mes[(fila.anio, fila.mes)] = fila.trabajos_completados
+        
+        rendimiento_mensual = [
+            {
+                'mes': datetime(anio, mes, 1).strftime('%b'),
+                'trabajos': completados_por_mes.get((anio, mes), 0)
+            }
+            for anio, mes in ultimos_meses
+        ]
+        
         data = {
             'empleado': {
+                'id': empleado.id,
                 'nombre': empleado.nombre_completo,
                 'cargo': empleado.get_cargo_display(),
                 'rut': empleado.rut,
@@ -649,6 +585,8 @@ def obtener_datos_empleado(request):
         
         return JsonResponse(data)
         
+    except ValueError as e:
+        return JsonResponse({'error': f'Parámetros inválidos: {str(e)}'}, status=400)
     except Exception as e:
         print(f"Error en obtener_datos_empleado: {str(e)}")
         import traceback
@@ -657,54 +595,64 @@ def obtener_datos_empleado(request):
 
 # === Funciones para Reportes ===
 
+def _cotizacion_reporte(cot):
+    """Fila de una cotización para los endpoints de detalle de reportes"""
+    return {
+        'id': cot.id,
+        'numero': cot.numero,
+        'cliente': cot.get_nombre_cliente(),
+        'representante': cot.representante.nombre if cot.representante else 'Sin representante',
+        'referencia': cot.referencia,
+        'estado': cot.estado,
+        'valor_total': float(cot.valor_total),
+        'fecha': cot.fecha_creacion.strftime('%d/%m/%Y'),
+        'tipo_trabajo': cot.tipo_trabajo.nombre if cot.tipo_trabajo else 'Sin tipo'
+    }
+
+def _responder_cotizaciones_reporte(request, cotizaciones, datos, serializar=_cotizacion_reporte):
+    """
+    Respuesta común de los endpoints de detalle de reportes:
+    - stream=1: lista completa escrita fila por fila (StreamingHttpResponse)
+    - cursor/limite: una página keyset sobre (fecha_creacion, id) más 'siguiente_cursor'
+    - sin parámetros: lista completa en un JsonResponse
+    Los totales de `datos` vienen de un aggregate y cubren todo el período.
+    """
+    cotizaciones = cotizaciones.order_by('-fecha_creacion', '-id')
+    
+    if request.GET.get('stream') == '1':
+        filas = (serializar(cot) for cot in cotizaciones.iterator(chunk_size=500))
+        return respuesta_json_streaming(datos, 'cotizaciones', filas)
+    
+    if 'cursor' in request.GET or 'limite' in request.GET:
+        pagina, siguiente_cursor = paginar_keyset(
+            cotizaciones,
+            cursor=request.GET.get('cursor'),
+            limite=leer_limite(request.GET.get('limite'))
+        )
+        return JsonResponse({
+            **datos,
+            'cotizaciones': [serializar(cot) for cot in pagina],
+            'siguiente_cursor': siguiente_cursor
+        })
+    
+    return JsonResponse({**datos, 'cotizaciones': [serializar(cot) for cot in cotizaciones]})
+
 @login_required
 @requiere_gerente_o_superior
+@cache_reportes
 def obtener_cotizaciones_por_estado(request):
     """
     API endpoint para obtener cotizaciones filtradas por estado
     Soporta estado='todas' para obtener todas las cotizaciones
+    Acepta cursor/limite para paginar y stream=1 para respuesta incremental
     """
     try:
         estado = request.GET.get('estado', '')
         periodo = request.GET.get('periodo', 'mes-actual')
         hoy = timezone.now()
         
-        # Determinar base_query según el período
-        if periodo == 'todos':
-            base_query = Cotizacion.objects.all()
-        elif periodo == 'mes-actual':
-            base_query = Cotizacion.objects.filter(
-                fecha_creacion__year=hoy.year,
-                fecha_creacion__month=hoy.month
-            )
-        elif periodo == 'mes-anterior':
-            mes_anterior = hoy.month - 1 if hoy.month > 1 else 12
-            ano_anterior = hoy.year if hoy.month > 1 else hoy.year - 1
-            base_query = Cotizacion.objects.filter(
-                fecha_creacion__year=ano_anterior,
-                fecha_creacion__month=mes_anterior
-            )
-        elif periodo.startswith('mes-') and len(periodo.split('-')) == 3:
-            parts = periodo.split('-')
-            mes = int(parts[1])
-            ano = int(parts[2])
-            base_query = Cotizacion.objects.filter(
-                fecha_creacion__year=ano,
-                fecha_creacion__month=mes
-            )
-        elif periodo == 'ano':
-            base_query = Cotizacion.objects.filter(fecha_creacion__year=hoy.year)
-        elif periodo.startswith('ano-'):
-            ano = int(periodo.split('-')[1])
-            base_query = Cotizacion.objects.filter(fecha_creacion__year=ano)
-        elif periodo == 'trimestre':
-            fecha_inicio = hoy - timedelta(days=90)
-            base_query = Cotizacion.objects.filter(fecha_creacion__gte=fecha_inicio)
-        elif periodo == 'semestre':
-            fecha_inicio = hoy - timedelta(days=180)
-            base_query = Cotizacion.objects.filter(fecha_creacion__gte=fecha_inicio)
-        else:
-            base_query = Cotizacion.objects.filter(fecha_creacion__year=hoy.year)
+        # Determinar base_query según el período (rango [inicio, fin) indexable)
+        base_query = filtrar_periodo(Cotizacion.objects.all(), periodo, hoy)
         
         # Filtrar por estado
         if not estado:
@@ -712,9 +660,7 @@ def obtener_cotizaciones_por_estado(request):
         
         # Si el estado es 'todas', no filtrar por estado
         if estado.lower() == 'todas':
-            cotizaciones = base_query.select_related(
-                'cliente', 'representante', 'tipo_trabajo'
-            ).order_by('-fecha_creacion')
+            cotizaciones = base_query
         else:
             # Mapear estados del español al inglés
             estado_map = {
@@ -727,46 +673,33 @@ def obtener_cotizaciones_por_estado(request):
             }
             
             estado_key = estado_map.get(estado, estado.lower())
-            
-            cotizaciones = base_query.filter(estado=estado_key).select_related(
-                'cliente', 'representante', 'tipo_trabajo'
-            ).order_by('-fecha_creacion')
+            cotizaciones = base_query.filter(estado=estado_key)
         
-        # Construir respuesta
-        cotizaciones_data = []
-        valor_total = 0
+        totales = cotizaciones.aggregate(total=Count('id'), valor_total=Sum('valor_total'))
         
-        for cot in cotizaciones:
-            valor_total += float(cot.valor_total)
-            
-            cotizaciones_data.append({
-                'id': cot.id,
-                'numero': cot.numero,
-                'cliente': cot.get_nombre_cliente(),
-                'representante': cot.representante.nombre if cot.representante else 'Sin representante',
-                'referencia': cot.referencia,
-                'estado': cot.estado,
-                'valor_total': float(cot.valor_total),
-                'fecha': cot.fecha_creacion.strftime('%d/%m/%Y'),
-                'tipo_trabajo': cot.tipo_trabajo.nombre if cot.tipo_trabajo else 'Sin tipo'
-            })
-        
-        return JsonResponse({
-            'cotizaciones': cotizaciones_data,
-            'total': len(cotizaciones_data),
-            'valor_total': valor_total,
-            'estado': estado
-        })
+        return _responder_cotizaciones_reporte(
+            request,
+            cotizaciones.select_related('cliente', 'representante', 'tipo_trabajo'),
+            {
+                'total': totales['total'],
+                'valor_total': float(totales['valor_total'] or 0),
+                'estado': estado
+            }
+        )
         
+    except ValueError as e:
+        return JsonResponse({'error': f'Parámetros inválidos: {str(e)}'}, status=400)
     except Exception as e:
         print(f"Error en obtener_cotizaciones_por_estado: {str(e)}")
         return JsonResponse({'error': str(e)}, status=500)
 
 @login_required
 @requiere_gerente_o_superior
+@cache_reportes
 def obtener_cotizaciones_por_cliente(request):
     """
     API endpoint para obtener cotizaciones de un cliente específico
+    Acepta cursor/limite para paginar y stream=1 para respuesta incremental
     """
     try:
         cliente_nombre = request.GET.get('cliente', '')
@@ -776,184 +709,102 @@ def obtener_cotizaciones_por_cliente(request):
         if not cliente_nombre:
             return JsonResponse({'error': 'Cliente no proporcionado'}, status=400)
         
-        # Determinar base_query según el período
-        if periodo == 'todos':
-            base_query = Cotizacion.objects.all()
-        elif periodo == 'mes-actual':
-            base_query = Cotizacion.objects.filter(
-                fecha_creacion__year=hoy.year,
-                fecha_creacion__month=hoy.month
-            )
-        elif periodo == 'mes-anterior':
-            mes_anterior = hoy.month - 1 if hoy.month > 1 else 12
-            ano_anterior = hoy.year if hoy.month > 1 else hoy.year - 1
-            base_query = Cotizacion.objects.filter(
-                fecha_creacion__year=ano_anterior,
-                fecha_creacion__month=mes_anterior
-            )
-        elif periodo.startswith('mes-') and len(periodo.split('-')) == 3:
-            parts = periodo.split('-')
-            mes = int(parts[1])
-            ano = int(parts[2])
-            base_query = Cotizacion.objects.filter(
-                fecha_creacion__year=ano,
-                fecha_creacion__month=mes
-            )
-        elif periodo == 'ano':
-            base_query = Cotizacion.objects.filter(fecha_creacion__year=hoy.year)
-        elif periodo.startswith('ano-'):
-            ano = int(periodo.split('-')[1])
-            base_query = Cotizacion.objects.filter(fecha_creacion__year=ano)
-        elif periodo == 'trimestre':
-            fecha_inicio = hoy - timedelta(days=90)
-            base_query = Cotizacion.objects.filter(fecha_creacion__gte=fecha_inicio)
-        elif periodo == 'semestre':
-            fecha_inicio = hoy - timedelta(days=180)
-            base_query = Cotizacion.objects.filter(fecha_creacion__gte=fecha_inicio)
-        else:
-            base_query = Cotizacion.objects.filter(fecha_creacion__year=hoy.year)
+        # Determinar base_query según el período (rango [inicio, fin) indexable)
+        base_query = filtrar_periodo(Cotizacion.objects.all(), periodo, hoy)
         
         # Filtrar por cliente
-        cotizaciones = base_query.filter(
-            cliente__nombre=cliente_nombre
-        ).select_related('cliente', 'representante', 'tipo_trabajo').order_by('-fecha_creacion')
-        
-        # Construir respuesta
-        cotizaciones_data = []
-        valor_total = 0
-        aprobadas = 0
-        
-        for cot in cotizaciones:
-            valor_total += float(cot.valor_total)
-            if cot.estado == 'aprobada':
-                aprobadas += 1
-            
-            cotizaciones_data.append({
-                'id': cot.id,
-                'numero': cot.numero,
-                'cliente': cot.get_nombre_cliente(),
-                'representante': cot.representante.nombre if cot.representante else 'Sin representante',
-                'referencia': cot.referencia,
-                'estado': cot.estado,
-                'valor_total': float(cot.valor_total),
-                'fecha': cot.fecha_creacion.strftime('%d/%m/%Y'),
-                'tipo_trabajo': cot.tipo_trabajo.nombre if cot.tipo_trabajo else 'Sin tipo'
-            })
+        cotizaciones = base_query.filter(cliente__nombre=cliente_nombre)
         
-        tasa_aprobacion = round((aprobadas / len(cotizaciones_data) * 100) if len(cotizaciones_data) > 0 else 0)
-        
-        return JsonResponse({
-            'cotizaciones': cotizaciones_data,
-            'total': len(cotizaciones_data),
-            'valor_total': valor_total,
-            'aprobadas': aprobadas,
-            'tasa_aprobacion': tasa_aprobacion,
-            'cliente': cliente_nombre
-        })
+        totales = cotizaciones.aggregate(
+            total=Count('id'),
+            valor_total=Sum('valor_total'),
+            aprobadas=Count('id', filter=Q(estado='aprobada'))
+        )
+        tasa_aprobacion = round((totales['aprobadas'] / totales['total'] * 100) if totales['total'] > 0 else 0)
+        
+        return _responder_cotizaciones_reporte(
+            request,
+            cotizaciones.select_related('cliente', 'representante', 'tipo_trabajo'),
+            {
+                'total': totales['total'],
+                'valor_total': float(totales['valor_total'] or 0),
+                'aprobadas': totales['aprobadas'],
+                'tasa_aprobacion': tasa_aprobacion,
+                'cliente': cliente_nombre
+            }
+        )
         
+    except ValueError as e:
+        return JsonResponse({'error': f'Parámetros inválidos: {str(e)}'}, status=400)
     except Exception as e:
         print(f"Error en obtener_cotizaciones_por_cliente: {str(e)}")
         return JsonResponse({'error': str(e)}, status=500)
 
 @login_required
 @requiere_gerente_o_superior
+@cache_reportes
 def obtener_cotizaciones_por_servicio(request):
     """
-    API endpoint para obtener cotizaciones que contienen un servicio específico
+    API endpoint para obtener cotizaciones que contienen un servicio específico.
+    Recibe servicio_id; la cantidad del servicio por cotización viene anotada
+    en la misma consulta.
+    Acepta cursor/limite para paginar y stream=1 para respuesta incremental
     """
     try:
-        servicio_nombre = request.GET.get('servicio', '')
+        servicio_id = request.GET.get('servicio_id', '')
         periodo = request.GET.get('periodo', 'mes-actual')
         hoy = timezone.now()
         
-        if not servicio_nombre:
+        if not servicio_id:
             return JsonResponse({'error': 'Servicio no proporcionado'}, status=400)
         
-        # Determinar base_query según el período
-        if periodo == 'todos':
-            base_query = Cotizacion.objects.all()
-        elif periodo == 'mes-actual':
-            base_query = Cotizacion.objects.filter(
-                fecha_creacion__year=hoy.year,
-                fecha_creacion__month=hoy.month
-            )
-        elif periodo == 'mes-anterior':
-            mes_anterior = hoy.month - 1 if hoy.month > 1 else 12
-            ano_anterior = hoy.year if hoy.month > 1 else hoy.year - 1
-            base_query = Cotizacion.objects.filter(
-                fecha_creacion__year=ano_anterior,
-                fecha_creacion__month=mes_anterior
-            )
-        elif periodo.startswith('mes-') and len(periodo.split('-')) == 3:
-            parts = periodo.split('-')
-            mes = int(parts[1])
-            ano = int(parts[2])
-            base_query = Cotizacion.objects.filter(
-                fecha_creacion__year=ano,
-                fecha_creacion__month=mes
-            )
-        elif periodo == 'ano':
-            base_query = Cotizacion.objects.filter(fecha_creacion__year=hoy.year)
-        elif periodo.startswith('ano-'):
-            ano = int(periodo.split('-')[1])
-            base_query = Cotizacion.objects.filter(fecha_creacion__year=ano)
-        elif periodo == 'trimestre':
-            fecha_inicio = hoy - timedelta(days=90)
-            base_query = Cotizacion.objects.filter(fecha_creacion__gte=fecha_inicio)
-        elif periodo == 'semestre':
-            fecha_inicio = hoy - timedelta(days=180)
-            base_query = Cotizacion.objects.filter(fecha_creacion__gte=fecha_inicio)
-        else:
-            base_query = Cotizacion.objects.filter(fecha_creacion__year=hoy.year)
-        
-        # Obtener IDs de cotizaciones que contienen este servicio
-        cotizaciones_con_servicio = ItemServicio.objects.filter(
-            servicio__nombre=servicio_nombre
-        ).values_list('cotizacion_id', flat=True).distinct()
-        
-        # Filtrar cotizaciones por el servicio
-        cotizaciones = base_query.filter(
-            id__in=cotizaciones_con_servicio
-        ).select_related('cliente', 'representante', 'tipo_trabajo').order_by('-fecha_creacion')
-        
-        # Construir respuesta
-        cotizaciones_data = []
-        valor_total = 0
-        cantidad_total = 0
+        servicio = ServicioBase.objects.filter(pk=int(servicio_id)).first()
+        if not servicio:
+            return JsonResponse({'error': 'Servicio no encontrado'}, status=404)
         
-        for cot in cotizaciones:
-            valor_total += float(cot.valor_total)
-            
-            # Obtener cantidad del servicio en esta cotización
-            item_servicio = ItemServicio.objects.filter(
-                cotizacion=cot,
-                servicio__nombre=servicio_nombre
-            ).first()
-            
-            if item_servicio:
-                cantidad_total += float(item_servicio.cantidad)
-            
-            cotizaciones_data.append({
-                'id': cot.id,
-                'numero': cot.numero,
-                'cliente': cot.get_nombre_cliente(),
-                'representante': cot.representante.nombre if cot.representante else 'Sin representante',
-                'referencia': cot.referencia,
-                'estado': cot.estado,
-                'valor_total': float(cot.valor_total),
-                'fecha': cot.fecha_creacion.strftime('%d/%m/%Y'),
-                'tipo_trabajo': cot.tipo_trabajo.nombre if cot.tipo_trabajo else 'Sin tipo',
-                'cantidad_servicio': float(item_servicio.cantidad) if item_servicio else 0
-            })
+        # Determinar base_query según el período (rango [inicio, fin) indexable)
+        base_query = filtrar_periodo(Cotizacion.objects.all(), periodo, hoy)
         
-        return JsonResponse({
-            'cotizaciones': cotizaciones_data,
-            'total': len(cotizaciones_data),
-            'valor_total': valor_total,
-            'cantidad_total': cantidad_total,
-            'servicio': servicio_nombre
-        })
+        # Items del servicio en cada cotización: EXISTS para filtrar y una
+        # subconsulta para la cantidad, sin duplicar filas de la cotización
+        items_servicio = ItemServicio.objects.filter(
+            cotizacion=OuterRef('pk'),
+            servicio_id=servicio.id
+        )
+        cotizaciones = base_query.filter(Exists(items_servicio))
+        
+        totales = cotizaciones.aggregate(total=Count('id'), valor_total=Sum('valor_total'))
+        cantidad_total = filtrar_periodo(
+            ItemServicio.objects.filter(servicio_id=servicio.id),
+            periodo, hoy, campo='cotizacion__fecha_creacion'
+        ).aggregate(total=Sum('cantidad'))['total']
+        
+        cotizaciones = cotizaciones.annotate(
+            cantidad_servicio=Subquery(
+                items_servicio.order_by().values('cotizacion').annotate(
+                    total=Sum('cantidad')
+                ).values('total')
+            )
+        ).select_related('cliente', 'representante', 'tipo_trabajo')
+        
+        return _responder_cotizaciones_reporte(
+            request,
+            cotizaciones,
+            {
+                'total': totales['total'],
+                'valor_total': float(totales['valor_total'] or 0),
+                'cantidad_total': float(cantidad_total or 0),
+                'servicio_id': servicio.id,
+                'servicio': servicio.nombre
+            },
+            serializar=lambda cot: {
+                **_cotizacion_reporte(cot),
+                'cantidad_servicio': float(cot.cantidad_servicio or 0)
+            }
+        )
         
+    except ValueError as e:
+        return JsonResponse({'error': f'Parámetros inválidos: {str(e)}'}, status=400)
     except Exception as e:
         print(f"Error en obtener_cotizaciones_por_servicio: {str(e)}")
         return JsonResponse({'error': str(e)}, status=500)
@@ -961,96 +812,23 @@ def obtener_cotizaciones_por_servicio(request):
 @login_required
 @requiere_gerente_o_superior
 def seguimiento_trabajos_aprobados(request):
-    """Vista para seguimiento de trabajos en cotizaciones aprobadas"""
-    from django.db.models import Count, Sum, Q, Case, When, FloatField, F
-    
+    """
+    Vista para seguimiento de trabajos en cotizaciones aprobadas.
+    Paginada de a 20 cotizaciones; los trabajos de la página se precargan
+    en una consulta y el progreso se calcula en SQL.
+    """
     # Filtro de estado de trabajo
     filtro_estado = request.GET.get('estado', '')
     
-    # Obtener cotizaciones aprobadas con trabajos
-    cotizaciones_query = Cotizacion.objects.filter(
-        estado='aprobada'
-    ).annotate(
-        total_trabajos=Count('trabajos_empleados'),
-        trabajos_completados=Count('trabajos_empleados', filter=Q(trabajos_empleados__estado='completado')),
-        trabajos_en_progreso=Count('trabajos_empleados', filter=Q(trabajos_empleados__estado='en_progreso')),
-        trabajos_pendientes=Count('trabajos_empleados', filter=Q(trabajos_empleados__estado='pendiente')),
-        horas_trabajadas=Sum('trabajos_empleados__horas_trabajadas')
-    ).filter(total_trabajos__gt=0)
+    cotizaciones_query = cotizaciones_seguimiento(filtro_estado)
     
-    # Calcular progreso
-    cotizaciones = []
-    for cot in cotizaciones_query.select_related('cliente', 'tipo_trabajo'):
-        # Obtener trabajos de la cotización
-        trabajos_q = cot.trabajos_empleados.select_related(
-            'empleado__user',
-            'item_mano_obra'
-        ).order_by('estado', '-fecha_inicio')
-        
-        # Aplicar filtro de estado si existe
-        if filtro_estado:
-            trabajos_q = trabajos_q.filter(estado=filtro_estado)
-        
-        trabajos = []
-        for trabajo in trabajos_q:
-            # Calcular progreso estimado para trabajos en progreso
-            progreso_estimado = 50  # Default 50% si está en progreso
-            if trabajo.estado == 'en_progreso' and trabajo.horas_trabajadas > 0:
-                # Estimar basado en horas trabajadas vs horas del item
-                horas_item = trabajo.item_mano_obra.horas
-                if horas_item > 0:
-                    progreso_estimado = min((trabajo.horas_trabajadas / horas_item) * 100, 99)
-            
-            trabajos.append({
-                'id': trabajo.id,
-                'empleado': trabajo.empleado,
-                'item_mano_obra': trabajo.item_mano_obra,
-                'estado': trabajo.estado,
-                'get_estado_display': trabajo.get_estado_display(),
-                'horas_trabajadas': trabajo.horas_trabajadas,
-                'fecha_inicio': trabajo.fecha_inicio,
-                'fecha_fin': trabajo.fecha_fin,
-                'observaciones_empleado': trabajo.observaciones_empleado,
-                'progreso_estimado': progreso_estimado
-            })
-        
-        # Si hay filtro y no quedan trabajos, saltar esta cotización
-        if filtro_estado and not trabajos:
-            continue
-        
-        # Calcular porcentaje de progreso
-        total_trabajos = cot.total_trabajos or 1
-        progreso_porcentaje = (cot.trabajos_completados / total_trabajos) * 100
-        
-        # Verificar si hay observaciones
-        tiene_observaciones = any(t['observaciones_empleado'] for t in trabajos)
-        
-        cotizaciones.append({
-            'id': cot.id,
-            'numero': cot.numero,
-            'fecha_creacion': cot.fecha_creacion,
-            'get_nombre_cliente': cot.get_nombre_cliente(),
-            'lugar': cot.lugar,
-            'referencia': cot.referencia,
-            'total_trabajos': cot.total_trabajos,
-            'trabajos_completados': cot.trabajos_completados,
-            'trabajos_en_progreso': cot.trabajos_en_progreso,
-            'trabajos_pendientes': cot.trabajos_pendientes,
-            'horas_trabajadas': cot.horas_trabajadas or 0,
-            'progreso_porcentaje': progreso_porcentaje,
-            'trabajos': trabajos,
-            'tiene_observaciones': tiene_observaciones
-        })
+    paginator = Paginator(anotar_seguimiento(cotizaciones_query, filtro_estado), 20)
+    cotizaciones = paginator.get_page(request.GET.get('page'))
     
-    # Ordenar por progreso (menor primero - más urgente)
-    cotizaciones.sort(key=lambda x: x['progreso_porcentaje'])
-    
-    # Estadísticas generales
+    # Estadísticas generales (todas las páginas)
     stats = {
-        'total_cotizaciones_aprobadas': len(cotizaciones),
-        'trabajos_pendientes': sum(c['trabajos_pendientes'] for c in cotizaciones),
-        'trabajos_en_progreso': sum(c['trabajos_en_progreso'] for c in cotizaciones),
-        'trabajos_completados': sum(c['trabajos_completados'] for c in cotizaciones),
+        'total_cotizaciones_aprobadas': paginator.count,
+        **estadisticas_seguimiento(cotizaciones_query)
     }
     
     context = {
@@ -7,7 +7,6 @@ from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.http import JsonResponse, HttpResponse
 from django.views.decorators.http import require_http_methods
-from django.db import transaction
 from django.core.paginator import Paginator
 from django.db.models import Q, Count, Sum, Avg
 from django.utils import timezone
@@ -22,6 +21,7 @@ from notificaciones.models import Notificacion
 from notificaciones.utils import crear_notificacion
 from home.models import PerfilEmpleado
 from ..utils_mantenimiento import verificar_mantenimientos_materiales
+from ..utils_items import aplicar_plantilla_lote, copiar_cotizacion
 
 
 @login_required
@@ -47,9 +47,7 @@ def crear_cotizacion(request):
             else:
                 cotizacion.fecha_realizacion = None
             
-            cotizacion.save()
-            cotizacion.generar_numero()
-            cotizacion.save()
+            cotizacion.save()  # Asigna el número (SecuenciaCotizacion)
             
             messages.success(request, f'Cotización {cotizacion.numero} creada exitosamente.')
             return redirect('cotizaciones:editar', pk=cotizacion.pk)
@@ -201,26 +199,31 @@ def aplicar_plantilla(request, cotizacion_pk, plantilla_pk):
     plantilla = get_object_or_404(PlantillaCotizacion, pk=plantilla_pk)
     
     try:
-        with transaction.atomic():
-            # Agregar servicios de la plantilla
-            for item_plantilla in plantilla.servicios.all():
-                ItemServicio.objects.create(
-                    cotizacion=cotizacion,
-                    servicio=item_plantilla.servicio,
-                    cantidad=item_plantilla.cantidad_default,
-                    precio_unitario=item_plantilla.servicio.precio_base,
-                    orden=item_plantilla.orden
-                )
-            
-            # Recalcular totales
-            cotizacion.calcular_totales()
+        # Agregar servicios de la plantilla (un bulk_create) y recalcular totales
+        aplicar_plantilla_lote(cotizacion, plantilla)
             
         messages.success(request, f'Plantilla "{plantilla.nombre}" aplicada exitosamente.')
         
     except Exception as e:
         messages.error(request, f'Error al aplicar plantilla: {str(e)}')
     
-    return redirect('cotizaciones:editar_cotizacion', pk=cotizacion_pk)
+    return redirect('cotizaciones:editar', pk=cotizacion_pk)
+
+@login_required
+@requiere_gerente_o_superior
+@require_http_methods(["POST"])
+def clonar_cotizacion(request, pk):
+    """Crear una cotización en borrador copiando datos e items de otra"""
+    original = get_object_or_404(Cotizacion, pk=pk)
+    
+    try:
+        copia = copiar_cotizacion(original, request.user)
+        messages.success(request, f'Cotización {copia.numero} creada como copia de {original.numero}.')
+        return redirect('cotizaciones:editar', pk=copia.pk)
+        
+    except Exception as e:
+        messages.error(request, f'Error al clonar cotización: {str(e)}')
+        return redirect('cotizaciones:detalle', pk=pk)
 
 @login_required
 @requiere_gerente_o_superior
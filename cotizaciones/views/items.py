@@ -22,6 +22,7 @@ from notificaciones.models import Notificacion
 from notificaciones.utils import crear_notificacion
 from home.models import PerfilEmpleado
 from ..utils_mantenimiento import verificar_mantenimientos_materiales
+from ..utils_items import preparar_items_lote, guardar_items_lote
 
 @login_required
 @requiere_gerente_o_superior
@@ -221,6 +222,51 @@ def agregar_item_mano_obra(request, cotizacion_pk):
         traceback.print_exc()  # Para ver el stack trace completo
         return JsonResponse({'success': False, 'error': str(e)})
 
+@login_required
+@requiere_gerente_o_superior
+@require_http_methods(["POST"])
+def agregar_items_lote(request, cotizacion_pk):
+    """
+    Agregar varios items (servicios, materiales y mano de obra) en una sola
+    solicitud AJAX. Recibe {"items": [{"tipo": "servicio", ...}, ...]} con los
+    mismos campos que los endpoints de un item. Se validan todos antes de
+    guardar: si alguno falla no se guarda ninguno.
+    """
+    cotizacion = get_object_or_404(Cotizacion, pk=cotizacion_pk)
+    
+    try:
+        data = json.loads(request.body)
+        items = data.get('items') if isinstance(data, dict) else data
+        
+        lote, errores = preparar_items_lote(cotizacion, items)
+        if errores:
+            return JsonResponse({
+                'success': False,
+                'error': f'{len(errores)} item(s) con errores, no se guardó ninguno',
+                'errores': errores
+            }, status=400)
+        
+        creados = guardar_items_lote(cotizacion, lote)
+        
+        return JsonResponse({
+            'success': True,
+            'items': [
+                {'tipo': tipo, 'item_id': item.id, 'subtotal': float(item.subtotal)}
+                for tipo, item in creados
+            ],
+            'subtotal_servicios': float(cotizacion.subtotal_servicios),
+            'subtotal_materiales': float(cotizacion.subtotal_materiales),
+            'subtotal_mano_obra': float(cotizacion.subtotal_mano_obra),
+            'valor_neto': float(cotizacion.valor_neto),
+            'valor_iva': float(cotizacion.valor_iva),
+            'valor_total': float(cotizacion.valor_total)
+        })
+        
+    except ValueError as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+    except Exception as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=500)
+
 @login_required
 @requiere_gerente_o_superior
 @require_http_methods(["DELETE"])
@@ -2,13 +2,13 @@ from functools import wraps
 from django.http import HttpResponseForbidden
 from django.shortcuts import redirect, render
 from django.contrib import messages
-from .models import PerfilEmpleado
+from .utils_perfil import obtener_perfil
 
 
 def requiere_cargo(cargos_permitidos):
     """
     Decorador que verifica que el usuario tenga uno de los cargos permitidos
-    Verifica en tiempo real contra la base de datos
+    Usa el perfil cargado para el request (ver obtener_perfil)
     """
     def decorator(view_func):
         @wraps(view_func)
@@ -16,25 +16,22 @@ def requiere_cargo(cargos_permitidos):
             if not request.user.is_authenticated:
                 return redirect('login')
             
-            try:
-                # Verificación en tiempo real desde la BD
-                perfil = PerfilEmpleado.objects.get(user=request.user)
-                
-                # Verificar que el perfil esté activo
-                if not perfil.activo:
-                    messages.error(request, 'Tu cuenta ha sido desactivada.')
-                    return redirect('login')
-                
-                # Verificar cargo
-                if perfil.cargo not in cargos_permitidos:
-                    messages.error(request, 'No tienes permisos para acceder a esta función.')
-                    return redirect('panel_empleados')
-                
-                return view_func(request, *args, **kwargs)
-                
-            except PerfilEmpleado.DoesNotExist:
+            perfil = obtener_perfil(request)
+            if perfil is None:
                 messages.error(request, 'Perfil de empleado no encontrado.')
-                return redirect('login')
+                return redirect('home:login')
+            
+            # Verificar que el perfil esté activo
+            if not perfil.activo:
+                messages.error(request, 'Tu cuenta ha sido desactivada.')
+                return redirect('home:login')
+            
+            # Verificar cargo
+            if perfil.cargo not in cargos_permitidos:
+                messages.error(request, 'No tienes permisos para acceder a esta función.')
+                return redirect('home:panel_empleados')
+            
+            return view_func(request, *args, **kwargs)
                 
         return wrapper
     return decorator
@@ -43,26 +40,20 @@ def requiere_admin(view_func):
     """Decorador específico para funciones de administrador"""
     @wraps(view_func)
     def wrapper(request, *args, **kwargs):
-        try:
-            perfil = PerfilEmpleado.objects.get(user=request.user)
-            if not perfil.es_admin() or not perfil.activo:
-                return render(request, 'home/error.html')
-            return view_func(request, *args, **kwargs)
-        except PerfilEmpleado.DoesNotExist:
+        perfil = obtener_perfil(request)
+        if perfil is None or not perfil.es_admin() or not perfil.activo:
             return render(request, 'home/error.html')
+        return view_func(request, *args, **kwargs)
     return wrapper
 
 def requiere_gerente_o_superior(view_func):
     """Decorador para gerentes y superiores"""
     @wraps(view_func)
     def wrapper(request, *args, **kwargs):
-        try:
-            perfil = PerfilEmpleado.objects.get(user=request.user)
-            if not perfil.es_gerente_o_superior() or not perfil.activo:
-                return render(request, 'home/error.html')
-            return view_func(request, *args, **kwargs)
-        except PerfilEmpleado.DoesNotExist:
+        perfil = obtener_perfil(request)
+        if perfil is None or not perfil.es_gerente_o_superior() or not perfil.activo:
             return render(request, 'home/error.html')
+        return view_func(request, *args, **kwargs)
     return wrapper
 
 def prevent_cache(view_func):
@@ -1,43 +1,51 @@
 from django.shortcuts import redirect
 from django.contrib import messages
 from django.contrib.auth import logout
-from .models import PerfilEmpleado
+from django.urls import reverse
+from .utils_perfil import obtener_perfil
 
 class PerfilEmpleadoMiddleware:
-    """Middleware que verifica el estado del perfil del empleado en cada request"""
+    """
+    Middleware que verifica el estado del perfil del empleado en cada request.
+    El perfil queda cargado en el request (ver obtener_perfil) para que los
+    decoradores y las vistas no lo vuelvan a consultar.
+    """
     def __init__(self, get_response):
         self.get_response = get_response
 
     def __call__(self, request):
         # URLs que no requieren verificación
         exempt_urls = [
-            '/login/', 
-            '/logout/', 
+            reverse('home:login'),
+            reverse('home:logout'),
             '/admin/',
             '/static/',
             '/media/',
-            '/',  # página principal
         ]
         
-        # Si la URL está exenta, continuar
-        if any(request.path.startswith(url) for url in exempt_urls):
+        # Si la URL está exenta, continuar ('/' es la página principal; con
+        # startswith eximiría todas las URLs)
+        if request.path == '/' or any(request.path.startswith(url) for url in exempt_urls):
             return self.get_response(request)
         
         # Solo verificar usuarios autenticados
         if request.user.is_authenticated:
-            try:
-                perfil = PerfilEmpleado.objects.get(user=request.user)
-                
-                # Si el perfil está inactivo, cerrar sesión
-                if not perfil.activo:
-                    messages.error(request, 'Tu cuenta ha sido desactivada.')
-                    logout(request)
-                    return redirect('login')
-                    
-            except PerfilEmpleado.DoesNotExist:
+            perfil = obtener_perfil(request)
+            
+            # Los superusuarios (p. ej. creados con createsuperuser) pueden no tener perfil
+            if perfil is None and request.user.is_superuser:
+                return self.get_response(request)
+
+            if perfil is None:
                 # Si no tiene perfil de empleado, cerrar sesión
                 messages.error(request, 'Perfil de empleado no encontrado.')
                 logout(request)
-                return redirect('login')
+                return redirect('home:login')
+            
+            # Si el perfil está inactivo, cerrar sesión
+            if not perfil.activo:
+                messages.error(request, 'Tu cuenta ha sido desactivada.')
+                logout(request)
+                return redirect('home:login')
         
         return self.get_response(request)
\ No newline at end of file
@@ -0,0 +1,19 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from django.contrib.auth.models import User
+from .models import PerfilEmpleado
+from .utils_perfil import invalidar_perfil
+
+
+@receiver(post_save, sender=PerfilEmpleado)
+@receiver(post_delete, sender=PerfilEmpleado)
+def invalidar_cache_perfil(sender, instance, **kwargs):
+    """Un perfil modificado o eliminado no debe seguir sirviéndose desde la caché"""
+    invalidar_perfil(instance.user_id)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidar_cache_estado_usuario(sender, instance, **kwargs):
+    """Activar/desactivar o eliminar un User cambia su estado_perfil"""
+    invalidar_perfil(instance.pk)
@@ -0,0 +1,95 @@
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.db import transaction
+from .models import PerfilEmpleado
+
+# Segundos que un perfil leído de la BD se comparte entre requests. Los
+# cambios hechos con save()/delete() invalidan la clave al instante en todos
+# los workers; el TTL solo acota cambios hechos con update() o fuera de Django.
+TTL_PERFIL = 60
+
+
+def _cache():
+    """Caché 'perfiles' (en disco, compartida por todos los procesos)"""
+    return caches['perfiles']
+
+
+def clave_perfil(user_id):
+    return f'perfil_empleado:{user_id}'
+
+
+def clave_estado_perfil(user_id):
+    return f'perfil_estado:{user_id}'
+
+
+def invalidar_perfil(user_id):
+    """Borra el perfil y su estado cacheados ahora y otra vez al confirmar la transacción en curso"""
+    claves = [clave_perfil(user_id), clave_estado_perfil(user_id)]
+    _cache().delete_many(claves)
+    transaction.on_commit(lambda: _cache().delete_many(claves))
+
+
+def obtener_perfil(request):
+    """
+    PerfilEmpleado del usuario del request, leído una sola vez por request.
+
+    Orden de búsqueda: el request (request._perfil_empleado), la caché
+    'perfiles' (TTL_PERFIL) y por último la BD. El perfil queda además
+    como request.user.perfilempleado, así ese acceso tampoco consulta
+    (y lanza PerfilEmpleado.DoesNotExist si no hay perfil).
+
+    Returns:
+        El PerfilEmpleado, o None si el usuario es anónimo o no tiene perfil.
+    """
+    if hasattr(request, '_perfil_empleado'):
+        return request._perfil_empleado
+
+    perfil = None
+    if request.user.is_authenticated:
+        clave = clave_perfil(request.user.pk)
+        perfil = _cache().get(clave)
+
+        if perfil is None:
+            perfil = PerfilEmpleado.objects.filter(user_id=request.user.pk).first()
+            if perfil is not None:
+                _cache().set(clave, perfil, TTL_PERFIL)
+
+        if perfil is not None:
+            # Después de cachear: el User del request no se guarda en la caché
+            perfil.user = request.user
+        # Sin perfil, request.user.perfilempleado lanza DoesNotExist sin consultar
+        User.perfilempleado.related.set_cached_value(request.user, perfil)
+
+    request._perfil_empleado = perfil
+    return perfil
+
+
+def estado_perfil(user_id):
+    """
+    Datos mínimos para autorizar a un usuario sin cargar User ni
+    PerfilEmpleado: una consulta la primera vez y luego la caché
+    'perfiles' (TTL_PERFIL), invalidada al guardar el User o su perfil.
+
+    Returns:
+        {'perfil_id', 'cargo', 'activo'} o None si el usuario no existe.
+        Sin perfil, perfil_id y cargo son None; 'activo' exige el User
+        activo y, si hay perfil, el perfil activo.
+    """
+    clave = clave_estado_perfil(user_id)
+    estado = _cache().get(clave)
+    if estado is not None:
+        return estado
+
+    fila = User.objects.filter(pk=user_id).values(
+        'is_active', 'perfilempleado__id', 'perfilempleado__cargo', 'perfilempleado__activo'
+    ).first()
+    if fila is None:
+        return None
+
+    estado = {
+        'perfil_id': fila['perfilempleado__id'],
+        'cargo': fila['perfilempleado__cargo'],
+        'activo': fila['is_active'] and fila['perfilempleado__activo'] is not False,
+    }
+    _cache().set(clave, estado, TTL_PERFIL)
+    return estado
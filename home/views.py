@@ -219,7 +219,7 @@ def panel_empleados(request):
     verificar_mantenimientos_materiales(request)
 
     try:
-        perfil = PerfilEmpleado.objects.get(user=request.user)
+        perfil = request.user.perfilempleado
         
         # Definir funciones disponibles según el cargo
         funciones_disponibles = []
@@ -614,7 +614,7 @@ def export_usuarios_csv(request):
 def mi_perfil(request):
     """Vista para que el usuario vea y edite su perfil"""
     try:
-        perfil = PerfilEmpleado.objects.get(user=request.user)
+        perfil = request.user.perfilempleado
         
         if request.method == 'POST':
             # Actualizar datos del usuario
@@ -679,7 +679,7 @@ def configuracion_usuario(request):
     
     # 2. Obtener perfil para verificar permisos
     try:
-        perfil = PerfilEmpleado.objects.get(user=request.user)
+        perfil = request.user.perfilempleado
     except PerfilEmpleado.DoesNotExist:
         perfil = None
 
@@ -114,6 +114,34 @@ else:
         }
     }
 
+# Cache
+# 'default' mantiene la caché en memoria por proceso (límite de solicitudes web).
+# 'reportes' guarda las respuestas JSON de reportes y su versión en disco para
+# que todos los workers de gunicorn vean la misma invalidación.
+# 'perfiles' guarda PerfilEmpleado y su estado de autorización, también en
+# disco: desactivar un empleado debe cerrarle el acceso en todos los workers.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'reportes': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get('REPORTES_CACHE_DIR', '/tmp/serviceflow_reportes'),
+        'TIMEOUT': 60 * 60,
+        'OPTIONS': {
+            'MAX_ENTRIES': 2000,
+        },
+    },
+    'perfiles': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get('PERFILES_CACHE_DIR', '/tmp/serviceflow_perfiles'),
+        'TIMEOUT': 60,
+        'OPTIONS': {
+            'MAX_ENTRIES': 2000,
+        },
+    },
+}
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -166,6 +194,9 @@ STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# PDFs de cotizaciones ya generados, por firma de contenido (disco local)
+PDF_COTIZACIONES_DIR = os.environ.get('PDF_COTIZACIONES_DIR', str(MEDIA_ROOT / 'pdf_cotizaciones'))
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 